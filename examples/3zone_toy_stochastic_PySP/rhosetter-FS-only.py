@@ -12,15 +12,13 @@ See CP(*) strategy described in Watson, J. P., & Woodruff, D. L.  (2011).
 Progressive hedging innovations for a class of stochastic  mixed-integer
 resource allocation problems. Computational  Management Science.
 
-Note, sympy is a pre-requisite. Install via `sudo pip install sympy`
-
 Implementation notes-------------------------------------------------------
 
 (Benjamin): This script is based on rhosetter.py, but modified to set Rho
 values only for the variables contained in the first stage costs Expression.
 For medium to large scale problems setting Rho for every varible takes up
-a significant amount of time, both in parsing the objective function with
-sympify and in going through the scenario tree looking for the variable.
+a significant amount of time, both in finding the cost coefficients and in
+going through the scenario tree looking for the variable.
 The progressive hedging algorithm only requires Rho values to be set (or
 to have a default value) for variables located in branch nodes.
 
@@ -37,9 +35,7 @@ optimizations.
 
 """
 
-import StringIO
-from re import findall
-from sympy import sympify
+from switch_mod.utilities import linear_coefficients
 
 def ph_rhosetter_callback(ph, scenario_tree, scenario):
     # This Rho coefficient is set to 1.0 to implement the CP(1.0) strategy
@@ -54,33 +50,8 @@ def ph_rhosetter_callback(ph, scenario_tree, scenario):
     # costs defined in the ReferenceModel. 
     FSCostsExpr = scenario_instance.find_component("InvestmentCost")
 
-    string_out = StringIO.StringIO()
-    FSCostsExpr.expr.to_string(ostream=string_out)
-    FSCostsExpr_as_str = string_out.getvalue()
-    string_out.close()
-
-    # Find indexed variables like BuildCap[2030, CA_LADWP] using a regular
-    # expression. See python documentation. The first part (?<=[^a-zA-Z])
-    # ensures search pattern is not preceeded by a letter. The regex returns
-    # two parts because I used two sets of parenthesis. I don't care about the
-    # second parenthesis that returns the indexed bits, just the larger part
-
-    pattern = "(?<=[^a-zA-Z])([a-zA-Z][a-zA-Z_0-9]*(\[[^]]*\])?)"
-    component_by_alias = {}
-    variable_list = findall(pattern, FSCostsExpr_as_str)
-    for (cname, index_as_str) in variable_list:
-        component = scenario_instance.find_component(cname)
-        alias = "x" + str(id(component))
-        component_by_alias[alias] = component
-        FSCostsExpr_as_str = FSCostsExpr_as_str.replace(cname, alias)
-    
-    # After the variables+indexes have clean names, 
-    # parse the equation with sympify
-    FSCostsExpr_parsed = sympify(FSCostsExpr_as_str)
-
-    for (alias, component) in component_by_alias.iteritems():
+    for (component, coefficient) in linear_coefficients(FSCostsExpr.expr):
         variable_id = symbol_map.getSymbol(component)
-        coefficient = FSCostsExpr_parsed.coeff(alias)
         set_rho = False
 
         # Replace the for loop in the rhosetter.py script for a single
@@ -93,6 +64,5 @@ def ph_rhosetter_callback(ph, scenario_tree, scenario):
                 variable_id,
                 coefficient * rho_coefficient)
             set_rho = True
-            break
         if set_rho == False:
             print("Warning! Could not find tree node for variable {}; rho not set.".format(component.cname()))
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+"""
+Benchmark the optional tier-activation constraints in
+switch_mod.hawaii.fuel_markets_expansion (--order-rfm-tiers,
+--persist-rfm-tiers and --rfm-tier-sos).
+
+This builds a fuel-supply model around fuel_markets_expansion.define_components():
+each regional fuel market must meet an annual fuel demand each period from its
+own supply tiers or its neighbors' (at a transport cost). The limited tiers
+have a fixed cost for being active, and the last tier in each market is an
+unlimited, expensive backstop. The rest of the Switch
+model is left out, so the tier-activation decisions are the only integer
+variables.
+
+Write a synthetic input set (the same settings always give the same files;
+rfm_tier_benchmark_inputs was written with the default settings):
+    python benchmark_rfm_tiers.py --generate rfm_tier_benchmark_inputs
+
+Solve it with each combination of options and report times and objectives:
+    python benchmark_rfm_tiers.py rfm_tier_benchmark_inputs --time-limit 600
+
+cbc 2.10 can crash during strong branching on the SOS1 variant; it can be
+solved with --cbc-options='-strong 0' --variants 3.
+"""
+
+import argparse
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+from pyomo.environ import *
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import switch_mod.utilities as utilities
+import switch_mod.hawaii.fuel_markets_expansion as fuel_markets_expansion
+
+inf = float('inf')
+
+VARIANTS = [
+    ('no ordering', []),
+    ('ordered', ['--order-rfm-tiers']),
+    ('ordered, persistent', ['--order-rfm-tiers', '--persist-rfm-tiers']),
+    ('ordered, persistent, SOS1', ['--order-rfm-tiers', '--persist-rfm-tiers', '--rfm-tier-sos']),
+]
+
+def generate_inputs(inputs_dir, markets, periods, tiers, seed):
+    """Write fuel_supply_curves.tab and rfm_demand.tab to inputs_dir. Each
+    market has the same tiers (limit and fixed cost) in every period, with
+    costs and demand rising over time."""
+    rand = random.Random(seed)
+    if not os.path.isdir(inputs_dir):
+        os.makedirs(inputs_dir)
+    supply_rows = []
+    demand_rows = []
+    for i in range(markets):
+        r = 'rfm_{:02d}'.format(i)
+        limits = [rand.randint(20, 100) * 1000 for st in range(tiers)]
+        fixed_costs = [round(rand.uniform(0.5, 4.0), 2) for st in range(tiers)]
+        unit_costs = sorted(round(rand.uniform(4.0, 10.0), 2) for st in range(tiers))
+        for j in range(periods):
+            p = 2020 + 10 * j
+            escalation = 1.0 + 0.05 * j
+            for st in range(tiers):
+                supply_rows.append((r, p, st, round(unit_costs[st] * escalation, 2),
+                    limits[st], fixed_costs[st]))
+            supply_rows.append((r, p, tiers, round(14.0 * escalation, 2), inf, 0.0))
+            demand = sum(limits) * rand.uniform(0.3, 0.5) * (1.0 + 0.2 * j)
+            demand_rows.append((r, p, int(demand)))
+    with open(os.path.join(inputs_dir, 'fuel_supply_curves.tab'), 'w') as f:
+        f.write('regional_fuel_market\tperiod\ttier\tunit_cost\tmax_avail_at_cost\tfixed_cost\n')
+        for row in supply_rows:
+            f.write('\t'.join(str(x) for x in row) + '\n')
+    with open(os.path.join(inputs_dir, 'rfm_demand.tab'), 'w') as f:
+        f.write('regional_fuel_market\tperiod\trfm_demand\n')
+        for row in demand_rows:
+            f.write('\t'.join(str(x) for x in row) + '\n')
+
+def define_model(options):
+    m = AbstractModel()
+    m.options = options
+    m.RFM_SUPPLY_TIERS = Set(dimen=3)
+    m.REGIONAL_FUEL_MARKET = Set(ordered=True, initialize=lambda m:
+        sorted(set(r for (r, p, st) in m.RFM_SUPPLY_TIERS)))
+    m.PERIODS = Set(ordered=True, initialize=lambda m:
+        sorted(set(p for (r, p, st) in m.RFM_SUPPLY_TIERS)))
+    m.rfm_supply_tier_cost = Param(m.RFM_SUPPLY_TIERS)
+    m.rfm_supply_tier_limit = Param(m.RFM_SUPPLY_TIERS)
+    m.rfm_demand = Param(m.REGIONAL_FUEL_MARKET, m.PERIODS)
+    # fuel can be shipped to neighboring markets (in a ring) at a transport cost, so
+    # the best choice of tiers in each market depends on the choices in its neighbors
+    m.rfm_transport_cost = Param(default=1.0)
+    m.RFM_NEIGHBORS = Set(m.REGIONAL_FUEL_MARKET, initialize=lambda m, r: [
+        m.REGIONAL_FUEL_MARKET[(m.REGIONAL_FUEL_MARKET.ord(r) + d - 1) % len(m.REGIONAL_FUEL_MARKET) + 1]
+            for d in (-1, 1)
+    ])
+    m.RFM_SHIPMENTS = Set(dimen=4, initialize=lambda m: [
+        (r, p, st, dest)
+            for (r, p, st) in m.RFM_SUPPLY_TIERS
+                for dest in [r] + list(m.RFM_NEIGHBORS[r])
+    ])
+    m.ShipFuel = Var(m.RFM_SHIPMENTS, within=NonNegativeReals)
+    m.FuelConsumptionByTier = Expression(m.RFM_SUPPLY_TIERS, rule=lambda m, r, p, st:
+        sum(m.ShipFuel[r, p, st, dest] for dest in [r] + list(m.RFM_NEIGHBORS[r]))
+    )
+    m.Meet_RFM_Demand = Constraint(m.REGIONAL_FUEL_MARKET, m.PERIODS, rule=lambda m, dest, p:
+        sum(m.ShipFuel[r, p, st, dest_] for (r, p_, st, dest_) in m.RFM_SHIPMENTS
+            if dest_ == dest and p_ == p)
+        == m.rfm_demand[dest, p]
+    )
+    m.cost_components_annual = []
+    fuel_markets_expansion.define_components(m)
+    m.Minimize_Cost = Objective(sense=minimize, rule=lambda m:
+        sum(
+            m.FuelConsumptionByTier[r, p, st] * m.rfm_supply_tier_cost[r, p, st]
+            for (r, p, st) in m.RFM_SUPPLY_TIERS
+        )
+        + sum(
+            m.ShipFuel[r, p, st, dest] * m.rfm_transport_cost
+            for (r, p, st, dest) in m.RFM_SHIPMENTS if dest != r
+        )
+        + sum(getattr(m, c)[p] for c in m.cost_components_annual for p in m.PERIODS)
+    )
+    return m
+
+def load_data(m, inputs_dir):
+    data = DataPortal(model=m)
+    data.load_aug = types.MethodType(utilities.load_aug, data)
+    data.load(
+        filename=os.path.join(inputs_dir, 'fuel_supply_curves.tab'),
+        select=('regional_fuel_market', 'period', 'tier', 'unit_cost', 'max_avail_at_cost'),
+        index=m.RFM_SUPPLY_TIERS,
+        param=(m.rfm_supply_tier_cost, m.rfm_supply_tier_limit))
+    data.load(
+        filename=os.path.join(inputs_dir, 'rfm_demand.tab'),
+        param=(m.rfm_demand,))
+    fuel_markets_expansion.load_inputs(m, data, inputs_dir)
+    return data
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('inputs_dir')
+    parser.add_argument('--generate', action='store_true', default=False,
+        help="Write a synthetic input set to inputs_dir instead of solving.")
+    parser.add_argument('--markets', type=int, default=20)
+    parser.add_argument('--periods', type=int, default=4)
+    parser.add_argument('--tiers', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--solver', default='cbc',
+        help="Solver to use. cbc is run directly on an MPS file; other solvers are called "
+            "through Pyomo.")
+    parser.add_argument('--cbc-options', default='',
+        help="Extra command-line options for cbc, e.g., '-strong 0'.")
+    parser.add_argument('--time-limit', type=float, default=None,
+        help="Maximum solve time for each variant, in seconds.")
+    parser.add_argument('--variants', type=int, nargs='+', default=range(len(VARIANTS)),
+        help="Numbers of the variants to solve (0-{}).".format(len(VARIANTS) - 1))
+    options = parser.parse_args(args)
+
+    if options.generate:
+        generate_inputs(
+            options.inputs_dir, options.markets, options.periods, options.tiers, options.seed)
+        return
+
+    print "{:28} {:>9} {:>8} {:>8} {:>16}  {}".format(
+        'variant', 'binaries', 'nodes', 'seconds', 'objective', 'result')
+    for v in options.variants:
+        name, flags = VARIANTS[v]
+        module_parser = argparse.ArgumentParser()
+        fuel_markets_expansion.define_arguments(module_parser)
+        m = define_model(module_parser.parse_args(flags))
+        instance = m.create_instance(load_data(m, options.inputs_dir))
+        if options.solver == 'cbc':
+            nodes, elapsed, objective, result = solve_with_cbc(
+                instance, options.time_limit, options.cbc_options.split())
+        else:
+            nodes, elapsed, objective, result = solve_with_pyomo(
+                instance, options.solver, options.time_limit)
+        print "{:28} {:9d} {:>8} {:8.1f} {:16.1f}  {}".format(
+            name, len(instance.RFMSupplyTierActivate), nodes, elapsed, objective, result)
+
+def solve_with_cbc(instance, time_limit, cbc_options):
+    """Solve instance by running cbc on an MPS file. Pyomo's cbc interface
+    rejects SOS constraints, and cbc 2.10 does not always read them correctly
+    from LP files, but it does read them from MPS files."""
+    temp_dir = tempfile.mkdtemp(prefix='rfm_tiers_')
+    try:
+        mps_file = os.path.join(temp_dir, 'rfm_tiers.mps')
+        instance.write(mps_file)
+        cmd = ['cbc', mps_file] + cbc_options
+        if time_limit is not None:
+            cmd.extend(['-sec', str(time_limit)])
+        cmd.append('-solve')
+        start = time.time()
+        output = subprocess.check_output(cmd)
+        elapsed = time.time() - start
+    finally:
+        shutil.rmtree(temp_dir)
+    def find(pattern):
+        match = re.search(pattern, output, re.MULTILINE)
+        return match.group(1).strip() if match else None
+    objective = find(r'^Objective value:\s+(\S+)')
+    if objective is None or float(objective) >= 1e50:
+        # no integer solution was found
+        objective = float('nan')
+    return (
+        find(r'^Enumerated nodes:\s+(\d+)'), elapsed, float(objective),
+        find(r'^Result - (.*)$')
+    )
+
+def solve_with_pyomo(instance, solver_name, time_limit):
+    solver = SolverFactory(solver_name)
+    start = time.time()
+    results = solver.solve(instance, timelimit=time_limit)
+    elapsed = time.time() - start
+    return 'n/a', elapsed, value(instance.Minimize_Cost), results.solver.termination_condition
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,7 @@ import matplotlib.pyplot as plt
 import pandas as pd
 from cycler import cycler
 import switch_mod.export as export
+from switch_mod.load_zones import marginal_costs
 
 def define_arguments(argparser):
     argparser.add_argument(
@@ -59,6 +60,19 @@ def define_dynamic_components(mod):
     mod.TotalOperationsCost = Expression(rule=lambda m: sum(m.SystemCostPerPeriod[p] for p in m.PERIODS) - m.TotalInvestmentCost)
 
 
+def read_summary(instance, output_file):
+    """
+    Read back a table written by export.write_table() as a pandas DataFrame,
+    from the results database if the model was run with --results-db,
+    otherwise from output_file.
+    """
+    store = export.get_results_store(instance)
+    if store is not None:
+        headings, rows = store.read_table(export.table_name(output_file))
+        return pd.DataFrame.from_records(rows, columns=headings)
+    else:
+        return pd.read_csv(output_file, sep='\t')
+
 def post_solve(instance, outdir):
     summaries_dir = os.path.join(outdir,"Summaries")
     if not os.path.exists(summaries_dir):
@@ -72,15 +86,13 @@ def post_solve(instance, outdir):
         This table writes out the marginal costs of supplying energy in each timepoint in US$/MWh.
         """
         print "marginal_costs_lz_tp.csv..."
+        mc = marginal_costs(instance)
         export.write_table(
             instance, instance.TIMEPOINTS, instance.LOAD_ZONES,
             output_file=os.path.join(summaries_dir, "marginal_costs_lz_tp.csv"),
             headings=("timepoint","load_zones","marginal_cost"),
-            values=lambda m, tp, lz: (m.tp_timestamp[tp], lz, m.dual[m.Energy_Balance[lz, tp]] / (m.tp_weight_in_year[tp] * uniform_series_to_present_value(
-                    m.discount_rate, m.period_length_years[m.tp_period[tp]]) * future_to_present_value(
-                    m.discount_rate, (m.period_start[m.tp_period[tp]] - m.base_financial_year)))
-            ))
-        df = pd.read_csv('outputs/Summaries/marginal_costs_lz_tp.csv',sep='\t')
+            values=lambda m, tp, lz: (m.tp_timestamp[tp], lz, mc[lz, tp]))
+        df = read_summary(instance, os.path.join(summaries_dir, "marginal_costs_lz_tp.csv"))
         lz_dfs = []
         for lz in instance.LOAD_ZONES:
             lz_dfs.append(df[df.load_zones == lz].drop(['load_zones','timepoint'],axis=1).reset_index(drop=True))
@@ -95,7 +107,7 @@ def post_solve(instance, outdir):
         # to locate the legend: "loc" is the point of the legend for which you will specify cooridnates. These coords are specified in bbox_to_anchor (can be only 1 point or couple)
         mc_plot = DF.plot(ax=mc_ax,linewidth=1.5).legend(loc='upper center', fontsize=10, bbox_to_anchor=(0.,-0.15,1.,-0.15), ncol=3, mode="expand")
         plt.xticks([i*24 for i in range(1,len(instance.TIMEPOINTS)/24+1)],[instance.tp_timestamp[instance.TIMEPOINTS[i*24]] for i in range(1,len(instance.TIMEPOINTS)/24+1)],rotation=40,fontsize=7)
-        plt.savefig('outputs/Summaries/marginal_costs.pdf',bbox_extra_artists=(mc_plot,))
+        plt.savefig(os.path.join(summaries_dir, "marginal_costs.pdf"),bbox_extra_artists=(mc_plot,))
     """
     This table writes out the fuel consumption in MMBTU per hour. 
     """
@@ -153,7 +165,7 @@ def post_solve(instance, outdir):
                 for p in m.PERIODS)
         )
         
-        DF = pd.read_csv('outputs/Summaries/build_proj_by_tech_p.csv',sep='\t').transpose()
+        DF = read_summary(instance, os.path.join(summaries_dir, "build_proj_by_tech_p.csv")).transpose()
         DF.columns = DF.iloc[0]
         DF=DF.drop('gentech')
         fig = plt.figure(2)
@@ -165,7 +177,7 @@ def post_solve(instance, outdir):
         # to locate the legend: "loc" is the point of the legend for which you will specify cooridnates. These coords are specified in bbox_to_anchor (can be only 1 point or couple)
         tech_plot = DF.plot(ax=tech_ax,kind='bar').legend(loc='upper center', fontsize=10, bbox_to_anchor=(0.,-0.07,1.,-0.07), ncol=2, mode="expand")
         plt.xticks(rotation=0,fontsize=12)
-        plt.savefig('outputs/Summaries/gentech_capacities.pdf',bbox_extra_artists=(tech_plot,))
+        plt.savefig(os.path.join(summaries_dir, "gentech_capacities.pdf"),bbox_extra_artists=(tech_plot,))
     
 
 
@@ -185,7 +197,7 @@ def post_solve(instance, outdir):
                 sum(m.DispatchProj[proj, t] for (proj, t) in m.PROJ_DISPATCH_POINTS if t == tp),)
         )
         
-        DF = pd.read_csv('outputs/Summaries/dispatch_proj_by_tech_tp.csv',sep='\t').drop(['gentech'],axis=1)
+        DF = read_summary(instance, os.path.join(summaries_dir, "dispatch_proj_by_tech_tp.csv")).drop(['gentech'],axis=1)
         fig = plt.figure(3)
         dis_ax = fig.add_subplot(211)
         # GO cycling through the rainbow to get line colours
@@ -195,7 +207,7 @@ def post_solve(instance, outdir):
         # to locate the legend: "loc" is the point of the legend for which you will specify cooridnates. These coords are specified in bbox_to_anchor (can be only 1 point or couple)
         dis_plot = DF.plot(ax=dis_ax,linewidth=1.5).legend(loc='upper center', fontsize=10, bbox_to_anchor=(0.,-0.15,1.,-0.15), ncol=2, mode="expand")
         plt.xticks([i*5 for i in range(1,len(instance.TIMEPOINTS)/5+1)],[instance.tp_timestamp[instance.TIMEPOINTS[i*5]] for i in range(1,len(instance.TIMEPOINTS)/5+1)],rotation=40,fontsize=7)
-        plt.savefig('outputs/Summaries/gentech_dispatch.pdf',bbox_extra_artists=(dis_plot,))
+        plt.savefig(os.path.join(summaries_dir, "gentech_dispatch.pdf"),bbox_extra_artists=(dis_plot,))
     
     if instance.options.export_reservoirs:
         """
@@ -210,7 +222,7 @@ def post_solve(instance, outdir):
                 sum(m.ReservoirFinalvol[r, tp] - m.initial_res_vol[r] for r in m.RESERVOIRS),)
         )
         
-        DF = pd.read_csv('outputs/Summaries/reservoir_final_vols_tp.csv',sep='\t').drop(['timepoints'],axis=1)
+        DF = read_summary(instance, os.path.join(summaries_dir, "reservoir_final_vols_tp.csv")).drop(['timepoints'],axis=1)
         fig2 = plt.figure(4)
         res_ax = fig2.add_subplot(211)
         # GO cycling through the rainbow to get line colours
@@ -220,16 +232,23 @@ def post_solve(instance, outdir):
         # to locate the legend: "loc" is the point of the legend for which you will specify cooridnates. These coords are specified in bbox_to_anchor (can be only 1 point or couple)
         res_plot = DF.plot(ax=res_ax,linewidth=1.5).legend(loc='upper center', fontsize=10, bbox_to_anchor=(0.,-0.15,1.,-0.15), ncol=2, mode="expand")
         plt.xticks([i*24 for i in range(1,len(instance.TIMEPOINTS)/24+1)],[instance.tp_timestamp[instance.TIMEPOINTS[i*24]] for i in range(1,len(instance.TIMEPOINTS)/24+1)],rotation=40,fontsize=7)
-        plt.savefig('outputs/Summaries/reservoir_levels.pdf',bbox_extra_artists=(res_plot,))
+        plt.savefig(os.path.join(summaries_dir, "reservoir_levels.pdf"),bbox_extra_artists=(res_plot,))
 
     """
     Writing Objective Function value.
     """
     print "total_system_costs.txt..."
-    with open(os.path.join(summaries_dir, "total_system_costs.txt"),'w+') as f:
-        f.write("Total System Costs: "+str(instance.SystemCost())+"\n")
-        f.write("Total Investment Costs: "+str(instance.TotalInvestmentCost())+"\n")
-        f.write("Total Operations Costs: "+str(instance.TotalOperationsCost()))
+    if export.get_results_store(instance) is not None:
+        # save in the results database instead (see --results-db)
+        export.write_rows(
+            instance, os.path.join(summaries_dir, "total_system_costs.txt"),
+            ("SystemCost", "TotalInvestmentCost", "TotalOperationsCost"),
+            [(instance.SystemCost(), instance.TotalInvestmentCost(), instance.TotalOperationsCost())])
+    else:
+        with open(os.path.join(summaries_dir, "total_system_costs.txt"),'w+') as f:
+            f.write("Total System Costs: "+str(instance.SystemCost())+"\n")
+            f.write("Total Investment Costs: "+str(instance.TotalInvestmentCost())+"\n")
+            f.write("Total Operations Costs: "+str(instance.TotalOperationsCost()))
 
     
     # # This table writes out the dispatch of each gen tech on each timepoint and load zone.
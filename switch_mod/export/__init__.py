@@ -21,6 +21,7 @@ dependency on load_zones.
 
 import csv
 import itertools
+import os
 from pyomo.environ import value
 
 csv.register_dialect(
@@ -43,12 +44,161 @@ def write_table(instance, *indexes, **kwargs):
     # create a master indexing set
     # this is a list of lists, even if only one list was specified
     idx = itertools.product(*indexes)
-    with open(output_file, 'wb') as f:
-        w = csv.writer(f, dialect="ampl-tab")
-        # write header row
-        w.writerow(list(headings))
-        # write the data
-        w.writerows(
-            tuple(value(v) for v in values(instance, *x))
-            for x in idx
-        )
+    write_rows(
+        instance, output_file, headings,
+        (tuple(value(v) for v in values(instance, *x)) for x in idx)
+    )
+
+
+def write_rows(instance, output_file, headings, rows):
+    """
+    Write a table with the specified headings and rows of plain values.
+    Normally this is written to output_file in ampl-tab format. If the
+    model was run with --results-db, the rows are stored in that SQLite
+    database instead, in a table named after output_file (without its
+    directory or extension), labeled with the current --scenario-name.
+    """
+    store = get_results_store(instance)
+    if store is not None:
+        store.write_table(table_name(output_file), headings, rows)
+    else:
+        with open(output_file, 'wb') as f:
+            w = csv.writer(f, dialect="ampl-tab")
+            # write header row
+            w.writerow(list(headings))
+            # write the data
+            w.writerows(rows)
+
+
+def table_name(output_file):
+    """Return the results-database table name to use for output_file."""
+    return os.path.splitext(os.path.basename(output_file))[0]
+
+
+class SQLiteResultsStore(object):
+    """
+    Store output tables in a single SQLite database file, as an alternative
+    to writing one file per table. Every table gets an extra first column,
+    "scenario", so one database can be shared by many scenarios. Writing a
+    table replaces any rows previously stored for the same scenario. Indexes
+    are not created until finish() is called, so loading stays fast.
+    """
+    def __init__(self, path, scenario, batch_size=10000):
+        import sqlite3
+        self.scenario = scenario
+        self.batch_size = batch_size
+        # use a long timeout, in case other processes are writing to the same file
+        self.db = sqlite3.connect(path, timeout=600)
+        # headings of the tables written so far, for use by append_rows()
+        self.headings = {}
+
+    def write_table(self, table, headings, rows):
+        headings = list(headings)
+        with self.db:   # one transaction per table
+            self._prepare_table(table, headings)
+            self.db.execute(
+                'DELETE FROM {} WHERE scenario = ?'.format(quote_name(table)),
+                (self.scenario,))
+            self._insert_rows(table, headings, rows)
+        self.headings[table] = headings
+
+    def append_rows(self, table, rows):
+        """Add more rows to a table previously created with write_table()."""
+        if table not in self.headings:
+            raise ValueError(
+                "Unable to add rows to table {} in results database: the "
+                "table has not been created yet.".format(table))
+        with self.db:
+            self._insert_rows(table, self.headings[table], rows)
+
+    def read_table(self, table):
+        """Return the headings and rows stored in table for the current scenario."""
+        cursor = self.db.execute(
+            'SELECT * FROM {} WHERE scenario = ?'.format(quote_name(table)),
+            (self.scenario,))
+        headings = [d[0] for d in cursor.description][1:]
+        rows = [r[1:] for r in cursor]
+        return (headings, rows)
+
+    def _insert_rows(self, table, headings, rows):
+        insert = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote_name(table),
+            ', '.join(quote_name(h) for h in ['scenario'] + headings),
+            ', '.join('?' for h in ['scenario'] + headings))
+        rows = iter(rows)
+        while True:
+            batch = [
+                (self.scenario,) + tuple(r)
+                for r in itertools.islice(rows, self.batch_size)
+            ]
+            if not batch:
+                break
+            self.db.executemany(insert, batch)
+
+    def _prepare_table(self, table, headings):
+        """Create the table if needed, or add any columns it doesn't have yet."""
+        if len(set(headings)) != len(headings) or 'scenario' in headings:
+            raise ValueError(
+                "Unable to store table {} in results database: column names "
+                "must be unique and cannot include 'scenario'.".format(table))
+        existing = [
+            r[1] for r in self.db.execute('PRAGMA table_info({})'.format(quote_name(table)))
+        ]
+        if not existing:
+            self.db.execute('CREATE TABLE {} ({})'.format(
+                quote_name(table),
+                ', '.join(quote_name(h) for h in ['scenario'] + headings)))
+        else:
+            for h in headings:
+                if h not in existing:
+                    self.db.execute('ALTER TABLE {} ADD COLUMN {}'.format(
+                        quote_name(table), quote_name(h)))
+
+    def finish(self):
+        """Index every table by scenario, then close the database."""
+        with self.db:
+            tables = [r[0] for r in self.db.execute(
+                "SELECT name FROM sqlite_master WHERE type='table'")]
+            for table in tables:
+                self.db.execute('CREATE INDEX IF NOT EXISTS {} ON {} (scenario)'.format(
+                    quote_name(table + '_scenario'), quote_name(table)))
+        self.db.close()
+
+
+def quote_name(name):
+    """Quote a table or column name for use in an SQL statement."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+# open results stores, indexed by (process id, database path, scenario name);
+# the process id is included so that worker processes forked by
+# switch_mod.utilities (see --export-workers) open their own connections.
+_results_stores = {}
+
+def _results_store_key(instance):
+    options = getattr(instance, 'options', None)
+    path = getattr(options, 'results_db', None)
+    if path is None:
+        return None
+    return (os.getpid(), path, getattr(options, 'scenario_name', ''))
+
+def get_results_store(instance):
+    """
+    Return the SQLiteResultsStore to use for the model instance, or None if
+    results should be written to individual files.
+    """
+    key = _results_store_key(instance)
+    if key is None:
+        return None
+    if key not in _results_stores:
+        (pid, path, scenario) = key
+        _results_stores[key] = SQLiteResultsStore(path, scenario)
+    return _results_stores[key]
+
+
+def finish_results_store(instance):
+    """Create indexes and close the results database for instance, if any."""
+    store = get_results_store(instance)
+    if store is not None:
+        store.finish()
+        del _results_stores[_results_store_key(instance)]
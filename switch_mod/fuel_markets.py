@@ -386,63 +386,97 @@ def load_inputs(mod, switch_data, inputs_dir):
 
 
 def _load_simple_cost_data(mod, switch_data, path):
+    """
+    Convert simple per-load-zone fuel costs into single-tier regional fuel
+    markets. All rows are checked first, using sets and dictionaries built
+    once from the data already loaded, and every problem found is reported
+    in a single ValueError. The rows are then expanded into
+    markets and supply tiers in one pass.
+    """
+    load_zones = set(switch_data.data(name='LOAD_ZONES'))
+    fuels = set(switch_data.data(name='FUELS'))
+    periods = set(switch_data.data(name='PERIODS'))
+    rfm_fuel = switch_data.data(name='rfm_fuel')
+    existing_rfms = set(switch_data.data(name='REGIONAL_FUEL_MARKET'))
+    # (load_zone, fuel) -> regional fuel market already serving that pair
+    lz_fuel_rfm = {
+        (z, rfm_fuel[rfm]): rfm for (z, rfm) in switch_data.data(name='LZ_RFM')
+    }
+
     with open(path, 'rb') as simple_cost_file:
-        simple_cost_dat = list(csv.DictReader(simple_cost_file, delimiter='	'))
-        # Scan once for error checking
-        for row in simple_cost_dat:
-            lz = row['load_zone']
-            f = row['fuel']
-            p = int(row['period'])
-            f_cost = float(row['fuel_cost'])
-            # Basic data validity checks
-            if lz not in switch_data.data(name='LOAD_ZONES'):
-                raise ValueError(
-                    "Load zone " + lz + " in lz_simple_fuel_cost.tab is not " +
-                    "a known load zone from load_zones.tab.")
-            if f not in switch_data.data(name='FUELS'):
-                raise ValueError(
-                    "Fuel " + f + " in lz_simple_fuel_cost.tab is not " +
-                    "a known fuel from fuels.tab.")
-            if p not in switch_data.data(name='PERIODS'):
-                raise ValueError(
-                    "Period " + p + " in lz_simple_fuel_cost.tab is not " +
-                    "a known investment period.")
-            # Make sure they aren't overriding a supply curve or
-            # regional fuel market defined in previous files.
-            for (z, rfm) in switch_data.data(name='LZ_RFM'):
-                if(z == lz and
-                   switch_data.data(name='rfm_fuel')[rfm] == f):
-                    raise ValueError(
-                        "The supply for fuel '" + f + "' for load_zone '" + lz +
-                        "' was already registered with the regional fuel " +
-                        "market '" + rfm + "', so you cannot " +
-                        "specify a simple fuel cost for it in " +
-                        "lz_simple_fuel_cost.tab. You either need to delete " +
-                        "that entry from lz_to_regional_fuel_market.tab, or " +
-                        "remove those entries in lz_simple_fuel_cost.tab.")
-            # Make a new single-load zone regional fuel market.
-            rfm = lz + "_" + f
-            if rfm in switch_data.data(name='REGIONAL_FUEL_MARKET'):
-                raise ValueError(
-                    "Trying to construct a simple Regional Fuel Market " +
-                    "called " + rfm + " from data in lz_simple_fuel_cost.tab" +
-                    ", but an RFM of that name already exists. Bailing out!")
-        # Scan again and actually import the data
-        for row in simple_cost_dat:
-            lz = row['load_zone']
-            f = row['fuel']
-            p = int(row['period'])
-            f_cost = float(row['fuel_cost'])
-            # Make a new single-load zone regional fuel market unless we
-            # already defined one in this loop for a different period.
-            rfm = lz + "_" + f
-            if(rfm not in switch_data.data(name='REGIONAL_FUEL_MARKET')):
-                switch_data.data(name='REGIONAL_FUEL_MARKET').append(rfm)
-                switch_data.data(name='rfm_fuel')[rfm] = f
-                switch_data.data(name='LZ_RFM').append((lz, rfm))
-            # Make a single supply tier for this RFM and period
-            st = 0
-            switch_data.data(name='RFM_SUPPLY_TIERS').append((rfm, p, st))
-            switch_data.data(name='rfm_supply_tier_cost')[rfm, p, st] = f_cost
-            switch_data.data(name='rfm_supply_tier_limit')[rfm, p, st] = \
-                float('inf')
+        simple_cost_dat = [
+            (row['load_zone'], row['fuel'], int(row['period']), float(row['fuel_cost']))
+            for row in csv.DictReader(simple_cost_file, delimiter='\t')
+        ]
+
+    # Scan once for error checking
+    errors = []
+    seen = set()
+    for (lz, f, p, f_cost) in simple_cost_dat:
+        # Basic data validity checks
+        if lz not in load_zones:
+            errors.append(
+                "Load zone " + lz + " in fuel_cost.tab is not " +
+                "a known load zone from load_zones.tab.")
+        if f not in fuels:
+            errors.append(
+                "Fuel " + f + " in fuel_cost.tab is not " +
+                "a known fuel from fuels.tab.")
+        if p not in periods:
+            errors.append(
+                "Period " + str(p) + " in fuel_cost.tab is not " +
+                "a known investment period.")
+        if (lz, f, p) in seen:
+            errors.append(
+                "More than one cost is specified for fuel '" + f + "' in " +
+                "load zone '" + lz + "' in period " + str(p) + " in fuel_cost.tab.")
+        seen.add((lz, f, p))
+        # Make sure they aren't overriding a supply curve or
+        # regional fuel market defined in previous files.
+        if (lz, f) in lz_fuel_rfm:
+            errors.append(
+                "The supply for fuel '" + f + "' for load_zone '" + lz +
+                "' was already registered with the regional fuel " +
+                "market '" + lz_fuel_rfm[lz, f] + "', so you cannot " +
+                "specify a simple fuel cost for it in " +
+                "fuel_cost.tab. You either need to delete " +
+                "that entry from lz_to_regional_fuel_market.tab, or " +
+                "remove those entries in fuel_cost.tab.")
+        # Make sure the single-load zone regional fuel market name is free.
+        rfm = lz + "_" + f
+        if rfm in existing_rfms:
+            errors.append(
+                "Trying to construct a simple Regional Fuel Market " +
+                "called " + rfm + " from data in fuel_cost.tab" +
+                ", but an RFM of that name already exists.")
+    if errors:
+        # report each distinct problem once, in the order found
+        reported = set()
+        unique_errors = []
+        for e in errors:
+            if e not in reported:
+                reported.add(e)
+                unique_errors.append(e)
+        raise ValueError("Errors found in " + path + ":\n" + "\n".join(unique_errors))
+
+    # Scan again and actually import the data
+    rfm_list = switch_data.data(name='REGIONAL_FUEL_MARKET')
+    lz_rfm_list = switch_data.data(name='LZ_RFM')
+    supply_tiers = switch_data.data(name='RFM_SUPPLY_TIERS')
+    tier_cost = switch_data.data(name='rfm_supply_tier_cost')
+    tier_limit = switch_data.data(name='rfm_supply_tier_limit')
+    new_rfms = set()
+    for (lz, f, p, f_cost) in simple_cost_dat:
+        # Make a new single-load zone regional fuel market unless we
+        # already defined one in this loop for a different period.
+        rfm = lz + "_" + f
+        if rfm not in new_rfms:
+            new_rfms.add(rfm)
+            rfm_list.append(rfm)
+            rfm_fuel[rfm] = f
+            lz_rfm_list.append((lz, rfm))
+        # Make a single supply tier for this RFM and period
+        st = 0
+        supply_tiers.append((rfm, p, st))
+        tier_cost[rfm, p, st] = f_cost
+        tier_limit[rfm, p, st] = float('inf')
@@ -1,5 +1,13 @@
+"""Batteries in each load zone, with state of charge tracked by storage.py.
+
+The change in state of charge during each timepoint is the net charging rate
+times tp_duration_hrs, so results match earlier versions of this module (which
+treated every timepoint as one hour long) only when timepoints are hourly.
+"""
+
 import os
 from pyomo.environ import *
+import switch_mod.hawaii.storage as storage
 
 def define_components(m):
     
@@ -70,39 +78,24 @@ def define_components(m):
     m.cost_components_tp.append('Battery_Variable_Cost')
     m.cost_components_annual.append('Battery_Fixed_Cost_Annual')
 
-    # Calculate the state of charge based on conservation of energy
-    # NOTE: this is circular for each day
-    # NOTE: the overall level for the day is free, but the levels each timepoint are chained.
-    m.Battery_Level_Calc = Constraint(m.LOAD_ZONES, m.TIMEPOINTS, rule=lambda m, z, t:
-        m.BatteryLevel[z, t] == 
-            m.BatteryLevel[z, m.tp_previous[t]]
-            + m.battery_efficiency * m.ChargeBattery[z, m.tp_previous[t]] 
-            - m.DischargeBattery[z, m.tp_previous[t]]
-    )
-      
-    # limits on storage level
-    m.Battery_Min_Level = Constraint(m.LOAD_ZONES, m.TIMEPOINTS, rule=lambda m, z, t: 
-        (1.0 - m.battery_max_discharge) * m.Battery_Capacity[z, m.tp_period[t]]
-        <= 
-        m.BatteryLevel[z, t]
-    )
-    m.Battery_Max_Level = Constraint(m.LOAD_ZONES, m.TIMEPOINTS, rule=lambda m, z, t: 
-        m.BatteryLevel[z, t]
-        <= 
-        m.Battery_Capacity[z, m.tp_period[t]]
+    # power capacity, which limits the rate of charging and discharging
+    m.Battery_Power_Capacity_MW = Expression(m.LOAD_ZONES, m.PERIODS, rule=lambda m, z, p:
+        m.Battery_Capacity[z, p] * m.battery_max_discharge / m.battery_min_discharge_time
     )
 
-    m.Battery_Max_Charge = Constraint(m.LOAD_ZONES, m.TIMEPOINTS, rule=lambda m, z, t:
-        m.ChargeBattery[z, t]
-        <=
-        m.Battery_Capacity[z, m.tp_period[t]] * m.battery_max_discharge / m.battery_min_discharge_time
-    )
-    m.Battery_Max_Disharge = Constraint(m.LOAD_ZONES, m.TIMEPOINTS, rule=lambda m, z, t:
-        m.DischargeBattery[z, t]
-        <=
-        m.Battery_Capacity[z, m.tp_period[t]] * m.battery_max_discharge / m.battery_min_discharge_time
+    # state of charge, charging and discharging limits (see storage.py)
+    storage.register_storage(m, 'battery',
+        assets='LOAD_ZONES',
+        charge='ChargeBattery', discharge='DischargeBattery', level='BatteryLevel',
+        charge_capacity='Battery_Power_Capacity_MW', discharge_capacity='Battery_Power_Capacity_MW',
+        energy_capacity='Battery_Capacity',
+        charge_efficiency='battery_efficiency', max_discharge_fraction='battery_max_discharge',
+        balance='level'
     )
 
+def define_dynamic_components(m):
+    storage.define_dynamic_components(m)
+
 
 def load_inputs(mod, switch_data, inputs_dir):
     """
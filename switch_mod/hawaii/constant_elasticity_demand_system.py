@@ -2,13 +2,15 @@ import numpy as np
 
 base_load_dict = None
 base_price_dict = None
+base_load_array = None
+base_price_array = None
 elasticity_scenario = None
 
 def calibrate(base_data, dr_elasticity_scenario=3):
     """Accept a list of tuples showing [base hourly loads], and [base hourly prices] for each 
     location (load_zone) and date (time_series). Store these for later reference by bid().
     """
-    global base_load_dict, base_price_dict, elasticity_scenario
+    global base_load_dict, base_price_dict, base_load_array, base_price_array, elasticity_scenario
     # build dictionaries (indexed lists) of base loads and prices
     # store the load and price vectors as numpy arrays (vectors) for faste calculation later
     base_load_dict = {
@@ -19,6 +21,13 @@ def calibrate(base_data, dr_elasticity_scenario=3):
         (lz, ts): np.array(base_prices, float)
         for (lz, ts, base_loads, base_prices) in base_data
     }
+    # also store them as 2-d arrays (one row per entry in base_data) for bid_all(),
+    # if all the days have the same number of hours
+    if len(set(len(base_loads) for (lz, ts, base_loads, base_prices) in base_data)) == 1:
+        base_load_array = np.array([bl for (lz, ts, bl, bp) in base_data], float)
+        base_price_array = np.array([bp for (lz, ts, bl, bp) in base_data], float)
+    else:
+        base_load_array = base_price_array = None
     elasticity_scenario = dr_elasticity_scenario
 
 def bid(load_zone, time_series, prices):
@@ -68,3 +77,54 @@ def bid(load_zone, time_series, prices):
     wtp = shiftable_load_wtp + elastic_load_cs_diff + elastic_load_paid_diff
     
     return (demand, wtp)
+
+def bid_all(prices):
+    """Accept an array of current prices for all locations and days, with the last
+    dimension indexing hours of the day and the other dimensions in the same order as 
+    base_data (e.g., shape (load zones, time series, hours)). Return a tuple of an array 
+    of hourly load levels (same shape as prices) and an array of willingness to pay for 
+    each location and day (prices.shape[:-1]). This gives the same results as calling 
+    bid() for each location and day, but does all the calculations at once. This can
+    only be used if all days have the same number of hours.
+    
+    >>> calibrate([('z', 1, [1.0, 2.0, 3.0], [100.0, 100.0, 100.0]),
+    ...            ('z', 2, [2.0, 2.0, 1.0], [120.0, 90.0, 150.0])], 2)
+    >>> prices = np.array([[50.0, 40.0, 300.0], [90.0, 90.0, 100.0]])
+    >>> demand, wtp = bid_all(prices)
+    >>> all(
+    ...     np.allclose(demand[i], bid('z', i+1, prices[i])[0]) 
+    ...     and np.allclose(wtp[i], bid('z', i+1, prices[i])[1])
+    ...     for i in range(2)
+    ... )
+    True
+    """
+    elasticity = 0.1
+    shiftable_share = 0.1 * elasticity_scenario # 1-3
+
+    prices = np.asarray(prices, float)
+    shape = prices.shape
+    # flatten into one row per location and date, to match the base arrays
+    p = np.maximum(1.0, prices.reshape(-1, shape[-1]))
+    bl = base_load_array
+    bp = base_price_array
+
+    # spread shiftable load among all minimum-cost hours in each day (see bid())
+    mins = (p == p.min(axis=1)[:, np.newaxis])
+    shiftable_load = np.where(
+        mins,
+        bl * (shiftable_share * bl.sum(axis=1) / (bl * mins).sum(axis=1))[:, np.newaxis],
+        0.0
+    )
+    shiftable_load_wtp = 0
+    
+    elastic_base_load = (1.0 - shiftable_share) * bl
+    elastic_load = elastic_base_load * (p/bp) ** (-elasticity)
+    elastic_load_cs_diff = np.sum((1 - (p/bp)**(1-elasticity)) * bp * elastic_base_load / (1-elasticity), axis=1)
+    base_elastic_load_paid = np.sum(bp * elastic_base_load, axis=1)
+    elastic_load_paid = np.sum(p * elastic_load, axis=1)
+    elastic_load_paid_diff = elastic_load_paid - base_elastic_load_paid
+    
+    demand = shiftable_load + elastic_load
+    wtp = shiftable_load_wtp + elastic_load_cs_diff + elastic_load_paid_diff
+    
+    return (demand.reshape(shape), wtp.reshape(shape[:-1]))
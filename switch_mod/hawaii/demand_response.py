@@ -11,10 +11,13 @@ note: we also take advantage of this assumption and store a reference to the
 current demand_module in this module (rather than storing it in the model itself)
 """
 
-import os, sys
-from pprint import pprint
+import os, sys, hashlib, tempfile
+import cPickle as pickle
+import numpy as np
+from pprint import pprint, pformat
 from pyomo.environ import *
 import switch_mod.utilities as utilities
+from switch_mod.load_zones import marginal_costs
 demand_module = None    # will be set via command-line options
 
 import util
@@ -32,6 +35,30 @@ def define_arguments(argparser):
         "specified in the modules list, and should provide calibrate() and bid() functions. "
         "Pre-written options include constant_elasticity_demand_system or r_demand_system. "
         "Specify one of these in the modules list and use --help again to see module-specific options.")
+    argparser.add_argument("--dr-output-queue-depth", type=int, default=0,
+        help="Write results and summaries from each iteration on a background thread, "
+        "with up to this many writes waiting at a time, so the next iteration can be solved "
+        "in the meantime (default is 0, i.e., write results before continuing)")
+    argparser.add_argument("--dr-convergence-gap", type=float, default=None,
+        help="Stop iterating when the cost of the current solution is within this fraction "
+        "of the lower bound implied by the latest bids (e.g., 0.001). By default, iteration "
+        "only stops when the system cost stops changing.")
+    argparser.add_argument("--dr-max-iterations", type=int, default=None,
+        help="Maximum number of demand response iterations (bids) to run. "
+        "This only applies to demand response, while --max-iter applies to every level "
+        "of iteration; if both are given, iteration stops at whichever limit is reached first.")
+    argparser.add_argument("--dr-max-active-bids", type=int, default=None,
+        help="Maximum number of bids for each load zone and timeseries to keep active in the model. "
+        "When there are more than this, bids that have not been used for --dr-bid-idle-iterations "
+        "iterations are removed from the optimization (oldest first). They are still included "
+        "in the reported results.")
+    argparser.add_argument("--dr-bid-cache", default=None,
+        help="Directory for sharing demand response bids between scenarios. At the end of "
+        "each run, the active bids are saved in this directory, and later runs with the same "
+        "load zones and timeseries start with those bids instead of only the base-price bid.")
+    argparser.add_argument("--dr-bid-idle-iterations", type=int, default=3,
+        help="Number of iterations a bid must go unused before it can be removed from the "
+        "optimization due to --dr-max-active-bids (default is 3).")
 
 def define_components(m):
 
@@ -86,12 +113,11 @@ def define_components(m):
     ##################
     
     # list of all bids that have been received from the demand system
+    # Bids are added to the model as new columns (DRBidWeight[b, lz, ts]) in the 
+    # constraints below, which are then updated in place (see add_bid_columns()). 
+    # Energy_Balance and the system cost refer to the FlexibleDemand and DR_Welfare_Cost 
+    # variables, so they don't change when bids are added, and keep their dual values.
     m.DR_BID_LIST = Set(initialize = [], ordered=True)
-    # we need an explicit indexing set for everything that depends on DR_BID_LIST
-    # so we can reconstruct it (and them) each time we add an element to DR_BID_LIST
-    # (not needed, and actually doesn't work -- reconstruct() fails for sets)
-    # m.DR_BIDS_LZ_TP = Set(initialize = lambda m: m.DR_BID_LIST * m.LOAD_ZONES * m.TIMEPOINTS)
-    # m.DR_BIDS_LZ_TS = Set(initialize = lambda m: m.DR_BID_LIST * m.LOAD_ZONES * m.TIMESERIES)
     
     # data for the individual bids; each load_zone gets one bid for each timeseries,
     # and each bid covers all the timepoints in that timeseries. So we just record 
@@ -105,16 +131,9 @@ def define_components(m):
     m.dr_bid_benefit = Param(m.DR_BID_LIST, m.LOAD_ZONES, m.TIMESERIES, mutable=True)
 
     # weights to assign to the bids for each timeseries when constructing an optimal demand profile
+    # (elements are added as new bids are received)
     m.DRBidWeight = Var(m.DR_BID_LIST, m.LOAD_ZONES, m.TIMESERIES, within=NonNegativeReals)
     
-    # def DR_Convex_Bid_Weight_rule(m, lz, ts):
-    #     if len(m.DR_BID_LIST) == 0:
-    #         print "no items in m.DR_BID_LIST, skipping DR_Convex_Bid_Weight constraint"
-    #         return Constraint.Skip
-    #     else:
-    #         print "constructing DR_Convex_Bid_Weight constraint"
-    #         return (sum(m.DRBidWeight[b, lz, ts] for b in m.DR_BID_LIST) == 1)
-    # 
     # choose a convex combination of bids for each zone and timeseries
     m.DR_Convex_Bid_Weight = Constraint(m.LOAD_ZONES, m.TIMESERIES, rule=lambda m, lz, ts: 
         Constraint.Skip if len(m.DR_BID_LIST) == 0 
@@ -143,9 +162,11 @@ def define_components(m):
                 
     
     # Optimal level of demand, calculated from available bids (negative, indicating consumption)
-    m.FlexibleDemand = Expression(m.LOAD_ZONES, m.TIMEPOINTS, 
+    m.FlexibleDemand = Var(m.LOAD_ZONES, m.TIMEPOINTS)
+    m.DR_Flexible_Demand_Def = Constraint(m.LOAD_ZONES, m.TIMEPOINTS, 
         rule=lambda m, lz, tp:
-            sum(m.DRBidWeight[b, lz, m.tp_ts[tp]] * m.dr_bid[b, lz, tp] for b in m.DR_BID_LIST)
+            m.FlexibleDemand[lz, tp] 
+            == sum(m.DRBidWeight[b, lz, m.tp_ts[tp]] * m.dr_bid[b, lz, tp] for b in m.DR_BID_LIST)
     )
 
     # # FlexibleDemand reported as an adjustment (negative equals more demand)
@@ -160,8 +181,10 @@ def define_components(m):
     # reported as negative cost, i.e., positive benefit
     # also divide by number of timepoints in the timeseries
     # to convert from a cost per timeseries to a cost per timepoint.
-    m.DR_Welfare_Cost = Expression(m.TIMEPOINTS, rule=lambda m, tp:
-        (-1.0) 
+    m.DR_Welfare_Cost = Var(m.TIMEPOINTS)
+    m.DR_Welfare_Cost_Def = Constraint(m.TIMEPOINTS, rule=lambda m, tp:
+        m.DR_Welfare_Cost[tp] 
+        == (-1.0) 
         * sum(m.DRBidWeight[b, lz, m.tp_ts[tp]] * m.dr_bid_benefit[b, lz, m.tp_ts[tp]] 
             for b in m.DR_BID_LIST for lz in m.LOAD_ZONES) 
         * m.tp_duration_hrs[tp] / m.ts_num_tps[m.tp_ts[tp]]
@@ -178,28 +201,46 @@ def define_components(m):
     # variable to store the baseline data
     m.base_data = None
 
+    # number of iterations used by the run that created the bids loaded from 
+    # --dr-bid-cache (if any)
+    m.dr_cached_run_iterations = None
+
+    # number of consecutive iterations in which each active bid has not been used
+    # (bids are removed from this dict when they are pruned)
+    m.dr_bid_idle_iterations = dict()
+
+def pre_iterate(m):
+    # send iteration-time output to a background thread if requested;
+    # this is flushed by switch_mod.utilities.post_solve()
+    if m.options.dr_output_queue_depth > 0:
+        utilities.start_background_writer(m.options.dr_output_queue_depth)
+    return True
+
 def post_iterate(m):
     print "\n\n======================================================="
     print "Solved model"
     print "======================================================="
     print "Total cost: ${v:,.0f}".format(v=value(m.SystemCost))
-    print "marginal costs (first day):"
-    print [
-        electricity_marginal_cost(m, lz, tp) 
-            for lz in m.LOAD_ZONES
-                for tp in m.TS_TPS[m.TIMESERIES[1]]
-    ]
-    print "marginal costs (second day):"
-    print [
-        electricity_marginal_cost(m, lz, tp) 
-            for lz in m.LOAD_ZONES
-                for tp in m.TS_TPS[m.TIMESERIES[2]]
-    ]
+    util.queue_log(
+        "marginal costs (first day):\n{}\n".format([
+            electricity_marginal_cost(m, lz, tp) 
+                for lz in m.LOAD_ZONES
+                    for tp in m.TS_TPS[m.TIMESERIES[1]]
+        ])
+        + "marginal costs (second day):\n{}\n".format([
+            electricity_marginal_cost(m, lz, tp) 
+                for lz in m.LOAD_ZONES
+                    for tp in m.TS_TPS[m.TIMESERIES[2]]
+        ])
+    )
 
     # if m.iteration_number % 5 == 0:
     #     # save time by only writing results every 5 iterations
     # write_results(m)
 
+    # drop unused bids from the optimization, if needed
+    prune_bids(m)
+
     # Retrieve SystemCost before calling update_demand()
     # because that breaks SystemCost until the next solve
     old_SystemCost = getattr(m, "last_SystemCost", None)
@@ -245,9 +286,60 @@ def post_iterate(m):
 
     # Check for convergence (no progress during the last iteration)
     converged = (m.iteration_number > 0 and new_SystemCost == old_SystemCost)
+    if m.iteration_number > 0 and m.options.dr_convergence_gap is not None:
+        gap = (current_cost - best_cost) / abs(best_cost)
+        print "optimality gap={}".format(gap)
+        if gap <= m.options.dr_convergence_gap:
+            converged = True
+    # note: solve.iterate() also stops after --max-iter iterations (at every level),
+    # so the lower of the two limits takes effect
+    if m.options.dr_max_iterations is not None \
+            and m.iteration_number + 1 >= m.options.dr_max_iterations:
+        print "Reached the maximum number of demand response iterations."
+        converged = True
         
     return converged
 
+def prune_bids(m):
+    """
+    Update the count of iterations in which each active bid has not been used
+    (i.e., had zero weight in every load zone and timeseries). Then, if there are more 
+    than m.options.dr_max_active_bids active bids, remove the oldest bids that have not 
+    been used for m.options.dr_bid_idle_iterations iterations from the optimization. 
+    This is done by fixing their weights at zero, so they drop out of the LP, but 
+    remain in DR_BID_LIST, dr_bid and dr_bid_benefit for reporting.
+    This should be called after solving the model, before adding new bids.
+    """
+    for b in m.dr_bid_idle_iterations:
+        if any(
+            value(m.DRBidWeight[b, lz, ts]) > 1e-9
+                for lz in m.LOAD_ZONES for ts in m.TIMESERIES
+        ):
+            m.dr_bid_idle_iterations[b] = 0
+        else:
+            m.dr_bid_idle_iterations[b] += 1
+
+    max_bids = m.options.dr_max_active_bids
+    if max_bids is None or len(m.dr_bid_idle_iterations) <= max_bids:
+        return
+    idle_bids = [
+        b for b in m.DR_BID_LIST    # oldest first
+            if m.dr_bid_idle_iterations.get(b, 0) >= m.options.dr_bid_idle_iterations
+    ]
+    pruned = idle_bids[:len(m.dr_bid_idle_iterations) - max_bids]
+    for b in pruned:
+        del m.dr_bid_idle_iterations[b]
+        for lz in m.LOAD_ZONES:
+            for ts in m.TIMESERIES:
+                m.DRBidWeight[b, lz, ts].fix(0)
+                # the bid-specific constraints are now trivial (0 == 0)
+                m.DR_Load_Zone_Shared_Bid_Weight[b, lz, ts].deactivate()
+                if m.options.dr_flat_pricing:
+                    m.DR_Flat_Bid_Weight[b, lz, ts].deactivate()
+    if pruned:
+        print "removed idle bids {} from the model; {} bids remain active.".format(
+            pruned, len(m.dr_bid_idle_iterations))
+
 def update_demand(m):
     """
     This should be called after solving the model, in order to calculate new bids
@@ -262,8 +354,10 @@ def update_demand(m):
     print "attaching new demand bid to model"
     if first_run:
         calibrate_model(m)
+        if m.options.dr_bid_cache is not None:
+            load_bid_cache(m)
 
-        util.create_table(
+        util.create_table(m,
             output_file=os.path.join(outputs_dir, "bid_weights_{t}.tsv".format(t=tag)), 
             headings=("iteration", "load_zone", "timeseries", "bid_num", "weight")
         )
@@ -273,10 +367,11 @@ def update_demand(m):
         #     for b in m.DR_BID_LIST
         #     for lz in m.LOAD_ZONES
         #     for ts in m.TIMESERIES]
-        print "m.DRBidWeight:"
-        pprint([(lz, ts, [(b, value(m.DRBidWeight[b, lz, ts])) for b in m.DR_BID_LIST])
-            for lz in m.LOAD_ZONES
-            for ts in m.TIMESERIES])
+        util.queue_log("m.DRBidWeight:\n" + pformat(
+            [(lz, ts, [(b, value(m.DRBidWeight[b, lz, ts])) for b in m.DR_BID_LIST])
+                for lz in m.LOAD_ZONES
+                for ts in m.TIMESERIES]
+        ) + "\n")
         #print "DR_Convex_Bid_Weight:"
         #m.DR_Convex_Bid_Weight.pprint()
 
@@ -295,11 +390,12 @@ def update_demand(m):
     # pprint(bids[0])
     # add the new bids to the model
     add_bids(m, bids)
-    print "m.dr_bid_benefit (first day):"
-    pprint([(b, lz, ts, value(m.dr_bid_benefit[b, lz, ts])) 
-        for b in m.DR_BID_LIST
-        for lz in m.LOAD_ZONES
-        for ts in [m.TIMESERIES.first()]])
+    util.queue_log("m.dr_bid_benefit (first day):\n" + pformat(
+        [(b, lz, ts, value(m.dr_bid_benefit[b, lz, ts])) 
+            for b in m.DR_BID_LIST
+            for lz in m.LOAD_ZONES
+            for ts in [m.TIMESERIES.first()]]
+    ) + "\n")
     
     # print "m.dr_bid (first day):"
     # print [(b, lz, ts, value(m.dr_bid[b, lz, ts]))
@@ -347,9 +443,24 @@ def total_direct_costs_per_year(m, period):
         )
     )    
 
+def electricity_marginal_costs(m):
+    """Return a dict of marginal costs of production per MWh, indexed by
+    [load_zone, timepoint]. Raise an error if any are unavailable (e.g., if
+    the solver didn't return dual values), rather than pricing bids at nan."""
+    costs = marginal_costs(m)
+    missing = sorted(k for (k, v) in costs.iteritems() if v is None)
+    if missing:
+        raise RuntimeError(
+            "Unable to calculate demand response prices: no dual value was "
+            "found for Energy_Balance{} (and {} other load zone/timepoint pairs). "
+            "Make sure the model is solved as an LP and the solver returns dual values."
+            "".format(list(missing[0]), len(missing) - 1)
+        )
+    return costs
+
 def electricity_marginal_cost(m, lz, tp):
     """Return marginal cost of production per MWh in load_zone lz during timepoint tp."""
-    return m.dual[m.Energy_Balance[lz, tp]]/m.bring_timepoint_costs_to_base_year[tp]
+    return electricity_marginal_costs(m)[lz, tp]
 
 def electricity_demand(m, lz, tp):
     """Return total electricity consumption by customers in load_zone lz during timepoint tp."""
@@ -359,71 +470,78 @@ def electricity_demand(m, lz, tp):
                 if component in m.LZ_Energy_Components_Consume
     ))
     
+def timepoint_array(m, values):
+    """Arrange values indexed by [lz, tp] into an array with dimensions 
+    (load zone, timepoint), following the order of m.LOAD_ZONES and m.TIMEPOINTS."""
+    return np.array(
+        [[values[lz, tp] for tp in m.TIMEPOINTS] for lz in m.LOAD_ZONES], float
+    )
+
 def make_prices(m):
     """Calculate hourly prices for customers, based on the current model configuration.
     These may be any combination of marginal vs. total-cost and flat vs. dynamic.
+    Prices are returned as an array with dimensions (load zone, timepoint);
+    see timepoint_array().
     """
+    # gather all the data as arrays, then do the calculations for all zones and 
+    # timepoints at once
+    marginal_cost = timepoint_array(m, electricity_marginal_costs(m))
+    demand = timepoint_array(m, electricity_demands(m))
+    weight = np.array([m.tp_weight_in_year[tp] for tp in m.TIMEPOINTS], float)
+    periods = list(m.PERIODS)
+    tp_period = np.array([periods.index(m.tp_period[tp]) for tp in m.TIMEPOINTS])
+    weighted_demand = demand * weight
+
+    def sum_by_period(a):
+        """Sum an array with dimensions (load zone, timepoint) over the timepoints
+        in each period, returning an array with dimensions (load zone, period)."""
+        return np.array([a[:, tp_period == i].sum(axis=1) for i in range(len(periods))]).T
 
     if m.options.dr_total_cost_pricing:
         # rescale (long-run) marginal costs to recover all costs 
         # (sunk and other, in addition to marginal)
         # calculate the ratio between potential revenue 
         # at marginal-cost pricing and total costs for each period
-        mc_annual_revenue = {
-            (lz, p): 
-            sum(
-                electricity_demand(m, lz, tp) 
-                * electricity_marginal_cost(m, lz, tp) 
-                * m.tp_weight_in_year[tp]
-                for tp in m.PERIOD_TPS[p]
-            )
-            for lz in m.LOAD_ZONES for p in m.PERIODS
-        }
+        mc_annual_revenue = sum_by_period(weighted_demand * marginal_cost)
         # note: it would be nice to do this on a zonal basis, but production costs
         # are only available model-wide.
-        price_scalar = {
-            p: total_direct_costs_per_year(m, p) 
-                / sum(mc_annual_revenue[lz, p] for lz in m.LOAD_ZONES) 
-            for p in m.PERIODS
-        }
+        # (raise an error rather than silently producing inf or nan prices)
+        with np.errstate(divide='raise', invalid='raise'):
+            price_scalar = np.array([
+                total_direct_costs_per_year(m, p) for p in periods
+            ]) / mc_annual_revenue.sum(axis=0)
     else:
         # use marginal costs directly as prices
-        price_scalar = {p: 1.0 for p in m.PERIODS}
+        price_scalar = np.ones(len(periods))
         
     # calculate hourly prices
-    hourly_prices = {
-        (lz, tp): price_scalar[m.tp_period[tp]] * electricity_marginal_cost(m, lz, tp)
-            for lz in m.LOAD_ZONES for tp in m.TIMEPOINTS
-    }
+    prices = price_scalar[tp_period] * marginal_cost
     
     if m.options.dr_flat_pricing:
         # use flat prices each year
         # calculate annual average prices (total revenue / total kWh)
-        average_prices = {
-            (lz, p): 
-            sum(
-                hourly_prices[lz, tp] 
-                * electricity_demand(m, lz, tp) 
-                * m.tp_weight_in_year[tp] 
-                for tp in m.PERIOD_TPS[p]
-            ) 
-            / 
-            sum(
-                electricity_demand(m, lz, tp) 
-                * m.tp_weight_in_year[tp] 
-                for tp in m.PERIOD_TPS[p]
+        with np.errstate(divide='raise', invalid='raise'):
+            average_prices = (
+                sum_by_period(prices * weighted_demand) / sum_by_period(weighted_demand)
             )
-            for lz in m.LOAD_ZONES for p in m.PERIODS
-        }
-        prices = {
-            (lz, tp): average_prices[lz, m.tp_period[tp]]
-            for lz in m.LOAD_ZONES for tp in m.TIMEPOINTS
-        }
-    else:
-        prices = hourly_prices
+        prices = average_prices[:, tp_period]
     
     return prices
 
+def electricity_demands(m):
+    """Return a dict of total electricity consumption by customers in each load zone 
+    and timepoint, with the same values as electricity_demand()."""
+    from switch_mod.utilities import get_values
+    components = [
+        get_values(m, getattr(m, c))
+            for c in ('lz_demand_mw', 'FlexibleDemand')
+                if c in m.LZ_Energy_Components_Consume
+    ]
+    return {
+        (lz, tp): sum(c[lz, tp] for c in components)
+            for lz in m.LOAD_ZONES for tp in m.TIMEPOINTS
+    }
+
 annual_revenue = None
 
 def calibrate_model(m):
@@ -475,46 +593,63 @@ def calibrate_model(m):
     # calibrate the demand module
     demand_module.calibrate(m.base_data, m.options.dr_elasticity_scenario)
 
-    # note: SystemCostPerPeriod and SystemCost will get reconstructed
-    # in add_bids later in the first iteration, so there's no need to reconstruct them here.
+    # note: other_costs is a mutable parameter, so there's no need to reconstruct 
+    # SystemCostPerPeriod and SystemCost here.
 
 
 def get_bids(m):
     """Get bids for loads and willingness-to-pay from the demand system at the current prices.
     
     Each bid is a tuple of (load_zone, timeseries, [hourly prices], [hourly demand], wtp)
-    """
-
-    bids = []
-    all_prices = make_prices(m)
-
 
-    for i, (lz, ts, base_load, base_price) in enumerate(m.base_data):
-        
-        # if i < 2:
-        #     print "prices (day {i}): {p}".format(i=i, p=prices)
-        #     print "weights: {w}".format(w=[m.bring_timepoint_costs_to_base_year[tp] for tp in m.TS_TPS[ts]])
-
-        prices = [all_prices[(lz, tp)] for tp in m.TS_TPS[ts]]
-        
-        demand, wtp = demand_module.bid(lz, ts, prices)
+    If the demand module provides a bid_all(prices) function and all timeseries have 
+    the same number of timepoints, bid_all() is called once with an array of prices with 
+    dimensions (load zone, timeseries, hour), in the same order as m.base_data. It should 
+    return an array of demand (same shape as prices) and an array of wtp (one value per 
+    load zone and timeseries). Otherwise, the demand module's bid() function is called 
+    separately for each load zone and timeseries.
+    """
 
-        bids.append((lz, ts, prices, demand, wtp))
+    return get_bids_at_prices(m, make_prices(m))
+
+def get_bids_at_prices(m, all_prices):
+    """Get bids from the demand system for an array of prices with dimensions
+    (load zone, timepoint), as returned by make_prices(). See get_bids()."""
+    # positions of the timepoints in each timeseries within the price array
+    tp_pos = {tp: i for i, tp in enumerate(m.TIMEPOINTS)}
+    ts_pos = [[tp_pos[tp] for tp in m.TS_TPS[ts]] for ts in m.TIMESERIES]
+
+    if hasattr(demand_module, 'bid_all') and len(set(len(tps) for tps in ts_pos)) == 1:
+        # (load zone, timeseries, hour) array of prices
+        prices = all_prices[:, np.array(ts_pos)]
+        all_demand, all_wtp = demand_module.bid_all(prices)
+        return [
+            (lz, ts, list(prices[i, j]), list(all_demand[i, j]), all_wtp[i, j])
+                for i, lz in enumerate(m.LOAD_ZONES)
+                    for j, ts in enumerate(m.TIMESERIES)
+        ]
 
-        # if i < 2:
-        #     import pdb; pdb.set_trace()
+    bids = []
+    for i, lz in enumerate(m.LOAD_ZONES):
+        for j, ts in enumerate(m.TIMESERIES):
+            prices = list(all_prices[i, ts_pos[j]])
+            demand, wtp = demand_module.bid(lz, ts, prices)
+            bids.append((lz, ts, prices, demand, wtp))
 
     return bids
     
 
-def add_bids(m, bids):
+def add_bids(m, bids, write_iteration_results=True):
     """ 
     accept a list of bids written as tuples like
     (lz, ts, prices, demand, wtp)
     where lz is the load zone, ts is the timeseries, 
     demand is a list of demand levels for the timepoints during that series, 
     and wtp is the private benefit from consuming the amount of power in that bid.
-    Then add that set of bids to the model
+    Then add that set of bids to the model.
+    If write_iteration_results is False (e.g., for bids loaded from the bid cache), 
+    the bid is recorded in the bid table but the results and summary tables for 
+    the current iteration are not written.
     """
     # create a bid ID and add it to the list of bids
     if len(m.DR_BID_LIST) == 0:
@@ -526,6 +661,7 @@ def add_bids(m, bids):
     outputs_dir = m.options.outputs_dir
     
     m.DR_BID_LIST.add(b)
+    m.dr_bid_idle_iterations[b] = 0
     # m.DR_BIDS_LZ_TP.reconstruct()
     # m.DR_BIDS_LZ_TS.reconstruct()
     # add the bids for each load zone and timepoint to the dr_bid list
@@ -551,9 +687,9 @@ def add_bids(m, bids):
 
     # store bid information for later reference
     # this has to be done after the model is updated and
-    # before DRBidWeight is reconstructed (which destroys the duals)
-    if b == 1:
-        util.create_table(
+    # before the new columns are added (which invalidates the current solution)
+    if len(m.DR_BID_LIST) == 1:
+        util.create_table(m,
             output_file=os.path.join(outputs_dir, "bid_{t}.tsv".format(t=tag)), 
             headings=(
                 "bid_num", "load_zone", "timeseries", "timepoint", "marginal_cost", "price", 
@@ -576,23 +712,113 @@ def add_bids(m, bids):
         )
     )
 
-    write_results(m)
-    write_batch_results(m)
-
-    # reconstruct the components that depend on m.DR_BID_LIST, m.dr_bid_benefit and m.dr_bid
-    m.DRBidWeight.reconstruct()
-    m.DR_Convex_Bid_Weight.reconstruct()
-    m.FlexibleDemand.reconstruct()
-    m.DR_Welfare_Cost.reconstruct()
-    # it seems like we have to reconstruct the higher-level components that depend on these 
-    # ones (even though these are Expressions), because otherwise they refer to objects that
-    # used to be returned by the Expression but aren't any more (e.g., versions of DRBidWeight 
-    # that no longer exist in the model).
-    # (i.e., Energy_Balance refers to the items returned by FlexibleDemand instead of referring 
-    # to FlexibleDemand itself)
-    reconstruct_energy_balance(m)
-    m.SystemCostPerPeriod.reconstruct()
-    m.SystemCost.reconstruct()
+    if write_iteration_results:
+        write_results(m)
+        write_batch_results(m)
+
+    add_bid_columns(m, b)
+
+def bid_cache_file(m):
+    """Return the name of the file in the --dr-bid-cache directory that holds bids 
+    for models with the same load zones, timeseries and timepoints as m."""
+    structure = repr([
+        (str(lz), str(ts), [str(tp) for tp in m.TS_TPS[ts]]) 
+            for lz in sorted(m.LOAD_ZONES) for ts in m.TIMESERIES
+    ])
+    key = hashlib.md5(structure).hexdigest()[:16]
+    return os.path.join(m.options.dr_bid_cache, "dr_bids_{}.pickle".format(key))
+
+def save_bid_cache(m):
+    """Save the active bids in the --dr-bid-cache directory, for use by later runs."""
+    active_bids = [b for b in m.DR_BID_LIST if b in m.dr_bid_idle_iterations]
+    bids = [
+        [
+            (lz, ts, 
+                [value(m.dr_price[b, lz, tp]) for tp in m.TS_TPS[ts]], 
+                [value(m.dr_bid[b, lz, tp]) for tp in m.TS_TPS[ts]], 
+                value(m.dr_bid_benefit[b, lz, ts]))
+                for lz in m.LOAD_ZONES for ts in m.TIMESERIES
+        ]
+            for b in active_bids
+    ]
+    iterations = m.iteration_number + 1
+    if m.dr_cached_run_iterations is not None:
+        # report savings relative to the run that started without cached bids
+        iterations = max(iterations, m.dr_cached_run_iterations)
+    if not os.path.isdir(m.options.dr_bid_cache):
+        os.makedirs(m.options.dr_bid_cache)
+    # write to a temporary file, then rename it, so other runs sharing the cache
+    # never see a partially written file
+    cache_file = bid_cache_file(m)
+    fd, temp_file = tempfile.mkstemp(dir=m.options.dr_bid_cache, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        pickle.dump({'iterations': iterations, 'bids': bids}, f, pickle.HIGHEST_PROTOCOL)
+    if os.name == 'nt' and os.path.exists(cache_file):
+        # os.rename() can't replace an existing file on Windows
+        os.remove(cache_file)
+    os.rename(temp_file, cache_file)
+    print "saved {} bids in {}.".format(len(bids), cache_file)
+
+def load_bid_cache(m):
+    """Add bids saved by an earlier run with the same load zones and timeseries 
+    (if any) to the model. The demand and willingness to pay in the cached bids 
+    may have come from a different demand system (e.g., another elasticity scenario),
+    so only the cached prices are used; the bids are recalculated for these prices 
+    by the current demand system."""
+    cache_file = bid_cache_file(m)
+    if not os.path.exists(cache_file):
+        print "no cached bids found for this model in {}.".format(m.options.dr_bid_cache)
+        return
+    with open(cache_file, 'rb') as f:
+        cache = pickle.load(f)
+    for cached_bids in cache['bids']:
+        prices = {
+            (lz, tp): p
+                for (lz, ts, ts_prices, demand, wtp) in cached_bids
+                    for (tp, p) in zip(m.TS_TPS[ts], ts_prices)
+        }
+        bids = get_bids_at_prices(m, timepoint_array(m, prices))
+        add_bids(m, bids, write_iteration_results=False)
+    m.dr_cached_run_iterations = cache['iterations']
+    print "loaded {} bids from {} (the run that created them used {} iterations).".format(
+        len(cache['bids']), cache_file, cache['iterations'])
+
+def post_solve(m, outputs_dir):
+    if m.options.dr_bid_cache is not None and m.base_data is not None:
+        if m.dr_cached_run_iterations is not None:
+            saved = m.dr_cached_run_iterations - (m.iteration_number + 1)
+            print (
+                "demand response used {} iterations, starting from cached bids; "
+                "{} fewer than the run that created the cache."
+            ).format(m.iteration_number + 1, saved)
+        save_bid_cache(m)
+
+def add_bid_columns(m, b):
+    """
+    Add bid b to the model as a new set of columns, DRBidWeight[b, lz, ts]. This 
+    regenerates the rows of the constraints that refer to all bids (in place) and adds 
+    rows for b to the constraints that are indexed by bid. Other components, such as 
+    Energy_Balance and SystemCost, only refer to FlexibleDemand and DR_Welfare_Cost, 
+    so they don't need to be reconstructed, and their dual values are preserved.
+    """
+    for c in [m.DR_Convex_Bid_Weight, m.DR_Flexible_Demand_Def, m.DR_Welfare_Cost_Def]:
+        update_constraint_rows(m, c, c.index_set())
+    new_bid_rows = [(b, lz, ts) for lz in m.LOAD_ZONES for ts in m.TIMESERIES]
+    update_constraint_rows(m, m.DR_Load_Zone_Shared_Bid_Weight, new_bid_rows)
+    if m.options.dr_flat_pricing:
+        update_constraint_rows(m, m.DR_Flat_Bid_Weight, new_bid_rows)
+
+def update_constraint_rows(m, constraint, indexes):
+    """Regenerate the specified rows of an indexed constraint from its rule, 
+    modifying existing rows in place and adding any new ones."""
+    for idx in indexes:
+        expr = constraint.rule(m, *idx) if isinstance(idx, tuple) else constraint.rule(m, idx)
+        if expr is Constraint.Skip:
+            continue
+        if idx in constraint:
+            constraint[idx].set_value(expr)
+        else:
+            constraint.add(idx, expr)
 
 def reconstruct_energy_balance(m):
     """Reconstruct Energy_Balance constraint, preserving dual values (if present)."""
@@ -613,8 +839,12 @@ def write_batch_results(m):
     # but this means it needs to be manually cleared before launching a new 
     # batch of scenarios (e.g., when running get_scenario_data or clearing the
     # scenario_queue directory)
-    if not os.path.isfile(output_file):
-        util.create_table(output_file=output_file, headings=summary_headers(m))
+    # note: we only check once, because the file may not have been created
+    # yet if output is being written on a background thread.
+    if not getattr(m, 'dr_summary_file_ready', False):
+        if not os.path.isfile(output_file):
+            util.create_table(m, output_file=output_file, headings=summary_headers(m))
+        m.dr_summary_file_ready = True
     
     util.append_table(m, output_file=output_file, values=lambda m: summary_values(m))
 
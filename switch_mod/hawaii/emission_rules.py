@@ -8,14 +8,16 @@ def define_components(m):
     # TODO: move this set into a parameter list in fuels.tab, e.g, 'banned_after', which can be a year or NULL
     m.FUEL_BANS = Set(dimen=2, initialize=[('LSFO', 2017)])
     
-    m.BANNED_FUEL_DISPATCH_POINTS = Set(dimen=3, initialize=lambda m: 
-        [(pr, tp, f) 
+    # production from each fuel is non-negative, so we can ban a fuel by
+    # zeroing its total production in each period
+    m.BANNED_FUEL_DISPATCH_PERIODS = Set(dimen=3, initialize=lambda m:
+        [(pr, pe, f)
             for (f, y) in m.FUEL_BANS
-                for pr in m.PROJECTS_BY_FUEL[f] # if not m.g_is_cogen[m.proj_gen_tech[pr]]
-                    for pe in m.PERIODS if m.period_end[pe] >= y
-                        for tp in m.PERIOD_TPS[pe] if (pr, tp) in m.PROJ_DISPATCH_POINTS
+                for pe in m.PERIODS if m.period_end[pe] >= y
+                    for (pr, pf) in m.PROJ_FUELS_ACTIVE_IN_PERIOD[pe]
+                        if pf == f # and not m.g_is_cogen[m.proj_gen_tech[pr]]
         ]
     )
-    m.ENFORCE_FUEL_BANS = Constraint(m.BANNED_FUEL_DISPATCH_POINTS, rule = lambda m, pr, tp, f:
-        m.DispatchProjByFuel[pr, tp, f] == 0
+    m.ENFORCE_FUEL_BANS = Constraint(m.BANNED_FUEL_DISPATCH_PERIODS, rule = lambda m, pr, pe, f:
+        m.ProjEnergyByFuelInPeriod[pr, pe, f] == 0
     )
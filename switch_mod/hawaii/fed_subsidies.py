@@ -21,15 +21,17 @@ def define_components(m):
     m.NEW_PROJECTS = Set(initialize=lambda m: set(p for (p, y) in m.NEW_PROJ_BUILDYEARS))
     
     # model the wind production tax credit 
-    m.Wind_Subsidy_Hourly = Expression(
-        m.TIMEPOINTS,
-        rule=lambda m, t: -wind_prod_tax_credit * sum(
-            m.DispatchProj[p, t] 
-                for p in m.PROJECTS_BY_NON_FUEL_ENERGY_SOURCE[wind_energy_source]
-                    if p in m.NEW_PROJECTS and (p, t) in m.PROJ_DISPATCH_POINTS
-        )
+    # (total credit during each period, divided by the number of years in the period)
+    m.Wind_Subsidy_Annual = Expression(
+        m.PERIODS,
+        rule=lambda m, pe: -wind_prod_tax_credit * sum(
+            m.ProjEnergyInPeriod[p, pe]
+                for p in m.PROJECTS_ACTIVE_IN_PERIOD[pe]
+                    if p in m.NEW_PROJECTS
+                        and m.g_energy_source[m.proj_gen_tech[p]] == wind_energy_source
+        ) / m.period_length_years[pe]
     )
-    m.cost_components_tp.append('Wind_Subsidy_Hourly')
+    m.cost_components_annual.append('Wind_Subsidy_Annual')
     
     # model the solar tax credit as simply prorating the annual capital cost
     m.Solar_Credit_Annual = Expression(m.PERIODS, rule=lambda m, pe: 
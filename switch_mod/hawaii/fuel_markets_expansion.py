@@ -9,10 +9,23 @@
 # Later we may add a more complete capital cost system.
 
 import os
+from collections import defaultdict
 from pyomo.environ import *
 
 inf = float('inf')
 
+def define_arguments(argparser):
+    argparser.add_argument('--order-rfm-tiers', action='store_true', default=False,
+        help="Activate the limited supply tiers in each regional fuel market in order of cost "
+            "(cheapest first). This removes many equivalent or dominated combinations of tiers "
+            "from the search, but excludes plans that skip a cheap tier with high fixed costs.")
+    argparser.add_argument('--persist-rfm-tiers', action='store_true', default=False,
+        help="Once a limited supply tier has been activated, keep it active in all later periods.")
+    argparser.add_argument('--rfm-tier-sos', action='store_true', default=False,
+        help="Declare an SOS1 constraint on the highest active tier in each regional fuel market "
+            "and period, to guide the solver's branching (implies --order-rfm-tiers; "
+            "the solver must support SOS constraints).")
+
 def define_components(m):
 
     # eventually this should be extended to include capital costs and fixed lifetimes
@@ -64,17 +77,92 @@ def define_components(m):
     # of binary variables and constraining the actual decisions to match the binary
     # version if some flag is set in the data.
 
+    # limited supply tiers in each market and period, in order of cost (cheapest first);
+    # this is built in one pass through RFM_SUPPLY_TIERS, then used for the cost 
+    # calculation and the optional ordering constraints below
+    m.RFM_P_LIMITED_TIERS_BY_COST = Set(m.REGIONAL_FUEL_MARKET, m.PERIODS, ordered=True,
+        initialize=lambda m, r, p: [])
+    def RFM_P_LIMITED_TIERS_BY_COST_rule(m):
+        tiers = defaultdict(list)
+        for r, p, st in m.RFM_SUPPLY_TIERS:
+            if m.rfm_supply_tier_limit[r, p, st] < inf:
+                tiers[r, p].append(st)
+        for (r, p), st_list in tiers.iteritems():
+            for st in sorted(st_list, key=lambda st: (m.rfm_supply_tier_cost[r, p, st], st)):
+                m.RFM_P_LIMITED_TIERS_BY_COST[r, p].add(st)
+    m.RFM_P_LIMITED_TIERS_BY_COST_Build = BuildAction(rule=RFM_P_LIMITED_TIERS_BY_COST_rule)
+
+    # note: we skip tiers with unlimited supply, which must have 0.0 fixed cost
     m.RFM_Fixed_Costs_Annual = Expression(
         m.PERIODS,
         rule=lambda m, p: sum(
-            (
-                # note: we dance around projects with unlimited supply and 0.0 fixed cost
-                0.0 if m.rfm_supply_tier_fixed_cost[rfm_st] == 0.0 
-                else m.rfm_supply_tier_fixed_cost[rfm_st]
-                    * m.RFMSupplyTierActivate[rfm_st] * m.rfm_supply_tier_limit[rfm_st]
-            )
+            m.rfm_supply_tier_fixed_cost[r, p, st]
+                * m.RFMSupplyTierActivate[r, p, st] * m.rfm_supply_tier_limit[r, p, st]
             for r in m.REGIONAL_FUEL_MARKET
-                for rfm_st in m.RFM_P_SUPPLY_TIERS[r, p]))
+                for st in m.RFM_P_LIMITED_TIERS_BY_COST[r, p]
+                    if m.rfm_supply_tier_fixed_cost[r, p, st] != 0.0
+        )
+    )
+
+    # optionally activate limited tiers in order of cost (cheapest first). Unlimited tiers
+    # are always active, so they are not included. Fuel is always drawn from the cheapest
+    # active tiers first, so this only excludes plans that leave out a cheap tier because 
+    # of its fixed cost.
+    if m.options.order_rfm_tiers or m.options.rfm_tier_sos:
+        def Order_RFM_Supply_Tier_Activation_rule(m, r, p, st):
+            if m.rfm_supply_tier_limit[r, p, st] == inf:
+                return Constraint.Skip
+            tiers = m.RFM_P_LIMITED_TIERS_BY_COST[r, p]
+            pos = tiers.ord(st)
+            if pos == 1:
+                return Constraint.Skip
+            return m.RFMSupplyTierActivate[r, p, st] <= m.RFMSupplyTierActivate[r, p, tiers[pos - 1]]
+        m.Order_RFM_Supply_Tier_Activation = Constraint(
+            m.RFM_SUPPLY_TIERS, rule=Order_RFM_Supply_Tier_Activation_rule
+        )
+
+    # optionally keep limited tiers active once they have been activated
+    if m.options.persist_rfm_tiers:
+        def Persist_RFM_Supply_Tier_Activation_rule(m, r, p, st):
+            if m.rfm_supply_tier_limit[r, p, st] == inf or p == m.PERIODS.first():
+                return Constraint.Skip
+            prev_p = m.PERIODS.prev(p)
+            if (r, prev_p, st) not in m.RFM_SUPPLY_TIERS or m.rfm_supply_tier_limit[r, prev_p, st] == inf:
+                return Constraint.Skip
+            return m.RFMSupplyTierActivate[r, p, st] >= m.RFMSupplyTierActivate[r, prev_p, st]
+        m.Persist_RFM_Supply_Tier_Activation = Constraint(
+            m.RFM_SUPPLY_TIERS, rule=Persist_RFM_Supply_Tier_Activation_rule
+        )
+
+    # optionally identify the most expensive active tier in each market and period,
+    # and tell the solver that only one of these can be nonzero (SOS1). With ordered
+    # activation, this is the difference between the activation of each tier and the next.
+    if m.options.rfm_tier_sos:
+        m.RFM_LIMITED_SUPPLY_TIERS = Set(dimen=3, initialize=lambda m: [
+            (r, p, st) 
+                for r in m.REGIONAL_FUEL_MARKET for p in m.PERIODS
+                    for st in m.RFM_P_LIMITED_TIERS_BY_COST[r, p]
+        ])
+        m.RFMHighestActiveTier = Var(m.RFM_LIMITED_SUPPLY_TIERS, within=NonNegativeReals)
+        def Define_RFM_Highest_Active_Tier_rule(m, r, p, st):
+            tiers = m.RFM_P_LIMITED_TIERS_BY_COST[r, p]
+            pos = tiers.ord(st)
+            next_activate = 0 if pos == len(tiers) else m.RFMSupplyTierActivate[r, p, tiers[pos + 1]]
+            return (
+                m.RFMHighestActiveTier[r, p, st] 
+                == 
+                m.RFMSupplyTierActivate[r, p, st] - next_activate
+            )
+        m.Define_RFM_Highest_Active_Tier = Constraint(
+            m.RFM_LIMITED_SUPPLY_TIERS, rule=Define_RFM_Highest_Active_Tier_rule
+        )
+        m.RFM_Highest_Active_Tier_SOS = SOSConstraint(
+            m.REGIONAL_FUEL_MARKET, m.PERIODS, sos=1,
+            rule=lambda m, r, p:
+                [m.RFMHighestActiveTier[r, p, st] for st in m.RFM_P_LIMITED_TIERS_BY_COST[r, p]]
+                if len(m.RFM_P_LIMITED_TIERS_BY_COST[r, p]) > 1 
+                else SOSConstraint.Skip
+        )
 
     m.cost_components_annual.append('RFM_Fixed_Costs_Annual')
 
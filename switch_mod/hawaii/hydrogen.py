@@ -1,16 +1,10 @@
 import os
 from pyomo.environ import *
+import switch_mod.hawaii.storage as storage
 from switch_mod.financials import capital_recovery_factor as crf
 
 def define_components(m):
     
-    # make helper set identifying all timeseries in each period
-    if hasattr(m, "PERIOD_TS"):
-        print "DEPRECATION NOTE: PERIOD_TS is defined in hydrogen.py, but it already exists, so this can be removed."
-    else:
-        m.PERIOD_TS = Set(m.PERIODS, ordered=True, within=m.TIMESERIES, initialize=lambda m, p:
-            [ts for ts in m.TIMESERIES if m.ts_period[ts] == p])
-
     # electrolyzer details
     m.hydrogen_electrolyzer_capital_cost_per_mw = Param()
     m.hydrogen_electrolyzer_fixed_cost_per_mw_year = Param(default=0.0)
@@ -69,41 +63,25 @@ def define_components(m):
         m.DispatchFuelCellMW[z, t] / m.hydrogen_fuel_cell_mwh_per_kg
     )
 
-    # hydrogen mass balances
+    # hydrogen mass balances and limits on the electrolyzer and fuel cell (see storage.py)
     # note: this allows for buffering of same-day production and consumption 
-    # of hydrogen without ever liquifying it
-    m.Hydrogen_Conservation_of_Mass_Daily = Constraint(m.LOAD_ZONES, m.TIMESERIES, rule=lambda m, z, ts:
-        m.StoreLiquidHydrogenKg[z, ts] - m.WithdrawLiquidHydrogenKg[z, ts]
-        == 
-        m.ts_duration_of_tp[ts] * sum(
-            m.ProduceHydrogenKgPerHour[z, tp] - m.ConsumeHydrogenKgPerHour[z, tp] 
-            for tp in m.TS_TPS[ts]
-        )
-    )
-    m.Hydrogen_Conservation_of_Mass_Annual = Constraint(m.LOAD_ZONES, m.PERIODS, rule=lambda m, z, p:
-        sum(
-            (m.StoreLiquidHydrogenKg[z, ts] - m.WithdrawLiquidHydrogenKg[z, ts]) 
-                * m.ts_scale_to_year[ts]
-            for ts in m.PERIOD_TS[p]
-        ) == 0
+    # of hydrogen without ever liquifying it; the net production each day is
+    # liquified or withdrawn from the tank, and there must be enough tank capacity
+    # to hold _all_ the production each period (net of same-day consumption)
+    storage.register_storage(m, 'hydrogen',
+        assets='LOAD_ZONES',
+        charge='RunElectrolyzerMW', discharge='DispatchFuelCellMW',
+        charge_capacity='ElectrolyzerCapacityMW', discharge_capacity='FuelCellCapacityMW',
+        charge_efficiency='hydrogen_electrolyzer_kg_per_mwh',
+        discharge_efficiency='hydrogen_fuel_cell_mwh_per_kg',
+        balance='interday', energy_capacity='LiquidHydrogenTankCapacityKg',
+        interday_store='StoreLiquidHydrogenKg', interday_withdraw='WithdrawLiquidHydrogenKg'
     )
 
-    # limits on equipment
-    m.Max_Run_Electrolyzer = Constraint(m.LOAD_ZONES, m.TIMEPOINTS, rule=lambda m, z, t:
-        m.RunElectrolyzerMW[z, t] <= m.ElectrolyzerCapacityMW[z, m.tp_period[t]])
-    m.Max_Run_Fuel_Cell = Constraint(m.LOAD_ZONES, m.TIMEPOINTS, rule=lambda m, z, t:
-        m.DispatchFuelCellMW[z, t] <= m.FuelCellCapacityMW[z, m.tp_period[t]])
+    # limits on liquifier
     m.Max_Run_Liquifier = Constraint(m.LOAD_ZONES, m.TIMEPOINTS, rule=lambda m, z, t:
         m.LiquifyHydrogenKgPerHour[z, t] <= m.LiquifierCapacityKgPerHour[z, m.tp_period[t]])
     
-    # there must be enough storage to hold _all_ the production each period (net of same-day consumption)
-    # note: this assumes we cycle the system only once per year (store all energy, then release all energy)
-    # alternatives: allow monthly or seasonal cycling, or directly model the whole year with inter-day linkages
-    m.Max_Store_Liquid_Hydrogen = Constraint(m.LOAD_ZONES, m.PERIODS, rule=lambda m, z, p:
-        sum(m.StoreLiquidHydrogenKg[z, ts] * m.ts_scale_to_year[ts] for ts in m.PERIOD_TS[p])
-        <= m.LiquidHydrogenTankCapacityKg[z, p]
-    )
-    
     # add electricity consumption and production to the model
     m.LZ_Energy_Components_Consume.append('RunElectrolyzerMW')
     m.LZ_Energy_Components_Consume.append('LiquifyHydrogenMW')
@@ -136,7 +114,9 @@ def define_components(m):
     )
     m.cost_components_tp.append('HydrogenVariableCost')
     m.cost_components_annual.append('HydrogenFixedCostAnnual')
-    
+
+def define_dynamic_components(m):
+    storage.define_dynamic_components(m)
 
 
 def load_inputs(mod, switch_data, inputs_dir):
@@ -78,8 +78,7 @@ def define_components(m):
     
     # list of all projects and timepoints when LNG could potentially be used
     m.LNG_PROJECT_TIMEPOINTS = Set(dimen=2, initialize = lambda m: 
-        ((p, t) for p in m.PROJECTS_BY_FUEL['LNG'] for t in m.TIMEPOINTS 
-            if (p, t) in m.PROJ_DISPATCH_POINTS)
+        ((p, t) for p in m.PROJECTS_BY_FUEL['LNG'] for t in m.PROJ_DISPATCH_TPS[p])
     )
 
     # HECO PSIP 2016-04 has only Kahe 5, Kahe 6, Kalaeloa and CC_383 burning LNG,
@@ -102,11 +101,18 @@ def define_components(m):
             else (m.ProjFuelUseRate[proj, tp, 'LNG'] == 0)
     )
     
-    # largest amount of LNG that might be consumed per year (should be at least
-    # equal to the amount that might be activated and left unused, but
-    # not too much bigger); this is 2 million tons per year * 52 MMBtu/ton
-    big_market_lng = 2e6 * 52   # MMbtu/year
-    
+    # largest amount of LNG that might be activated and left unused in each
+    # market and period (MMBtu/year); this is the total of the finite tiers,
+    # since activated tiers can't offer more than that and consumption can't
+    # be negative. (Markets with an infinite tier don't need a big-M; see below.)
+    m.lng_market_big_m = Param(m.LNG_REGIONAL_FUEL_MARKET, m.PERIODS,
+        initialize=lambda m, rfm, per: sum(
+            value(m.rfm_supply_tier_limit[r, p, tier])
+                for r, p, tier in m.RFM_P_SUPPLY_TIERS[rfm, per]
+                    if value(m.rfm_supply_tier_limit[r, p, tier]) != float('inf')
+        )
+    )
+
     # LNG converted plants must use LNG unless the supply is exhausted
     # note: in this formulation, FuelConsumptionInMarket can be low,
     # unless LNG_Has_Slack is zero, in which case all available fuel
@@ -126,7 +132,7 @@ def define_components(m):
             # ensure m.LNG_Has_Slack is 1 unless all active tiers are fully used
             return (
                 m.FuelConsumptionInMarket[rfm, per] 
-                + big_market_lng * m.LNG_Has_Slack[rfm, per]
+                + m.lng_market_big_m[rfm, per] * m.LNG_Has_Slack[rfm, per]
                 >= 
                 sum(
                     m.RFMSupplyTierActivate[r, p, tier] * m.rfm_supply_tier_limit[r, p, tier]
@@ -138,11 +144,28 @@ def define_components(m):
         rule=LNG_Slack_Calculation_rule
     )
 
-    # force LNG-capable plants to use only LNG until they exhaust all active tiers
-    # note: we assume no single project can produce more than 
-    # 1500 MW from LNG at 10 MMBtu/MWh heat rate
+    # largest amount of power each LNG-capable project could produce in each
+    # period (MW); this is used as a big-M value for the constraints below.
+    # This is based on the project's capacity limit or existing capacity;
+    # if neither is available, we assume no single project can produce more
+    # than 1500 MW.
     big_project_mw = 1500 # MW
-    big_project_lng = big_project_mw * 10 # MMBtu/hour
+    def lng_project_max_mw_init(m, proj, per):
+        build_years = m.PROJECT_PERIOD_ONLINE_BUILD_YRS[proj, per]
+        if proj in m.PROJECTS_CAP_LIMITED:
+            max_capacity = m.proj_capacity_limit_mw[proj]
+        elif all((proj, bld_yr) in m.EXISTING_PROJ_BUILDYEARS for bld_yr in build_years):
+            max_capacity = sum(m.proj_existing_cap[proj, bld_yr] for bld_yr in build_years)
+        else:
+            max_capacity = big_project_mw
+        return max_capacity * m.proj_availability[proj]
+    m.LNG_PROJECT_PERIODS = Set(dimen=2, initialize=lambda m:
+        ((p, per) for p in m.PROJECTS_BY_FUEL['LNG'] for per in m.PERIODS
+            if (p, per) in m.PROJ_DISPATCH_PERIODS)
+    )
+    m.lng_project_max_mw = Param(m.LNG_PROJECT_PERIODS, initialize=lng_project_max_mw_init)
+
+    # force LNG-capable plants to use only LNG until they exhaust all active tiers
     def Only_LNG_In_Converted_Plants_rule(m, proj, tp):
         if proj not in m.LNG_CONVERTED_PLANTS:
             return Constraint.Skip
@@ -154,7 +177,18 @@ def define_components(m):
         )
         rfm = m.lz_rfm[m.proj_load_zone[proj], 'LNG']
         lng_market_exhausted = 1 - m.LNG_Has_Slack[rfm, m.tp_period[tp]]
-        return (non_lng_fuel <= big_project_lng * lng_market_exhausted)
+        if hasattr(m, 'PROJ_FUEL_USE_SEGMENTS'):
+            # with unit commitment, fuel use follows the heat rate segments
+            # (intercept per MW committed, slope per MWh produced) and also
+            # includes startup fuel, spread over the timepoint
+            max_fuel_per_mw = max(
+                max(0, intercept + max(0, slope))
+                    for (intercept, slope) in m.PROJ_FUEL_USE_SEGMENTS[proj]
+            ) + float(m.proj_startup_fuel[proj]) / m.tp_duration_hrs[tp]
+        else:
+            max_fuel_per_mw = m.proj_full_load_heat_rate[proj]
+        max_fuel = m.lng_project_max_mw[proj, m.tp_period[tp]] * max_fuel_per_mw
+        return (non_lng_fuel <= max_fuel * lng_market_exhausted)
     m.Only_LNG_In_Converted_Plants = Constraint(
         m.LNG_PROJECT_TIMEPOINTS, 
         rule=Only_LNG_In_Converted_Plants_rule
@@ -183,7 +217,7 @@ def define_components(m):
                 m.DispatchProj[proj, tp]
                 >= 
                 m.DispatchUpperLimit[proj, tp]
-                - big_project_mw * lng_market_exhausted
+                - m.lng_project_max_mw[proj, m.tp_period[tp]] * lng_market_exhausted
             )
             return rule
         m.Force_Converted_Plants_On = Constraint(
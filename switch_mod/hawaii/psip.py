@@ -1,4 +1,5 @@
 import os
+from collections import defaultdict
 from pyomo.environ import *
 
 def define_arguments(argparser):
@@ -112,16 +113,29 @@ def define_components(m):
     else:
         technology_targets = technology_targets_definite
 
-    def technology_target_init(m, per, tech):
-        """Find the amount of each technology that is targeted to be built by the end of each period."""
-        start = 2000 if per == m.PERIODS.first() else per
-        end = per + m.period_length_years[per]
-        target = sum(
-            mw for (tyear, ttech, mw) in technology_targets
-                if ttech == tech and start <= tyear and tyear < end
+    def technology_target_init(m):
+        """Find the amount of each technology that is targeted to be built by the end of each period.
+        Returns a dictionary of {(period, technology): MW}; all other targets are zero."""
+        targets = defaultdict(float)
+        for (tyear, ttech, mw) in technology_targets:
+            if ttech in m.GENERATION_TECHNOLOGIES:
+                for per in m.PERIODS:
+                    start = 2000 if per == m.PERIODS.first() else per
+                    end = per + m.period_length_years[per]
+                    if start <= tyear and tyear < end:
+                        targets[per, ttech] += mw
+        return dict(targets)
+    m.technology_target = Param(m.PERIODS, m.GENERATION_TECHNOLOGIES, 
+        default=0.0, initialize=technology_target_init)
+
+    # periods and technologies that have a target or could be built (others need no constraint)
+    m.TECHNOLOGY_TARGET_PERIODS = Set(dimen=2, initialize=lambda m: sorted(
+        set(m.technology_target.sparse_keys()) 
+        | set(
+            (per, m.proj_gen_tech[proj]) 
+                for (proj, per) in m.PROJECT_BUILDYEARS if per in m.PERIODS
         )
-        return target
-    m.technology_target = Param(m.PERIODS, m.GENERATION_TECHNOLOGIES, initialize=technology_target_init)
+    ))
 
     # with PSIP: BuildProj is zero except for technology_targets 
     #     (sum during each period or before first period)
@@ -130,8 +144,8 @@ def define_components(m):
         """Enforce targets for each technology; exact target for PSIP cases, minimum target for non-PSIP."""
         build = sum(
             m.BuildProj[proj, per] 
-                for proj in m.PROJECTS 
-                    if m.proj_gen_tech[proj] == tech and (proj, per) in m.PROJECT_BUILDYEARS
+                for proj in m.GEN_TECH_PROJECTS[tech] 
+                    if (proj, per) in m.PROJECT_BUILDYEARS
         )
         target = m.technology_target[per, tech]
         if type(build) is int and build == 0:    # no matching projects found
@@ -148,7 +162,7 @@ def define_components(m):
         else:
             return (build >= target)
     m.Enforce_Technology_Target = Constraint(
-        m.PERIODS, m.GENERATION_TECHNOLOGIES, rule=Enforce_Technology_Target_rule
+        m.TECHNOLOGY_TARGET_PERIODS, rule=Enforce_Technology_Target_rule
     )
 
     aes_proj = 'Oahu_AES_GEN1'
@@ -1,5 +1,6 @@
 import os
 from pyomo.environ import *
+import switch_mod.hawaii.storage as storage
 from switch_mod.financials import capital_recovery_factor as crf
 
 def define_arguments(argparser):
@@ -71,27 +72,17 @@ def define_components(m):
         m.Pumped_Hydro_Build_All_Or_None.deactivate()
     )
     
-    # limits on pumping and generation
-    m.Pumped_Hydro_Max_Generate_Rate = Constraint(m.PH_PROJECTS, m.TIMEPOINTS, rule=lambda m, pr, t:
-        m.PumpedHydroProjGenerateMW[pr, t]
-        <=
-        m.Pumped_Hydro_Proj_Capacity_MW[pr, m.tp_period[t]]
-    )
-    m.Pumped_Hydro_Max_Store_Rate = Constraint(m.PH_PROJECTS, m.TIMEPOINTS, rule=lambda m, pr, t:
-        m.PumpedHydroProjStoreMW[pr, t]
-        <=
-        m.Pumped_Hydro_Proj_Capacity_MW[pr, m.tp_period[t]]
-    )
-
+    # limits on pumping and generation, and
     # return reservoir to at least the starting level every day, net of any inflow
     # it can also go higher than starting level, which indicates spilling surplus water
-    m.Pumped_Hydro_Daily_Balance = Constraint(m.PH_PROJECTS, m.TIMESERIES, rule=lambda m, pr, ts:
-        sum(
-            m.PumpedHydroProjStoreMW[pr, tp] * m.ph_efficiency[pr]
-            + m.ph_inflow_mw[pr]
-            - m.PumpedHydroProjGenerateMW[pr, tp]
-            for tp in m.TS_TPS[ts]
-         ) >= 0
+    # (see storage.py)
+    storage.register_storage(m, 'pumped_hydro',
+        assets='PH_PROJECTS',
+        charge='PumpedHydroProjStoreMW', discharge='PumpedHydroProjGenerateMW',
+        charge_capacity='Pumped_Hydro_Proj_Capacity_MW',
+        discharge_capacity='Pumped_Hydro_Proj_Capacity_MW',
+        charge_efficiency='ph_efficiency', inflow='ph_inflow_mw',
+        balance='timeseries'
     )
 
     m.GeneratePumpedHydro = Expression(m.LOAD_ZONES, m.TIMEPOINTS, rule=lambda m, z, t:
@@ -131,6 +122,8 @@ def define_components(m):
                 m.BuildPumpedHydroMW[pr, pe] == 0.0 if pe != m.options.ph_year else Constraint.Skip
         )
 
+def define_dynamic_components(m):
+    storage.define_dynamic_components(m)
 
 def load_inputs(m, switch_data, inputs_dir):
     switch_data.load_aug(
@@ -28,11 +28,40 @@ rpy2.robjects.numpy2ri.activate()
 # initialize the R environment
 r = robjects.r
 
+# load zones, time series and hours of day used for calibration (and for bid_all());
+# these define the dimnames of the arrays passed to R
+load_zones = None
+time_series = None
+hours_of_day = None
+
+# default R implementation of bid_all(), used if the R script doesn't provide one.
+# This loops through the (load_zone, time_series) pairs within R, so the whole
+# price array still only makes one trip across the R bridge.
+default_r_bid_all = """
+bid_all <- function(prices) {
+    # prices is an array with dims = (hour of day, time series, load zone)
+    dn <- dimnames(prices)
+    demand <- array(0, dim=dim(prices), dimnames=dn)
+    wtp <- array(0, dim=dim(prices)[2:3], dimnames=dn[2:3])
+    for (lz in dn[[3]]) {
+        for (ts in dn[[2]]) {
+            b <- bid(lz, ts, prices[, ts, lz])
+            demand[, ts, lz] <- b[[1]]
+            wtp[ts, lz] <- b[[2]][1]
+        }
+    }
+    list(demand, wtp)
+}
+"""
+
 def define_arguments(argparser):
     argparser.add_argument("--dr-r-script", default=None,
         help="Name of R script to use for preparing demand response bids. "
         "Only takes effect when using --dr-demand-module=r_demand_system. "
-        "This script should provide calibrate() and bid() functions. "
+        "This script should provide calibrate() and bid() functions, and may also provide "
+        "a bid_all() function that accepts an array of prices indexed by "
+        "(hour of day, time series, load zone) and returns a list of a matching array of "
+        "demand and an array of willingness to pay indexed by (time series, load zone). "
         )
 
 def define_components(m):
@@ -44,6 +73,8 @@ def define_components(m):
             "the command line."
         )
     r.source(m.options.dr_r_script)
+    if not r.exists("bid_all")[0]:
+        r(default_r_bid_all)
 
 def calibrate(base_data, dr_elasticity_scenario=1):
     """Accept a list of tuples showing load_zone, time_series, [base hourly loads], [base hourly prices]
@@ -51,6 +82,7 @@ def calibrate(base_data, dr_elasticity_scenario=1):
     so that customized bids can later be generated for each load_zone and time_series, using new prices.
     Also accept an allocation among different elasticity classes (defined in the R module.)
     """
+    global load_zones, time_series, hours_of_day
     base_load_dict = {
         (lz, ts): base_loads
         for (lz, ts, base_loads, base_prices) in base_data
@@ -82,6 +114,23 @@ def bid(load_zone, time_series, prices):
     return (demand, wtp)
 
 
+def bid_all(prices):
+    """Accept an array of prices with dimensions (load_zone, time_series, hour of day),
+    in the same order as the base_data used for calibration. Return a tuple of an array
+    of hourly load levels (same shape as prices) and an array of willingness to pay 
+    for each load_zone and time_series. All the bids are obtained with a single call 
+    to bid_all() in R."""
+    
+    prices = np.asarray(prices, dtype=float)
+    r_prices = make_r_array(prices.transpose(), hours_of_day, time_series, load_zones)
+    bids = r.bid_all(r_prices)
+    # convert back from (hour of day, time series, load zone) order
+    # note: R stores arrays in column-major (Fortran) order
+    demand = np.reshape(np.array(bids[0], dtype=float), prices.shape[::-1], order='F')
+    wtp = np.reshape(np.array(bids[1], dtype=float), prices.shape[1::-1], order='F')
+    return (demand.transpose(), wtp.transpose())
+
+
 def test_calib():
     """Test calibration routines with sample data. Results should match r.test_calib()."""
     base_data = [
@@ -105,6 +154,9 @@ def make_r_value_array(base_value_dict, hours_of_day, time_series, load_zones):
         [ [base_value_dict[(lz, ts)] for ts in time_series] for lz in load_zones],
         dtype=float
     ).transpose()
+    return make_r_array(arr, hours_of_day, time_series, load_zones)
+
+def make_r_array(arr, hours_of_day, time_series, load_zones):
     # convert to an r array with dimnames, using R's standard array function
     # (it might be slightly neater to use rinterface to build r_array entirely
     # on the python side, but this is quick and well-documented since it uses
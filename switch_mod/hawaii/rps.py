@@ -44,20 +44,16 @@ def define_components(m):
     # power production that can be counted toward the RPS each period
     m.RPSEligiblePower = Expression(m.PERIODS, rule=lambda m, per:
         sum(
-            m.DispatchProjByFuel[p, tp, f] * m.tp_weight[tp]
-                for f in m.FUELS if f in m.RPS_ENERGY_SOURCES
-                    for p in m.PROJECTS_BY_FUEL[f]
-                        # could be accelerated a bit if we had m.ACTIVE_PERIODS_FOR_PROJECT[p]
-                        for tp in m.PERIOD_TPS[per]
-                            if (p, tp) in m.PROJ_DISPATCH_POINTS
+            m.ProjEnergyByFuelInPeriod[p, per, f]
+                for (p, f) in m.PROJ_FUELS_ACTIVE_IN_PERIOD[per] 
+                    if f in m.RPS_ENERGY_SOURCES
         )
         +
         sum(
-            m.DispatchProj[p, tp] * m.tp_weight[tp]
-                for f in m.NON_FUEL_ENERGY_SOURCES if f in m.RPS_ENERGY_SOURCES
-                    for p in m.PROJECTS_BY_NON_FUEL_ENERGY_SOURCE[f]
-                        for tp in m.PERIOD_TPS[per]
-                            if (p, tp) in m.PROJ_DISPATCH_POINTS
+            m.ProjEnergyInPeriod[p, per]
+                for p in m.PROJECTS_ACTIVE_IN_PERIOD[per]
+                    if not m.g_uses_fuel[m.proj_gen_tech[p]]
+                        and m.g_energy_source[m.proj_gen_tech[p]] in m.RPS_ENERGY_SOURCES
         )
         -
         # assume DumpPower is curtailed renewable energy
@@ -67,12 +63,7 @@ def define_components(m):
     # total power production each period (against which RPS is measured)
     # (we subtract DumpPower, because that shouldn't have been produced in the first place)
     m.RPSTotalPower = Expression(m.PERIODS, rule=lambda m, per:
-        sum(
-            m.DispatchProj[p, tp] * m.tp_weight[tp]
-                for p in m.PROJECTS 
-                    for tp in m.PERIOD_TPS[per] 
-                        if (p, tp) in m.PROJ_DISPATCH_POINTS
-        )
+        sum(m.ProjEnergyInPeriod[p, per] for p in m.PROJECTS_ACTIVE_IN_PERIOD[per])
         - sum(m.DumpPower[lz, tp] * m.tp_weight[tp] for lz in m.LOAD_ZONES for tp in m.PERIOD_TPS[per])
     )
     
@@ -102,12 +93,9 @@ def define_components(m):
     
     m.RPSFuelPower = Expression(m.PERIODS, rule=lambda m, per:
         sum(
-            m.DispatchProjByFuel[p, tp, f] * m.tp_weight[tp]
-                for f in m.FUELS if m.f_rps_eligible[f]
-                    for p in m.PROJECTS_BY_FUEL[f]
-                        # could be accelerated a bit if we had m.ACTIVE_PERIODS_FOR_PROJECT[p]
-                        for tp in m.PERIOD_TPS[per]
-                            if (p, tp) in m.PROJ_DISPATCH_POINTS
+            m.ProjEnergyByFuelInPeriod[p, per, f]
+                for (p, f) in m.PROJ_FUELS_ACTIVE_IN_PERIOD[per] 
+                    if m.f_rps_eligible[f]
         )
     )
     m.RPS_Fuel_Cap = Constraint(m.PERIODS, rule = lambda m, per:
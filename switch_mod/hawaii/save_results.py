@@ -20,8 +20,11 @@ be called automatically to store results.
 # added as methods (possibly by util rather than a separate reporting module).
 
 import os
+from collections import defaultdict
 import switch_mod.hawaii.util as util
 import switch_mod.financials as financials
+from switch_mod.utilities import get_values
+from switch_mod.load_zones import marginal_costs
 from pyomo.environ import *
 
 def define_components(m):
@@ -109,28 +112,6 @@ def annualize_present_value_period_cost(m, period, val):
     )
     return val / discount_factor
 
-def DispatchProjByFuel(m, proj, tp, fuel):
-    """This is a replacement for mod.DispatchProjByFuel, which is only defined in 
-    project.no_commit, not project.unitcommit.fuel_use. In the unit commitment version
-    it can only be defined as a quadratically constrained variable, which we don't
-    want to force on all users."""
-    dispatch = m.DispatchProj[proj, tp] if (proj, tp) in m.DispatchProj else 0.0
-    if value(dispatch) == 0.0:
-        result = 0.0
-    else:
-        # allocate power production proportional to amount of each fuel used
-        # note: the sum of all fuels used should never be zero when dispatch is non-zero,
-        # but somehow it sneaks through occasionally
-        try:
-            result = value(
-                dispatch 
-                * m.ProjFuelUseRate[proj, tp, fuel] 
-                / sum(m.ProjFuelUseRate[proj, tp, f] for f in m.G_FUELS[m.proj_gen_tech[proj]])
-            )
-        except ZeroDivisionError:
-            result = 0.0
-    return result
-    
 def write_results(m, outputs_dir):
     tag = "_" + m.options.scenario_name if m.options.scenario_name else ""
         
@@ -150,6 +131,47 @@ def write_results(m, outputs_dir):
     #     )
     # )
     avg_ts_scale = float(sum(m.ts_scale_to_year[ts] for ts in m.TIMESERIES))/len(m.TIMESERIES)
+
+    # accumulate production by energy source for each zone and timepoint, in one pass 
+    # over the dispatch points
+    dispatch = get_values(m, m.DispatchProj)
+    dispatch_upper_limit = get_values(m, m.DispatchUpperLimit)
+    fuel_use = get_values(m, m.ProjFuelUseRate)
+    total_fuel_use = defaultdict(float)
+    for (pr, tp, f), rate in fuel_use.iteritems():
+        total_fuel_use[pr, tp] += rate
+    source_dispatch = defaultdict(float)    # (zone, timepoint, source): MW
+    source_curtailment = defaultdict(float)
+    for pr, tp, f in m.PROJ_FUEL_DISPATCH_POINTS:
+        # allocate power production proportional to amount of each fuel used
+        # note: the sum of all fuels used should never be zero when dispatch is non-zero,
+        # but somehow it sneaks through occasionally
+        if dispatch[pr, tp] != 0.0 and total_fuel_use[pr, tp] != 0.0:
+            source_dispatch[m.proj_load_zone[pr], tp, f] += (
+                dispatch[pr, tp] * fuel_use[pr, tp, f] / total_fuel_use[pr, tp]
+            )
+    for pr, tp in m.PROJ_DISPATCH_POINTS:
+        t = m.proj_gen_tech[pr]
+        if not m.g_uses_fuel[t]:
+            key = (m.proj_load_zone[pr], tp, m.g_energy_source[t])
+            source_dispatch[key] += dispatch[pr, tp]
+            source_curtailment[key] += dispatch_upper_limit[pr, tp] - dispatch[pr, tp]
+    # system-wide totals for each timepoint and source
+    system_dispatch = defaultdict(float)    # (timepoint, source): MW
+    system_curtailment = defaultdict(float)
+    for (z, tp, s), mw in source_dispatch.iteritems():
+        system_dispatch[tp, s] += mw
+    for (z, tp, s), mw in source_curtailment.iteritems():
+        system_curtailment[tp, s] += mw
+
+    # evaluate the load-zone energy components and duals once each
+    produce = [get_values(m, getattr(m, c)) for c in m.LZ_Energy_Components_Produce]
+    consume = [get_values(m, getattr(m, c)) for c in m.LZ_Energy_Components_Consume]
+    # note: this uses 0.0 if no dual available, i.e., with glpk solver
+    marginal_cost = marginal_costs(m, 0.0)
+    # note: the columns named after each energy source (and curtail_<source>) 
+    # are system-wide totals, repeated in the row for each zone; 
+    # zone_<source> and zone_curtail_<source> give the amounts in each zone.
     util.write_table(
         m, m.LOAD_ZONES, m.TIMEPOINTS,
         output_file=os.path.join(outputs_dir, "energy_sources{t}.tsv".format(t=tag)), 
@@ -158,46 +180,57 @@ def write_results(m, outputs_dir):
             +tuple(m.FUELS)
             +tuple(m.NON_FUEL_ENERGY_SOURCES)
             +tuple("curtail_"+s for s in m.NON_FUEL_ENERGY_SOURCES)
+            +tuple("zone_"+f for f in m.FUELS)
+            +tuple("zone_"+s for s in m.NON_FUEL_ENERGY_SOURCES)
+            +tuple("zone_curtail_"+s for s in m.NON_FUEL_ENERGY_SOURCES)
             +tuple(m.LZ_Energy_Components_Produce)
             +tuple(m.LZ_Energy_Components_Consume)
             +("marginal_cost","peak_day"),
         values=lambda m, z, t: 
             (z, m.tp_period[t], m.tp_timestamp[t]) 
-            +tuple(
-                sum(DispatchProjByFuel(m, p, t, f) for p in m.PROJECTS_BY_FUEL[f])
-                for f in m.FUELS
-            )
-            +tuple(
-                sum(util.get(m.DispatchProj, (p, t), 0.0) for p in m.PROJECTS_BY_NON_FUEL_ENERGY_SOURCE[s])
-                for s in m.NON_FUEL_ENERGY_SOURCES
-            )
-            +tuple(
-                sum(
-                    util.get(m.DispatchUpperLimit, (p, t), 0.0) - util.get(m.DispatchProj, (p, t), 0.0) 
-                    for p in m.PROJECTS_BY_NON_FUEL_ENERGY_SOURCE[s]
-                )
-                for s in m.NON_FUEL_ENERGY_SOURCES
-            )
-            +tuple(getattr(m, component)[z, t] for component in m.LZ_Energy_Components_Produce)
-            +tuple(getattr(m, component)[z, t] for component in m.LZ_Energy_Components_Consume)
-            +(util.get(m.dual, m.Energy_Balance[z, t], 0.0)/m.bring_timepoint_costs_to_base_year[t], 
-                # note: this uses 0.0 if no dual available, i.e., with glpk solver
+            +tuple(system_dispatch.get((t, f), 0.0) for f in m.FUELS)
+            +tuple(system_dispatch.get((t, s), 0.0) for s in m.NON_FUEL_ENERGY_SOURCES)
+            +tuple(system_curtailment.get((t, s), 0.0) for s in m.NON_FUEL_ENERGY_SOURCES)
+            +tuple(source_dispatch.get((z, t, f), 0.0) for f in m.FUELS)
+            +tuple(source_dispatch.get((z, t, s), 0.0) for s in m.NON_FUEL_ENERGY_SOURCES)
+            +tuple(source_curtailment.get((z, t, s), 0.0) for s in m.NON_FUEL_ENERGY_SOURCES)
+            +tuple(vals[z, t] for vals in produce)
+            +tuple(vals[z, t] for vals in consume)
+            +(marginal_cost[z, t], 
             'peak' if m.ts_scale_to_year[m.tp_ts[t]] < avg_ts_scale else 'typical')
     )
     
     # installed capacity information
     g_energy_source = lambda t: '/'.join(sorted(m.G_FUELS[t])) if m.g_uses_fuel[t] else m.g_energy_source[t]
-    built_proj = tuple(set(
-        pr for pe in m.PERIODS for pr in m.PROJECTS if value(m.ProjCapacity[pr, pe]) > 0.001
-    ))
-    operate_proj_in_period = tuple(set(
+    capacity = get_values(m, m.ProjCapacity)
+    built_proj = tuple(set(pr for (pr, pe), cap in capacity.iteritems() if cap > 0.001))
+    operate_proj_in_period = set(
         (pr, m.tp_period[tp]) 
-            for pr, tp in m.PROJ_DISPATCH_POINTS if value(m.DispatchProj[pr, tp]) > 0.001
-    ))
+            for pr, tp in m.PROJ_DISPATCH_POINTS if dispatch[pr, tp] > 0.001
+    )
     built_tech = tuple(set(m.proj_gen_tech[p] for p in built_proj))
     built_energy_source = tuple(set(g_energy_source(t) for t in built_tech))
     # print "missing energy_source: "+str([t for t in built_tech if g_energy_source(t)==''])
 
+    # accumulate capacity, construction and capital costs for each zone, period 
+    # and category (technology or energy source) in one pass over the projects
+    tech_capacity = defaultdict(float)      # (zone, period, technology): MW
+    source_capacity = defaultdict(float)    # (zone, period, energy source): MW
+    for pr, pe in operate_proj_in_period:
+        z, t = m.proj_load_zone[pr], m.proj_gen_tech[pr]
+        tech_capacity[z, pe, t] += capacity[pr, pe]
+        source_capacity[z, pe, g_energy_source(t)] += capacity[pr, pe]
+    tech_build = defaultdict(float)         # (zone, period, technology): MW
+    tech_capital_cost = defaultdict(float)  # (zone, period, technology): $
+    built_proj_set = set(built_proj)
+    for (pr, pe), build in get_values(m, m.BuildProj).iteritems():
+        if pr in built_proj_set and pe in m.PERIODS:
+            key = (m.proj_load_zone[pr], pe, m.proj_gen_tech[pr])
+            tech_build[key] += build
+            tech_capital_cost[key] += build * (
+                m.proj_overnight_cost[pr, pe] + m.proj_connect_cost_per_mw[pr]
+            )
+
     battery_capacity_mw = lambda m, z, pe: (
         (m.Battery_Capacity[z, pe] * m.battery_max_discharge / m.battery_min_discharge_time)
             if hasattr(m, "Battery_Capacity") else 0.0
@@ -207,12 +240,7 @@ def write_results(m, outputs_dir):
         output_file=os.path.join(outputs_dir, "capacity_by_technology{t}.tsv".format(t=tag)),
         headings=("load_zone", "period") + built_tech + ("hydro", "batteries", "fuel cells"),
         values=lambda m, z, pe: (z, pe,) + tuple(
-            sum(
-                (m.ProjCapacity[pr, pe] if ((pr, pe) in operate_proj_in_period) else 0.0)
-                    for pr in built_proj 
-                        if m.proj_gen_tech[pr] == t and m.proj_load_zone[pr] == z
-            )
-            for t in built_tech
+            tech_capacity.get((z, pe, t), 0.0) for t in built_tech
         ) + (
             m.Pumped_Hydro_Capacity_MW[z, pe] if hasattr(m, "Pumped_Hydro_Capacity_MW") else 0,
             battery_capacity_mw(m, z, pe),
@@ -223,12 +251,7 @@ def write_results(m, outputs_dir):
         output_file=os.path.join(outputs_dir, "capacity_by_energy_source{t}.tsv".format(t=tag)),
         headings=("load_zone", "period") + built_energy_source + ("hydro", "batteries", "fuel cells"),
         values=lambda m, z, pe: (z, pe,) + tuple(
-            sum(
-                (m.ProjCapacity[pr, pe] if ((pr, pe) in operate_proj_in_period) else 0.0)
-                    for pr in built_proj 
-                        if g_energy_source(m.proj_gen_tech[pr]) == s and m.proj_load_zone[pr] == z
-            )
-            for s in built_energy_source
+            source_capacity.get((z, pe, s), 0.0) for s in built_energy_source
         ) + (
             m.Pumped_Hydro_Capacity_MW[z, pe] if hasattr(m, "Pumped_Hydro_Capacity_MW") else 0,
             battery_capacity_mw(m, z, pe),
@@ -240,14 +263,7 @@ def write_results(m, outputs_dir):
         values = [z, pe]
         # capacity built, conventional plants
     
-        values += [
-            sum(
-                m.BuildProj[pr, pe] 
-                    for pr in built_proj 
-                        if m.proj_gen_tech[pr] == t and m.proj_load_zone[pr] == z and (pr, pe) in m.BuildProj
-            )
-            for t in built_tech
-        ]
+        values += [tech_build.get((z, pe, t), 0.0) for t in built_tech]
         # capacity built, batteries, MW and MWh
         if hasattr(m, "BuildBattery"):
             values.extend([
@@ -282,15 +298,7 @@ def write_results(m, outputs_dir):
         
         # capital investments
         # regular projects
-        values += [
-            sum(
-                m.BuildProj[pr, pe] * (m.proj_overnight_cost[pr, pe] + m.proj_connect_cost_per_mw[pr])
-                    for pr in built_proj 
-                        if m.proj_gen_tech[pr] == t and m.proj_load_zone[pr] == z \
-                            and (pr, pe) in m.PROJECT_BUILDYEARS
-            )
-            for t in built_tech
-        ]
+        values += [tech_capital_cost.get((z, pe, t), 0.0) for t in built_tech]
         # batteries
         if hasattr(m, 'battery_capital_cost_per_mwh_capacity'): 
             # models with single capital cost (defunct)
@@ -1,6 +1,7 @@
-import time, sys, collections, os
+import time, sys, collections, os, re, threading, Queue, hashlib, gzip
+import cPickle as pickle
+from multiprocessing.pool import ThreadPool
 from textwrap import dedent
-import psycopg2
 
 # NOTE: instead of using the python csv writer, this directly writes tables to 
 # file in the pyomo .tab format. This uses tabs between columns and the standard
@@ -26,7 +27,48 @@ import psycopg2
 # But that would be harder to debug, and wouldn't allow for ad hoc 
 # calculations or writing .dat files (which are used for a few parameters)
 
+# NOTE: the queries in write_table() calls are independent of each other, so 
+# write_tables() runs them concurrently, using a small pool of database connections
+# (see db_workers below). Everything else runs immediately, in order.
+
+# NOTE: query results can also be saved in a local cache (see query_cache_dir below),
+# keyed by the query and the arguments it uses. Later calls reuse the cached results,
+# and with offline=True, inputs are generated from the cache alone, without connecting
+# to the database.
+
 def write_tables(**args):
+    """Write all the input files for a scenario. args may include these settings:
+    
+    db_workers: number of queries to run at the same time (default 4); set this
+        to 1 to run queries one at a time.
+    query_cache_dir: directory to store query results in, to be reused by later
+        calls that run the same query with the same arguments.
+    refresh_query_cache: if True, re-run all queries and update the cache.
+    offline: if True, use only results from query_cache_dir and never connect
+        to the database (e.g., on computers without database access).
+    """
+    global query_pool, query_cache
+    workers = args.pop('db_workers', 4)
+    cache_dir = args.pop('query_cache_dir', None)
+    refresh = args.pop('refresh_query_cache', False)
+    offline = args.pop('offline', False)
+    if offline and cache_dir is None:
+        raise ValueError("query_cache_dir must be specified when running offline.")
+    if offline and refresh:
+        raise ValueError("refresh_query_cache cannot be used when running offline.")
+    if cache_dir is not None:
+        query_cache = QueryCache(cache_dir, offline=offline, refresh=refresh)
+    if workers > 1:
+        query_pool = QueryPool(workers)
+    try:
+        _write_tables(args)
+    finally:
+        query_cache = None
+        if query_pool is not None:
+            pool, query_pool = query_pool, None
+            pool.finish()
+
+def _write_tables(args):
 
     # catch obsolete arguments (otherwise they would be silently ignored)
     if 'ev_scen_id' in args:
@@ -731,27 +773,189 @@ def make_file_path(file, args):
     path = os.path.join(path, file)
     return path
 
+def db_connect():
+    """Return a new connection to the switch database."""
+    import psycopg2
+    pghost='redr.eng.hawaii.edu'
+    try:
+        return psycopg2.connect(database='switch', host=pghost) #, user='switch_user')
+    except psycopg2.OperationalError:
+        print dedent("""
+            ############################################################################################
+            Error while connecting to switch database on postgres server {server}.
+            Please ensure that the PGUSER environment variable is set with your postgres username
+            and there is a line like "*:*:*:<user>:<password>" in ~/.pgpass (which should be chmod 0600) 
+            or in %APPDATA%\postgresql\pgpass.conf (Windows).    
+            See http://www.postgresql.org/docs/9.1/static/libpq-pgpass.html for more details.
+            ############################################################################################
+            """.format(server=pghost))
+        raise
+
 con = None
-def db_cursor():
+def db_connection():
     global con
     if con is None:
+        # note: the connection gets created when first needed and never gets closed (until presumably python exits)
+        con = db_connect()
+    return con
+
+def db_cursor():
+    return db_connection().cursor()
+
+# pool used by write_table() while write_tables() is running (if any)
+query_pool = None
+
+class QueryPool(object):
+    """Run write_table() queries on several threads at once, each with its own 
+    database connection. Connections are reused for later queries and closed by finish()."""
+    def __init__(self, workers):
+        self.connections = Queue.Queue()
+        self.all_connections = []
+        self.lock = threading.Lock()
+        self.threads = ThreadPool(workers)
+        self.results = []
+
+    def get_connection(self):
         try:
-            pghost='redr.eng.hawaii.edu'
-            # note: the connection gets created when the module loads and never gets closed (until presumably python exits)
-            con = psycopg2.connect(database='switch', host=pghost) #, user='switch_user')
-    
-        except psycopg2.OperationalError:
-            print dedent("""
-                ############################################################################################
-                Error while connecting to switch database on postgres server {server}.
-                Please ensure that the PGUSER environment variable is set with your postgres username
-                and there is a line like "*:*:*:<user>:<password>" in ~/.pgpass (which should be chmod 0600) 
-                or in %APPDATA%\postgresql\pgpass.conf (Windows).    
-                See http://www.postgresql.org/docs/9.1/static/libpq-pgpass.html for more details.
-                ############################################################################################
-                """.format(server=pghost))
-            raise
-    return con.cursor()
+            return self.connections.get_nowait()
+        except Queue.Empty:
+            conn = db_connect()
+            with self.lock:
+                self.all_connections.append(conn)
+            return conn
+
+    def run(self, output_file, query, arguments, cache):
+        conns = []
+        def connection():
+            # only called if the results are not in the cache
+            conns.append(self.get_connection())
+            return conns[-1]
+        try:
+            start = time.time()
+            query_to_file(output_file, query, arguments, connection, cache)
+            with self.lock:
+                print "Wrote {file} (time taken: {dur:.2f}s)".format(
+                    file=output_file, dur=time.time()-start)
+        finally:
+            for conn in conns:
+                self.connections.put(conn)
+
+    def submit(self, output_file, query, arguments):
+        # copy the arguments, in case they are changed before the query runs
+        self.results.append(self.threads.apply_async(
+            self.run, (output_file, query, dict(arguments), query_cache)
+        ))
+
+    def finish(self):
+        """Wait for all the queries to finish, then close the connections. Raise
+        an error if any of the queries failed."""
+        self.threads.close()
+        try:
+            for r in self.results:
+                r.get()
+        finally:
+            self.threads.join()
+            for conn in self.all_connections:
+                conn.close()
+
+# cache used by write_table() and write_indexed_set_dat_file() while write_tables() 
+# is running (if any)
+query_cache = None
+
+class QueryCache(object):
+    """Store query results in compressed files in cache_dir, keyed by the text of
+    the query and the values of the arguments used in the query. Each file holds
+    a series of pickles: the column names, then batches of rows, so results can
+    be written and read back one batch at a time."""
+    def __init__(self, cache_dir, offline=False, refresh=False):
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.refresh = refresh
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    def file_path(self, query, arguments):
+        query = dedent(query)
+        # only the arguments that appear in the query affect the results
+        used_args = sorted(
+            (a, arguments[a]) for a in set(re.findall(r'%\((\w+)\)s', query))
+        )
+        key = hashlib.md5(repr((query, used_args))).hexdigest()
+        return os.path.join(self.cache_dir, key + '.batches.pickle.gz')
+
+    def query_batches(self, query, arguments, connection, cursor_name, batch_size=10000):
+        """Return an iterator that yields the column names for the query, then lists 
+        of rows, from the cache if possible. Otherwise stream the results from the 
+        connection returned by connection() into the cache first (see query_batches())."""
+        path = self.file_path(query, arguments)
+        if self.refresh or not os.path.exists(path):
+            if self.offline:
+                raise RuntimeError(
+                    "No cached results found in {} for query\n{}\nwith arguments {}."
+                    .format(self.cache_dir, dedent(query), arguments)
+                )
+            # write to a temporary file first, so other processes never see a partial file
+            temp_path = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.current_thread().ident)
+            try:
+                with gzip.open(temp_path, 'wb') as f:
+                    for batch in query_batches(
+                        connection(), query, arguments, cursor_name, batch_size
+                    ):
+                        pickle.dump(batch, f, protocol=-1)
+            except:
+                os.remove(temp_path)
+                raise
+            if os.path.exists(path):
+                os.remove(path)     # needed on Windows
+            os.rename(temp_path, path)
+        return self.read_batches(path)
+
+    def read_batches(self, path):
+        with gzip.open(path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    break
+
+def query_batches(conn, query, arguments, cursor_name, batch_size=10000):
+    """Run query on conn and yield the column names, then lists of up to batch_size 
+    rows. Rows are read from a server-side cursor (if available), so they are 
+    streamed instead of being loaded into memory all at once."""
+    try:
+        # named (server-side) cursor
+        cur = conn.cursor(name=cursor_name)
+        cur.itersize = batch_size
+    except TypeError:
+        # database module doesn't support named cursors
+        cur = conn.cursor()
+    try:
+        cur.execute(dedent(query), arguments)
+        # note: named cursors don't report the description until the first fetch
+        rows = cur.fetchmany(batch_size)
+        yield [d[0] for d in cur.description]
+        while rows:
+            yield rows
+            rows = cur.fetchmany(batch_size)
+    finally:
+        cur.close()
+        # end the transaction (needed to release named cursors)
+        conn.rollback()
+
+def query_to_file(output_file, query, arguments, connection, cache=None, batch_size=10000):
+    """Run query on the connection returned by connection() (or retrieve the results 
+    from cache) and write the results to output_file, in blocks of batch_size rows."""
+    cursor_name = 'switch_' + os.path.basename(output_file).replace('.', '_')
+    if cache is not None:
+        batches = cache.query_batches(query, arguments, connection, cursor_name, batch_size)
+    else:
+        batches = query_batches(connection(), query, arguments, cursor_name, batch_size)
+    with open(output_file, 'w', 1 << 20) as f:
+        # write header row
+        writerow(f, next(batches))
+        # write the data
+        for rows in batches:
+            writerows(f, rows)
 
 def write_dat_file(output_file, args_to_write, arguments):
     """ write a simple .dat file with the arguments specified in args_to_write, 
@@ -773,19 +977,16 @@ def write_dat_file(output_file, args_to_write, arguments):
 
 def write_table(output_file, query, arguments):
     output_file = make_file_path(output_file, arguments)
-    cur = db_cursor()
+    if query_pool is not None:
+        # run in the background, along with other queries
+        query_pool.submit(output_file, query, arguments)
+        return
 
     print "Writing {file} ...".format(file=output_file),
     sys.stdout.flush()  # display the part line to the user
 
     start=time.time()
-    cur.execute(dedent(query), arguments)
-
-    with open(output_file, 'w') as f:
-        # write header row
-        writerow(f, [d[0] for d in cur.description])
-        # write the query results (cur is used as an iterator here to get all the rows one by one)
-        writerows(f, cur)
+    query_to_file(output_file, query, arguments, db_connection, query_cache)
 
     print "time taken: {dur:.2f}s".format(dur=time.time()-start)
 
@@ -818,12 +1019,19 @@ def write_indexed_set_dat_file(output_file, set_name, query, arguments):
 
     start=time.time()
 
-    cur = db_cursor()
-    cur.execute(dedent(query), arguments)
+    if query_cache is not None:
+        batches = query_cache.query_batches(
+            query, arguments, db_connection,
+            'switch_' + os.path.basename(output_file).replace('.', '_'))
+        next(batches)   # skip column names
+        rows = (r for batch in batches for r in batch)
+    else:
+        rows = db_cursor()
+        rows.execute(dedent(query), arguments)
     
     # build a dictionary grouping all values (last column) according to their index keys (earlier columns)
     data_dict = collections.defaultdict(list)
-    for r in cur:
+    for r in rows:
         # note: data_dict[(index vals)] is created as an empty list on first reference,
         # then gets data from all matching rows appended to it
         data_dict[tuple(r[:-1])].append(r[-1])
@@ -856,8 +1064,7 @@ def writerow(f, row):
     f.write('\t'.join(stringify(c) for c in row) + '\n')
 
 def writerows(f, rows):
-    for r in rows:
-        writerow(f, r)
+    f.write(''.join('\t'.join(stringify(c) for c in r) + '\n' for r in rows))
 
 def tuple_dict(keys, vals):
     "Create a tuple of dictionaries, one for each row in vals, using the specified keys."
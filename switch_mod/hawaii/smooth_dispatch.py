@@ -2,44 +2,92 @@
 smooth out demand response and EV charging as much as possible."""
 
 from pyomo.environ import *
+from switch_mod.utilities import clear_value_cache
+
+def define_arguments(argparser):
+    argparser.add_argument("--smooth-dispatch-objective", default="auto", 
+        choices=["auto", "quadratic", "linear"],
+        help="Form of the smoothing objective used in the second-stage solve. "
+        "'quadratic' minimizes the squares of demand response and EV charging; "
+        "'linear' minimizes their absolute values, for solvers that can only solve LPs. "
+        "'auto' (the default) uses quadratic for cplex and gurobi and linear otherwise.")
+    argparser.add_argument("--smooth-dispatch-cost-tolerance", type=float, default=1e-6,
+        help="Fraction by which the system cost may exceed the cost-optimal solution "
+        "during the smoothing solve (default is 1e-6).")
 
 def define_components(m):
-    m.options.smooth_dispatch = (m.options.solver == "cplex")
+    if m.options.smooth_dispatch_objective == "auto":
+        m.options.smooth_dispatch_objective = (
+            "quadratic" if m.options.solver in ("cplex", "gurobi") else "linear"
+        )
+
+def define_dynamic_components(m):
+    # note: this is done after all modules have defined their components, so we can
+    # tell whether DemandResponse and ChargeEVs are in the model
+
+    smoothed_components = [c for c in ("DemandResponse", "ChargeEVs") if hasattr(m, c)]
+    if m.options.smooth_dispatch_objective == "linear":
+        # add variables and constraints to find the absolute value of each smoothed component
+        for c in smoothed_components:
+            abs_var = Var(m.LOAD_ZONES, m.TIMEPOINTS, within=NonNegativeReals)
+            m.add_component("Smooth_Abs_" + c, abs_var)
+            m.add_component("Smooth_Abs_" + c + "_Upper", Constraint(
+                m.LOAD_ZONES, m.TIMEPOINTS, 
+                rule=lambda m, z, t, c=c: getattr(m, "Smooth_Abs_" + c)[z, t] >= getattr(m, c)[z, t]
+            ))
+            m.add_component("Smooth_Abs_" + c + "_Lower", Constraint(
+                m.LOAD_ZONES, m.TIMEPOINTS, 
+                rule=lambda m, z, t, c=c: getattr(m, "Smooth_Abs_" + c)[z, t] >= -getattr(m, c)[z, t]
+            ))
 
     # add an alternative objective function that smoothes out various non-cost variables
-    if m.options.smooth_dispatch:
-        def Smooth_Free_Variables_obj_rule(m):
-            # minimize production (i.e., maximize curtailment / minimize losses)
-            obj = sum(
-                getattr(m, component)[lz, t] 
-                    for lz in m.LOAD_ZONES 
-                        for t in m.TIMEPOINTS 
-                            for component in m.LZ_Energy_Components_Produce)
-            # also minimize the magnitude of demand adjustments
-            if hasattr(m, "DemandResponse"):
-                print "Will smooth DemandResponse."
-                obj = obj + sum(m.DemandResponse[z, t]*m.DemandResponse[z, t] for z in m.LOAD_ZONES for t in m.TIMEPOINTS)
-            # also minimize the magnitude of EV charging
-            if hasattr(m, "ChargeEVs"):
-                print "Will smooth EV charging."
-                obj = obj + sum(m.ChargeEVs[z, t]*m.ChargeEVs[z, t] for z in m.LOAD_ZONES for t in m.TIMEPOINTS)
-            return obj
-        m.Smooth_Free_Variables = Objective(rule=Smooth_Free_Variables_obj_rule, sense=minimize)
+    def Smooth_Free_Variables_obj_rule(m):
+        # minimize production (i.e., maximize curtailment / minimize losses)
+        obj = sum(
+            getattr(m, component)[lz, t] 
+                for lz in m.LOAD_ZONES 
+                    for t in m.TIMEPOINTS 
+                        for component in m.LZ_Energy_Components_Produce)
+        # also minimize the magnitude of demand adjustments and EV charging
+        for c in smoothed_components:
+            print "Will smooth {}.".format(c)
+            if m.options.smooth_dispatch_objective == "linear":
+                obj = obj + sum(
+                    getattr(m, "Smooth_Abs_" + c)[z, t] for z in m.LOAD_ZONES for t in m.TIMEPOINTS
+                )
+            else:
+                obj = obj + sum(
+                    getattr(m, c)[z, t]*getattr(m, c)[z, t] for z in m.LOAD_ZONES for t in m.TIMEPOINTS
+                )
+        return obj
+    m.Smooth_Free_Variables = Objective(rule=Smooth_Free_Variables_obj_rule, sense=minimize)
+    # start with the standard cost-minimizing objective
+    m.Deactivate_Smooth_Free_Variables = BuildAction(
+        rule=lambda m: m.Smooth_Free_Variables.deactivate()
+    )
 
 def pre_iterate(m):
-    if m.options.smooth_dispatch:
-        if m.iteration_number == 0:
-            # make sure the minimum-cost objective is in effect
-            m.Smooth_Free_Variables.deactivate()
-            m.Minimize_System_Cost.activate()
-        elif m.iteration_number == 1:
-            # switch to the smoothing objective
-            fix_obj_expression(m.Minimize_System_Cost)
-            m.Minimize_System_Cost.deactivate()
-            m.Smooth_Free_Variables.activate()
-            print "smoothing free variables..."
-        else:
-            raise RuntimeError("Reached unexpected iteration number {} in module {}.".format(m.iteration_number, __name__))
+    if m.iteration_number == 0:
+        # make sure the minimum-cost objective is in effect
+        m.Smooth_Free_Variables.deactivate()
+        m.Minimize_System_Cost.activate()
+        if hasattr(m, "Smooth_Dispatch_Cost_Limit"):
+            m.Smooth_Dispatch_Cost_Limit.deactivate()
+    elif m.iteration_number == 1:
+        # switch to the smoothing objective, and keep the system cost 
+        # within a small tolerance of the optimum from the first solve
+        optimum = value(m.SystemCost)
+        limit = optimum + abs(optimum) * m.options.smooth_dispatch_cost_tolerance
+        if hasattr(m, "Smooth_Dispatch_Cost_Limit"):
+            m.del_component("Smooth_Dispatch_Cost_Limit")
+        m.Smooth_Dispatch_Cost_Limit = Constraint(expr=m.SystemCost <= limit)
+        m.Minimize_System_Cost.deactivate()
+        m.Smooth_Free_Variables.activate()
+        # start from the cost-optimal solution, if the solver can use it
+        m.warm_start = True
+        print "smoothing free variables..."
+    else:
+        raise RuntimeError("Reached unexpected iteration number {} in module {}.".format(m.iteration_number, __name__))
 
     # don't block convergence based on anything that happened in this function
     return True 
@@ -67,55 +115,29 @@ def post_iterate(m):
                     c=c, d=d
                 )
             
-    if m.options.smooth_dispatch:
-        if hasattr(m, "dual"):
-            if m.iteration_number == 0:
-                # save dual values  for later use (solving with a different objective
-                # will alter them in an undesirable way)
-                m.old_dual_dict = m.dual._dict.copy()
-            else:
-                # restore duals from the original solution
-                m.dual._dict = m.old_dual_dict
-
-        # setup model for next iteration
+    if hasattr(m, "dual"):
         if m.iteration_number == 0:
-            done = False # we'll have to run again for more smoothing
-        elif m.iteration_number == 1:
-            # restore the standard objective
-            m.Smooth_Free_Variables.deactivate()
-            m.Minimize_System_Cost.activate()
-            # unfix the variables
-            fix_obj_expression(m.Minimize_System_Cost, False)
-            # now we're done
-            done = True
+            # save dual values  for later use (solving with a different objective
+            # will alter them in an undesirable way)
+            m.old_dual_dict = m.dual._dict.copy()
         else:
-            raise RuntimeError("Reached unexpected iteration number {} in module {}.".format(m.iteration_number, __name__))
-    else:
-        # not smoothing the dispatch
-        done = True
+            # restore duals from the original solution
+            m.dual._dict = m.old_dual_dict
+            # and discard any values cached from the second solution
+            clear_value_cache(m)
 
-    return done
-
-def fix_obj_expression(e, status=True):
-    """Recursively fix all variables included in an objective expression."""
-    if hasattr(e, 'fixed'):
-        e.fixed = status      # see p. 171 of the Pyomo book
-    elif hasattr(e, '_numerator'):
-        for e2 in e._numerator:
-            fix_obj_expression(e2, status)
-        for e2 in e._denominator:
-            fix_obj_expression(e2, status)
-    elif hasattr(e, '_args'):
-        for e2 in e._args:
-            fix_obj_expression(e2, status)
-    elif hasattr(e, 'expr'):
-        fix_obj_expression(e.expr, status)
-    elif hasattr(e, 'is_constant') and e.is_constant():
-        pass    # numeric constant
+    # setup model for next iteration
+    if m.iteration_number == 0:
+        done = False # we'll have to run again for more smoothing
+    elif m.iteration_number == 1:
+        # restore the standard objective
+        m.Smooth_Free_Variables.deactivate()
+        m.Minimize_System_Cost.activate()
+        m.Smooth_Dispatch_Cost_Limit.deactivate()
+        m.warm_start = False
+        # now we're done
+        done = True
     else:
-        raise ValueError(
-            'Expression {e} does not have an expr, fixed or _args property, ' +
-            'so it cannot be fixed.'.format(e=e)
-        )
-        
+        raise RuntimeError("Reached unexpected iteration number {} in module {}.".format(m.iteration_number, __name__))
 
+    return done
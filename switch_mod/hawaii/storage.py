@@ -0,0 +1,195 @@
+"""Generic operating constraints for energy storage.
+
+The storage modules (batteries, pumped_hydro, hydrogen, etc.) define their own
+construction decisions, dispatch variables and costs, then call
+register_storage() to describe how those components fit the generic storage
+model below. This module then builds the operating constraints for all the
+registered storage assets at once, indexed by (technology, asset, timepoint),
+in define_dynamic_components(). New storage technologies can be added by
+writing a similar adapter, without repeating these constraints.
+
+Each storage technology has a set of assets (e.g., load zones or projects).
+Each asset charges and discharges at rates (MW) limited by its charging and
+discharging capacity in the current period. Energy is stored with
+charge_efficiency units per MWh of charging, and discharge_efficiency MWh
+are produced per unit withdrawn from storage. The storage balance is
+enforced in one of three ways (balance argument):
+
+level: the state of charge is tracked from each timepoint to the next within
+    each timeseries (circularly), and kept between
+    (1 - max_discharge_fraction) * energy_capacity and energy_capacity. The
+    level changes by the net charging rate times tp_duration_hrs during each
+    timepoint.
+
+timeseries: the energy stored during each timeseries (plus any inflow) must
+    be at least as much as the energy withdrawn; any surplus is spilled.
+
+interday: the net energy stored during each timeseries is transferred to or
+    from long-term storage (interday_store and interday_withdraw, indexed by
+    asset and timeseries). Transfers must balance over each period (weighted
+    by ts_scale_to_year), and the total amount stored each year must fit
+    within energy_capacity.
+"""
+
+import collections
+from pyomo.environ import *
+
+def register_storage(m, technology, assets, charge, discharge,
+    charge_capacity, discharge_capacity,
+    charge_efficiency=1.0, discharge_efficiency=1.0, inflow=0.0,
+    balance='level', level=None, energy_capacity=None, max_discharge_fraction=1.0,
+    interday_store=None, interday_withdraw=None):
+    """Add a storage technology to the model. This should be called from the
+    define_components() function of a storage module, which should also call
+    storage.define_dynamic_components() from its own define_dynamic_components().
+
+    assets is the name of the set of assets for this technology.
+    charge, discharge and level are the names of components indexed by
+    [asset, timepoint]. charge_capacity, discharge_capacity and energy_capacity
+    are the names of components indexed by [asset, period]. interday_store and
+    interday_withdraw are the names of components indexed by [asset, timeseries].
+    charge_efficiency, discharge_efficiency, inflow and max_discharge_fraction
+    may be numbers or names of parameters (scalar or indexed by asset).
+    """
+    if balance not in ('level', 'timeseries', 'interday'):
+        raise ValueError('Unknown storage balance type "{}" for {}.'.format(balance, technology))
+    if balance == 'level' and (level is None or energy_capacity is None):
+        raise ValueError('level and energy_capacity must be specified for {}.'.format(technology))
+    if balance == 'interday' and None in (interday_store, interday_withdraw, energy_capacity):
+        raise ValueError(
+            'interday_store, interday_withdraw and energy_capacity must be specified for {}.'
+            .format(technology)
+        )
+    if not hasattr(m, 'storage_technologies'):
+        m.storage_technologies = collections.OrderedDict()
+    m.storage_technologies[technology] = dict(
+        assets=assets, charge=charge, discharge=discharge,
+        charge_capacity=charge_capacity, discharge_capacity=discharge_capacity,
+        charge_efficiency=charge_efficiency, discharge_efficiency=discharge_efficiency,
+        inflow=inflow, balance=balance, level=level, energy_capacity=energy_capacity,
+        max_discharge_fraction=max_discharge_fraction,
+        interday_store=interday_store, interday_withdraw=interday_withdraw
+    )
+
+def define_dynamic_components(m):
+    # only define these once, even if this is called by several storage modules
+    if hasattr(m, 'STORAGE_ASSETS') or not hasattr(m, 'storage_technologies'):
+        return
+
+    def tech_component(m, tech, role):
+        return getattr(m, m.storage_technologies[tech][role])
+
+    def tech_value(m, tech, role, asset):
+        spec = m.storage_technologies[tech][role]
+        if isinstance(spec, basestring):
+            c = getattr(m, spec)
+            return c[asset] if c.is_indexed() else c
+        else:
+            return spec
+
+    # all storage assets, identified by (technology, asset)
+    m.STORAGE_ASSETS = Set(dimen=2, ordered=True, initialize=lambda m: [
+        (tech, a)
+            for tech in m.storage_technologies
+                for a in getattr(m, m.storage_technologies[tech]['assets'])
+    ])
+    def assets_with_balance(*balance_types):
+        return Set(dimen=2, ordered=True, initialize=lambda m: [
+            (tech, a) for (tech, a) in m.STORAGE_ASSETS
+                if m.storage_technologies[tech]['balance'] in balance_types
+        ])
+    m.LEVEL_STORAGE_ASSETS = assets_with_balance('level')
+    m.TIMESERIES_STORAGE_ASSETS = assets_with_balance('timeseries', 'interday')
+    m.INTERDAY_STORAGE_ASSETS = assets_with_balance('interday')
+
+    # technology data for each asset
+    m.storage_charge_efficiency = Param(m.STORAGE_ASSETS, initialize=lambda m, tech, a:
+        tech_value(m, tech, 'charge_efficiency', a))
+    m.storage_discharge_efficiency = Param(m.STORAGE_ASSETS, initialize=lambda m, tech, a:
+        tech_value(m, tech, 'discharge_efficiency', a))
+    m.storage_inflow_mw = Param(m.STORAGE_ASSETS, initialize=lambda m, tech, a:
+        tech_value(m, tech, 'inflow', a))
+    m.storage_max_discharge_fraction = Param(m.LEVEL_STORAGE_ASSETS, initialize=lambda m, tech, a:
+        tech_value(m, tech, 'max_discharge_fraction', a))
+
+    # net amount added to storage during each timepoint (units of storage per hour)
+    m.StorageNetStoreRate = Expression(m.STORAGE_ASSETS, m.TIMEPOINTS, rule=lambda m, tech, a, t:
+        m.storage_charge_efficiency[tech, a] * tech_component(m, tech, 'charge')[a, t]
+        + m.storage_inflow_mw[tech, a]
+        - tech_component(m, tech, 'discharge')[a, t] / m.storage_discharge_efficiency[tech, a]
+    )
+
+    # limits on charging and discharging
+    m.Storage_Max_Charge = Constraint(m.STORAGE_ASSETS, m.TIMEPOINTS, rule=lambda m, tech, a, t:
+        tech_component(m, tech, 'charge')[a, t]
+        <=
+        tech_component(m, tech, 'charge_capacity')[a, m.tp_period[t]]
+    )
+    m.Storage_Max_Discharge = Constraint(m.STORAGE_ASSETS, m.TIMEPOINTS, rule=lambda m, tech, a, t:
+        tech_component(m, tech, 'discharge')[a, t]
+        <=
+        tech_component(m, tech, 'discharge_capacity')[a, m.tp_period[t]]
+    )
+
+    # state of charge at the start of each timepoint, based on conservation of energy
+    # NOTE: this is circular for each timeseries
+    # NOTE: the overall level for the day is free, but the levels each timepoint are chained.
+    m.Storage_Level_Calc = Constraint(m.LEVEL_STORAGE_ASSETS, m.TIMEPOINTS, rule=lambda m, tech, a, t:
+        tech_component(m, tech, 'level')[a, t]
+        ==
+        tech_component(m, tech, 'level')[a, m.tp_previous[t]]
+        + m.StorageNetStoreRate[tech, a, m.tp_previous[t]] * m.tp_duration_hrs[m.tp_previous[t]]
+    )
+    m.Storage_Min_Level = Constraint(m.LEVEL_STORAGE_ASSETS, m.TIMEPOINTS, rule=lambda m, tech, a, t:
+        (1.0 - m.storage_max_discharge_fraction[tech, a])
+            * tech_component(m, tech, 'energy_capacity')[a, m.tp_period[t]]
+        <=
+        tech_component(m, tech, 'level')[a, t]
+    )
+    m.Storage_Max_Level = Constraint(m.LEVEL_STORAGE_ASSETS, m.TIMEPOINTS, rule=lambda m, tech, a, t:
+        tech_component(m, tech, 'level')[a, t]
+        <=
+        tech_component(m, tech, 'energy_capacity')[a, m.tp_period[t]]
+    )
+
+    # net storage during each timeseries
+    # for 'timeseries' assets, this must be non-negative (any surplus is spilled);
+    # for 'interday' assets, this is transferred to or from long-term storage
+    def Storage_Timeseries_Balance_rule(m, tech, a, ts):
+        net_stored = m.ts_duration_of_tp[ts] * sum(
+            m.StorageNetStoreRate[tech, a, tp] for tp in m.TS_TPS[ts]
+        )
+        if m.storage_technologies[tech]['balance'] == 'interday':
+            return (
+                tech_component(m, tech, 'interday_store')[a, ts]
+                - tech_component(m, tech, 'interday_withdraw')[a, ts]
+                ==
+                net_stored
+            )
+        else:
+            return net_stored >= 0
+    m.Storage_Timeseries_Balance = Constraint(
+        m.TIMESERIES_STORAGE_ASSETS, m.TIMESERIES, rule=Storage_Timeseries_Balance_rule
+    )
+
+    # long-term storage must balance over each period and have room for
+    # _all_ the energy stored each year
+    # note: this assumes we cycle the system only once per year (store all energy, then release all energy)
+    # alternatives: allow monthly or seasonal cycling, or directly model the whole year with inter-day linkages
+    m.Storage_Interday_Balance = Constraint(m.INTERDAY_STORAGE_ASSETS, m.PERIODS, rule=lambda m, tech, a, p:
+        sum(
+            (
+                tech_component(m, tech, 'interday_store')[a, ts]
+                - tech_component(m, tech, 'interday_withdraw')[a, ts]
+            ) * m.ts_scale_to_year[ts]
+            for ts in m.TIMESERIES if m.ts_period[ts] == p
+        ) == 0
+    )
+    m.Storage_Interday_Capacity = Constraint(m.INTERDAY_STORAGE_ASSETS, m.PERIODS, rule=lambda m, tech, a, p:
+        sum(
+            tech_component(m, tech, 'interday_store')[a, ts] * m.ts_scale_to_year[ts]
+            for ts in m.TIMESERIES if m.ts_period[ts] == p
+        )
+        <=
+        tech_component(m, tech, 'energy_capacity')[a, p]
+    )
@@ -1,5 +1,7 @@
 import csv, sys, time, itertools
 from pyomo.environ import value
+from switch_mod.utilities import queue_output
+import switch_mod.export as export
 import __main__ as main
 
 # check whether this is an interactive session
@@ -14,15 +16,22 @@ csv.register_dialect("ampl-tab",
     skipinitialspace = False
 )
 
-def create_table(**kwargs):
-    """Create an empty output table and write the headings."""
+def create_table(model=None, **kwargs):
+    """Create an empty output table and write the headings.
+    If model is specified and was run with --results-db, the table is
+    created in the results database instead."""
     output_file = kwargs["output_file"]
     headings = kwargs["headings"]
 
-    with open(output_file, 'wb') as f:
-        w = csv.writer(f, dialect="ampl-tab")
-        # write header row
-        w.writerow(list(headings))
+    store = None if model is None else export.get_results_store(model)
+    if store is not None:
+        store.write_table(export.table_name(output_file), headings, [])
+        return
+
+    # note: if a background writer has been started (see
+    # switch_mod.utilities.start_background_writer()), the file will be
+    # written later, on a separate thread.
+    queue_output(write_rows, output_file, 'wb', [list(headings)])
 
 def append_table(model, *indexes, **kwargs):
     """Add rows to an output table, iterating over the indexes specified, 
@@ -33,16 +42,24 @@ def append_table(model, *indexes, **kwargs):
     # create a master indexing set 
     # this is a list of lists, even if only one list was specified
     idx = itertools.product(*indexes)
-    with open(output_file, 'ab') as f:
+    # retrieve all the values from the model now, since it may change
+    # before a background writer gets to them
+    rows = [
+        tuple(value(v) for v in values(model, *unpack_elements(x))) 
+        for x in idx
+    ]
+    store = export.get_results_store(model)
+    if store is not None:
+        # add to the table created by create_table(model, ...) (see --results-db)
+        store.append_rows(export.table_name(output_file), rows)
+    else:
+        queue_output(write_rows, output_file, 'ab', rows)
+
+def write_rows(output_file, mode, rows):
+    """Write rows of plain values to output_file, opened with the specified mode."""
+    with open(output_file, mode) as f:
         w = csv.writer(f, dialect="ampl-tab")
-        # write the data
-        # import pdb
-        # if 'rfm' in output_file:
-        #     pdb.set_trace()
-        w.writerows(
-            tuple(value(v) for v in values(model, *unpack_elements(x))) 
-            for x in idx
-        )
+        w.writerows(rows)
 
 def unpack_elements(tup):
     """Unpack any multi-element objects within tup, to make a single flat tuple.
@@ -70,8 +87,17 @@ def write_table(model, *indexes, **kwargs):
     sys.stdout.flush()  # display the part line to the user
     start=time.time()
 
-    create_table(**kwargs)
-    append_table(model, *indexes, **kwargs)
+    store = export.get_results_store(model)
+    if store is not None:
+        # save in the results database instead (see --results-db)
+        idx = itertools.product(*indexes)
+        store.write_table(
+            export.table_name(output_file), kwargs["headings"],
+            (tuple(value(v) for v in kwargs["values"](model, *unpack_elements(x))) for x in idx)
+        )
+    else:
+        create_table(model, **kwargs)
+        append_table(model, *indexes, **kwargs)
 
     print "time taken: {dur:.2f}s".format(dur=time.time()-start)
 
@@ -82,6 +108,10 @@ def get(component, index, default=None):
 def log(msg):
     sys.stdout.write(msg)
     sys.stdout.flush()  # display output to the user, even a partial line
+
+def queue_log(msg):
+    """Display msg on the background writer thread, if any (see queue_output())."""
+    queue_output(log, msg)
     
 def tic():
     tic.start_time = time.time()
@@ -129,6 +129,30 @@ def define_dynamic_components(mod):
                 for component in m.LZ_Energy_Components_Consume)))
 
 
+def marginal_costs(instance, default=None):
+    """
+
+    Return a dict of {(load_zone, timepoint): marginal cost} giving the
+    marginal cost of supplying energy in each load zone and timepoint in
+    real dollars per MWh (not discounted to the base year). This is the
+    dual value of Energy_Balance divided by
+    bring_timepoint_costs_to_base_year. All the duals are fetched in one
+    pass and the result is cached until the next solution is loaded, so
+    exporters and iterative modules (e.g., demand response) can share it.
+    Load zones and timepoints without a dual value get the default value.
+
+    """
+    from switch_mod.utilities import cached_value, get_duals
+    def calculate():
+        duals = get_duals(instance, instance.Energy_Balance)
+        weight = dict(instance.bring_timepoint_costs_to_base_year.iteritems())
+        return {
+            (lz, tp): default if d is None else d / weight[tp]
+            for ((lz, tp), d) in duals.iteritems()
+        }
+    return cached_value(instance, ('marginal_costs', default), calculate)
+
+
 def load_inputs(mod, switch_data, inputs_dir):
     """
 
@@ -172,14 +196,16 @@ def save_results(model, instance, outdir):
 
     """
     import switch_mod.export as export
+    from switch_mod.utilities import get_values
+    components = (
+        instance.LZ_Energy_Components_Produce +
+        instance.LZ_Energy_Components_Consume)
+    # evaluate each component once, rather than element by element
+    component_values = [
+        get_values(instance, getattr(instance, c)) for c in components]
     export.write_table(
         instance, instance.LOAD_ZONES, instance.TIMEPOINTS,
         output_file=os.path.join(outdir, "load_balance.txt"),
-        headings=("load_zone", "timestamp",) + tuple(
-            instance.LZ_Energy_Components_Produce +
-            instance.LZ_Energy_Components_Consume),
+        headings=("load_zone", "timestamp",) + tuple(components),
         values=lambda m, lz, t: (lz, m.tp_timestamp[t],) + tuple(
-            getattr(m, component)[lz, t]
-            for component in (
-                m.LZ_Energy_Components_Produce +
-                m.LZ_Energy_Components_Consume)))
+            vals[lz, t] for vals in component_values))
@@ -55,6 +55,9 @@ def define_components(mod):
     LZ_PROJECTS[lz in LOAD_ZONES] is an indexed set that lists all
     projects within each load zone.
 
+    GEN_TECH_PROJECTS[g in GENERATION_TECHNOLOGIES] is an indexed set
+    that lists all projects that use each generation technology.
+
     PROJECTS_CAP_LIMITED is the subset of PROJECTS that are capacity
     limited. Most of these will be generator types that are resource
     limited like wind, solar or geothermal, but this can be specified
@@ -267,6 +270,10 @@ def define_components(mod):
         mod.LOAD_ZONES,
         initialize=lambda m, lz: set(
             p for p in m.PROJECTS if m.proj_load_zone[p] == lz))
+    mod.GEN_TECH_PROJECTS = Set(
+        mod.GENERATION_TECHNOLOGIES,
+        initialize=lambda m, g: set(
+            p for p in m.PROJECTS if m.proj_gen_tech[p] == g))
     mod.PROJECTS_CAP_LIMITED = Set(within=mod.PROJECTS)
     mod.proj_capacity_limit_mw = Param(
         mod.PROJECTS_CAP_LIMITED,
@@ -21,6 +21,12 @@ import os
 from pyomo.environ import *
 
 
+def define_arguments(argparser):
+    argparser.add_argument("--dispatch-format", choices=['long', 'wide'], default='wide',
+        help="Layout for dispatch results: 'wide' (default) writes dispatch.txt, "
+             "with one row per timepoint and one column per project; 'long' "
+             "writes dispatch_long.txt, with one row per active timepoint and project.")
+
 def define_components(mod):
     """
 
@@ -34,6 +40,23 @@ def define_components(mod):
     of this set. Members of this set can be abbreviated as (proj, t) or
     (prj, t).
 
+    PROJ_DISPATCH_PERIODS is the set of projects and periods in which
+    they can be dispatched. A project can be dispatched in every timepoint
+    of each of these periods.
+
+    PROJECTS_ACTIVE_IN_PERIOD[p in PERIODS] is an indexed set showing
+    the projects that can be dispatched during each period.
+
+    PROJ_DISPATCH_TPS[proj in PROJECTS] is an indexed set showing the
+    timepoints when each project can be dispatched. This is equivalent to
+    the members of PROJ_DISPATCH_POINTS for a single project.
+
+    ProjEnergyInPeriod[(proj, p) in PROJ_DISPATCH_PERIODS] is the total
+    energy in MWh produced by a project during a period, i.e., the sum of
+    DispatchProj weighted by tp_weight. This provides a compact way to
+    write period-level energy accounting (e.g., renewable portfolio
+    standards) without searching PROJ_DISPATCH_POINTS.
+
     ProjCapacityTP[(proj, t) in PROJ_DISPATCH_POINTS] is the same as
     ProjCapacity but indexed by timepoint rather than period to allow
     more compact statements.
@@ -110,6 +133,12 @@ def define_components(mod):
     project.unitcommit module implements unit commitment decisions with
     startup fuel requirements and a marginal heat rate.
 
+    PROJ_FUEL_DISPATCH_PERIODS is the set of fuel-based projects, periods
+    when they can be dispatched, and fuels they can use, i.e., the
+    period-level counterpart of PROJ_FUEL_DISPATCH_POINTS.
+    PROJ_FUELS_ACTIVE_IN_PERIOD[p in PERIODS] is an indexed set of the
+    (proj, f) combinations in PROJ_FUEL_DISPATCH_PERIODS for each period.
+
     DispatchEmissions[(proj, t, f) in PROJ_FUEL_DISPATCH_POINTS] is the
     emissions produced by dispatching a fuel-based project in units of
     metric tonnes CO2 per hour. This is derived from the fuel
@@ -147,25 +176,48 @@ def define_components(mod):
         mod.TIMEPOINTS,
         within=mod.PROJECTS,
         initialize=init_projects_active_in_timepoints)
-    def init_dispatch_timepoints(m):
-        dispatch_timepoints = set() # could technically be a list
-        proj_op_periods = set()     # used to avoid duplicating effort
+    def init_dispatch_periods(m):
+        proj_op_periods = set()
         for (proj, bld_yr) in m.PROJECT_BUILDYEARS:
             for period in m.PROJECT_BUILDS_OPERATIONAL_PERIODS[proj, bld_yr]:
-                if (proj, period) not in proj_op_periods:
-                    proj_op_periods.add((proj, period))
-                    for t in m.PERIOD_TPS[period]:
-                        dispatch_timepoints.add((proj, t))
-        return dispatch_timepoints
+                proj_op_periods.add((proj, period))
+        return proj_op_periods
+    mod.PROJ_DISPATCH_PERIODS = Set(
+        dimen=2,
+        initialize=init_dispatch_periods)
+    # PROJECTS_ACTIVE_IN_PERIOD is filled in with one pass through
+    # PROJ_DISPATCH_PERIODS, rather than searching it for each period
+    mod.PROJECTS_ACTIVE_IN_PERIOD = Set(
+        mod.PERIODS,
+        within=mod.PROJECTS,
+        initialize=lambda m, period: [])
+    def PROJECTS_ACTIVE_IN_PERIOD_rule(m):
+        for (proj, period) in m.PROJ_DISPATCH_PERIODS:
+            m.PROJECTS_ACTIVE_IN_PERIOD[period].add(proj)
+    mod.PROJECTS_ACTIVE_IN_PERIOD_Build = BuildAction(
+        rule=PROJECTS_ACTIVE_IN_PERIOD_rule)
     mod.PROJ_DISPATCH_POINTS = Set(
         dimen=2,
-        initialize=init_dispatch_timepoints)
+        initialize=lambda m: (
+            (proj, t) for (proj, period) in m.PROJ_DISPATCH_PERIODS
+                for t in m.PERIOD_TPS[period]))
+    mod.PROJ_DISPATCH_TPS = Set(
+        mod.PROJECTS,
+        within=mod.TIMEPOINTS,
+        initialize=lambda m, proj: [
+            t for p in m.PERIODS if (proj, p) in m.PROJ_DISPATCH_PERIODS
+                for t in m.PERIOD_TPS[p]])
     mod.ProjCapacityTP = Expression(
         mod.PROJ_DISPATCH_POINTS,
         rule=lambda m, proj, t: m.ProjCapacity[proj, m.tp_period[t]])
     mod.DispatchProj = Var(
         mod.PROJ_DISPATCH_POINTS,
         within=NonNegativeReals)
+    mod.ProjEnergyInPeriod = Expression(
+        mod.PROJ_DISPATCH_PERIODS,
+        rule=lambda m, proj, period: sum(
+            m.DispatchProj[proj, t] * m.tp_weight[t]
+            for t in m.PERIOD_TPS[period]))
     mod.LZ_NetDispatch = Expression(
         mod.LOAD_ZONES, mod.TIMEPOINTS,
         rule=lambda m, lz, t: sum(
@@ -268,6 +320,21 @@ def define_components(mod):
     mod.ProjFuelUseRate = Var(
         mod.PROJ_FUEL_DISPATCH_POINTS,
         within=NonNegativeReals)
+    mod.PROJ_FUEL_DISPATCH_PERIODS = Set(
+        dimen=3,
+        initialize=lambda m: (
+            (p, period, f) for (p, period) in m.PROJ_DISPATCH_PERIODS
+                if p in m.FUEL_BASED_PROJECTS
+                    for f in m.G_FUELS[m.proj_gen_tech[p]]))
+    mod.PROJ_FUELS_ACTIVE_IN_PERIOD = Set(
+        mod.PERIODS,
+        dimen=2,
+        initialize=lambda m, period: [])
+    def PROJ_FUELS_ACTIVE_IN_PERIOD_rule(m):
+        for (p, period, f) in m.PROJ_FUEL_DISPATCH_PERIODS:
+            m.PROJ_FUELS_ACTIVE_IN_PERIOD[period].add((p, f))
+    mod.PROJ_FUELS_ACTIVE_IN_PERIOD_Build = BuildAction(
+        rule=PROJ_FUELS_ACTIVE_IN_PERIOD_rule)
 
     def DispatchEmissions_rule(m, proj, t, f):
         g = m.proj_gen_tech[proj]
@@ -347,15 +414,35 @@ def save_results(model, instance, outdir):
     This initial placeholder version is integrating snippets of
     some of Matthias's code into the main codebase.
 
+    By default, dispatch.txt has one row per timepoint and one column per
+    project. Use --dispatch-format long to write dispatch_long.txt instead,
+    in a sparse "long" format with one row per active (timepoint, project)
+    pair (i.e., per member of PROJ_DISPATCH_POINTS).
+
     """
     import switch_mod.export as export
-    export.write_table(
-        instance, instance.TIMEPOINTS,
-        output_file=os.path.join(outdir, "dispatch.txt"),
-        headings=("timestamp",)+tuple(instance.PROJECTS),
-        values=lambda m, t: (m.tp_timestamp[t],) + tuple(
-            m.DispatchProj[p, t] if (p, t) in m.PROJ_DISPATCH_POINTS
-            else 0.0
-            for p in m.PROJECTS
+    if getattr(instance.options, 'dispatch_format', 'wide') == 'wide':
+        export.write_table(
+            instance, instance.TIMEPOINTS,
+            output_file=os.path.join(outdir, "dispatch.txt"),
+            headings=("timestamp",)+tuple(instance.PROJECTS),
+            values=lambda m, t: (m.tp_timestamp[t],) + tuple(
+                m.DispatchProj[p, t] if (p, t) in m.PROJ_DISPATCH_POINTS
+                else 0.0
+                for p in m.PROJECTS
+            )
+        )
+    else:
+        # retrieve all the dispatch values at once, then sort the active
+        # points by timepoint (in timepoint order) and project
+        dispatch = instance.DispatchProj.get_values()
+        tp_order = {t: i for (i, t) in enumerate(instance.TIMEPOINTS)}
+        points = sorted(instance.PROJ_DISPATCH_POINTS,
+                        key=lambda pt: (tp_order[pt[1]], pt[0]))
+        export.write_table(
+            instance, points,
+            output_file=os.path.join(outdir, "dispatch_long.txt"),
+            headings=("timepoint", "timestamp", "project", "DispatchProj"),
+            values=lambda m, pt: (
+                pt[1], m.tp_timestamp[pt[1]], pt[0], dispatch[pt])
         )
-    )
@@ -60,6 +60,10 @@ def define_components(mod):
     calculates power production by each project from each fuel during
     each timepoint.
 
+    ProjEnergyByFuelInPeriod[(proj, p, f) in PROJ_FUEL_DISPATCH_PERIODS]
+    is the total energy in MWh produced by each project from each fuel
+    during each period (DispatchProjByFuel weighted by tp_weight).
+
     """
 
     # NOTE: BaseloadOperatingLevelForPeriod should eventually be replaced by 
@@ -115,4 +119,10 @@ def define_components(mod):
         mod.PROJ_FUEL_DISPATCH_POINTS,
         rule=lambda m, proj, t, f:
             m.ProjFuelUseRate[proj, t, f] / m.proj_full_load_heat_rate[proj]
-    )
\ No newline at end of file
+    )
+    mod.ProjEnergyByFuelInPeriod = Expression(
+        mod.PROJ_FUEL_DISPATCH_PERIODS,
+        rule=lambda m, proj, period, f: sum(
+            m.DispatchProjByFuel[proj, t, f] * m.tp_weight[t]
+            for t in m.PERIOD_TPS[period])
+    )
@@ -294,6 +294,10 @@ def _parse_inc_heat_rate_file(path, id_column):
     """
     Parse tabular incremental heat rate data, calculate a series of
     lines that describe each segment, and perform various error checks.
+    The file is read in a single pass and each unit's curve is built and
+    checked (contiguous segments, increasing power and non-decreasing
+    incremental heat rates) in one sweep along its segments. Problems
+    with all units are collected and reported in a single ValueError.
 
     SYNOPSIS:
     >>> import switch_mod.project.unitcommit.fuel_use as f
@@ -308,96 +312,93 @@ def _parse_inc_heat_rate_file(path, id_column):
 
 
     """
-    # fuel_rate_points[unit] = {min_power: fuel_use_rate}
-    fuel_rate_points = {}
+    # start_points[unit] = (min_power, fuel_use_rate) for the first point
+    start_points = {}
+    # ihr_dat[unit] = [(power_start, power_end, ihr), ...]
+    ihr_dat = {}
     # fuel_rate_segments[unit] = [(intercept1, slope1), (int2, slope2)...]
     # Stores the description of each linear segment of a fuel rate curve.
     fuel_rate_segments = {}
-    # ihr_dat stores incremental heat rate records as a list for each unit
-    ihr_dat = {}
     # min_cap_factor[unit] and full_load_hr[unit] are for error checking.
     min_cap_factor = {}
     full_load_hr = {}
-    # Scan the file and stuff the data into dictionaries for easy access.
-    # Parse the file and stuff data into dictionaries indexed by units.
+    # errors[unit] = [message, ...]; all problems are reported together
+    # at the end, rather than stopping at the first bad unit.
+    errors = {}
+    def add_error(u, msg):
+        errors.setdefault(u, []).append(msg)
+
+    # Read the whole file in one pass, grouping rows by unit.
     with open(path, 'rb') as hr_file:
-        dat = list(csv.DictReader(hr_file, delimiter='	'))
-        for row in dat:
+        for row in csv.DictReader(hr_file, delimiter='\t'):
             u = row[id_column]
             p1 = float(row['power_start_mw'])
             p2 = row['power_end_mw']
             ihr = row['incremental_heat_rate_mbtu_per_mwhr']
             fr = row['fuel_use_rate_mmbtu_per_h']
             # Does this row give the first point?
-            if(p2 == '.' and ihr == '.'):
-                fr = float(fr)
-                if(u in fuel_rate_points):
-                    ValueError(
-                        "Error processing incremental heat rates for " +
-                        u + " in " + path + ". More than one row has " +
-                        "a fuel use rate specified.")
-                fuel_rate_points[u] = {p1: fr}
+            if p2 == '.' and ihr == '.':
+                if u in start_points:
+                    add_error(u, "More than one row has a fuel use rate specified.")
+                start_points[u] = (p1, float(fr))
             # Does this row give a line segment?
-            elif(fr == '.'):
-                p2 = float(p2)
-                ihr = float(ihr)
-                if(u not in ihr_dat):
-                    ihr_dat[u] = []
-                ihr_dat[u].append((p1, p2, ihr))
-            # Throw an error if the row's format is not recognized.
+            elif fr == '.':
+                ihr_dat.setdefault(u, []).append((p1, float(p2), float(ihr)))
+            # Flag the row if its format is not recognized.
             else:
-                ValueError(
-                    "Error processing incremental heat rates for row " +
-                    u + " in " + path + ". Row format not recognized for " +
-                    "row " + str(row) + ". See documentation for acceptable " +
-                    "formats.")
-    # Make sure that each project that has incremental heat rates defined
-    # also has a starting point defined.
-    # note: keys() returns lists in arbitrary order, so they could fail an equality test; 
-    # but unordered sets can be compared (sorting would also work)
-    if set(ihr_dat.keys()) != set(fuel_rate_points.keys()):
-        ValueError(
-            "One or more unit did not define both a starting point " +
-            "and incremental heat rates for their fuel use curves.")
+                add_error(u, (
+                    "Row format not recognized for row {}. See documentation " +
+                    "for acceptable formats.").format(row))
+
+    # Make sure that each unit that has incremental heat rates defined
+    # also has a starting point defined, and vice versa.
+    for u in set(ihr_dat).symmetric_difference(start_points):
+        add_error(u, "Unit did not define both a starting point and " +
+                     "incremental heat rates for its fuel use curve.")
+
     # Construct a convex combination of lines describing a fuel use
-    # curve for each representative unit "u".
-    for u in fuel_rate_points:
-        fuel_rate_segments[u] = []
-        fr_points = fuel_rate_points[u]
-        # Sort the line segments by their domains.
-        ihr_dat[u].sort()
+    # curve for each representative unit "u". The intercepts are
+    # accumulated along each curve while checking that the segments are
+    # contiguous, increasing in power and increasing in slope (convex).
+    for u in ihr_dat:
+        if u not in start_points:
+            continue
+        segments = sorted(ihr_dat[u])
+        (min_power, fuel_rate) = start_points[u]
         # Assume that the maximum power output is the rated capacity.
-        (junk, capacity, junk) = ihr_dat[u][len(ihr_dat[u])-1]
-        # Retrieve the first incremental heat rate for error checking.
-        (min_power, junk, ihr_prev) = ihr_dat[u][0]
-        min_cap_factor[u] = min_power / capacity
-        # Process each line segment.
-        for segment in range(0, len(ihr_dat[u])):
-            (p_start, p_end, ihr) = ihr_dat[u][segment]
-            # Error check: This incremental heat rate cannot be less than
-            # the previous one.
-            if ihr_prev > ihr:
-                ValueError((
-                    "Error processing incremental heat rates for " +
-                    "{} in file {}. The incremental heat rate " +
-                    "between power output levels {}-{} is less than " +
-                    "that of the prior line segment.").format(
-                        u, path, p_start, p_end))
-            # Error check: This segment needs to start at an existing point.
-            if p_start not in fr_points:
-                ValueError((
-                    "Error processing incremental heat rates for " +
-                    "{} in file {}. The incremental heat rate " +
-                    "between power output levels {}-{} does not start at a " +
-                    "previously defined point or line segment.").format(
-                        u, path, p_start, p_end))
+        capacity = segments[-1][1]
+        min_cap_factor[u] = segments[0][0] / capacity
+        fuel_rate_segments[u] = []
+        (power_prev, ihr_prev) = (min_power, segments[0][2])
+        for (p_start, p_end, ihr) in segments:
+            if p_start != power_prev:
+                add_error(u, (
+                    "The incremental heat rate between power output levels " +
+                    "{}-{} does not start at a previously defined point " +
+                    "or line segment.").format(p_start, p_end))
+            if p_end <= p_start:
+                add_error(u, (
+                    "The line segment between power output levels {}-{} " +
+                    "does not increase power output.").format(p_start, p_end))
+            if ihr < ihr_prev:
+                add_error(u, (
+                    "The incremental heat rate between power output levels " +
+                    "{}-{} is less than that of the prior line segment.").format(
+                        p_start, p_end))
             # Calculate the y-intercept then normalize it by the capacity.
-            intercept_norm = (fr_points[p_start] - ihr * p_start) / capacity
-            # Save the line segment's definition.
-            fuel_rate_segments[u].append((intercept_norm, ihr))
-            # Add a point for the end of the segment for the next iteration.
-            fr_points[p_end] = fr_points[p_start] + (p_end - p_start) * ihr
-            ihr_prev = ihr
+            fuel_rate_segments[u].append(((fuel_rate - ihr * p_start) / capacity, ihr))
+            # Move to the end of the segment for the next iteration.
+            fuel_rate = fuel_rate + (p_end - p_start) * ihr
+            (power_prev, ihr_prev) = (p_end, ihr)
         # Calculate the max load heat rate for error checking
-        full_load_hr[u] = fr_points[capacity] / capacity
+        full_load_hr[u] = fuel_rate / capacity
+
+    if errors:
+        raise ValueError(
+            "Error processing incremental heat rates in {}:\n".format(path) +
+            "\n".join(
+                "{}: {}".format(u, msg)
+                for u in sorted(errors) for msg in errors[u]
+            )
+        )
     return (fuel_rate_segments, min_cap_factor, full_load_hr)
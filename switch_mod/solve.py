@@ -6,7 +6,7 @@ from pyomo.environ import *
 from pyomo.opt import SolverFactory, SolverStatus, TerminationCondition
 import pyomo.version
 
-from utilities import create_model, _ArgumentParser, Logging
+from utilities import create_model, _ArgumentParser, Logging, clear_value_cache
 
 
 def main(args=None, return_model=False, return_instance=False):
@@ -262,6 +262,22 @@ def define_arguments(argparser):
     #     help='Directory containing input files (default is "inputs")')
     argparser.add_argument("--outputs-dir", default="outputs",
         help='Directory to write output files (default is "outputs")')
+    argparser.add_argument("--results-db", default=None,
+        help='SQLite database file to store output tables in, instead of writing separate files '
+             'in the outputs directory. Rows are labeled with the --scenario-name, so one database '
+             'can be shared by many scenarios.')
+    argparser.add_argument("--save-vars", nargs='+', default=['*'],
+        help='Names of variables to save in individual .tab files in the outputs directory. '
+             'These may include shell-style wildcards, e.g., "Build*" (default is all variables)')
+    argparser.add_argument("--skip-vars", nargs='+', default=[],
+        help='Names of variables (or wildcard patterns) not to save, even if they match --save-vars')
+    argparser.add_argument("--omit-zero-vars", action='store_true', default=False,
+        help='Leave rows with zero values out of the variable .tab files')
+    argparser.add_argument("--export-workers", type=int, default=None,
+        help='Number of worker processes to use for saving results after the model is solved. '
+             'Each module\'s results are saved by a separate task, and errors are reported '
+             'together at the end (default is to save results one module at a time in the main process; '
+             'requires an operating system that supports fork())')
 
     # General purpose arguments
     argparser.add_argument(
@@ -452,6 +468,11 @@ def solve(model):
     if not hasattr(model.solver, "_options_string_to_dict"):
         solver_args.pop("options_string", "")
 
+    # start from the current solution if a module requested it (e.g., smooth_dispatch)
+    # and the solver supports that
+    if getattr(model, "warm_start", False) and model.solver.warm_start_capable():
+        solver_args["warmstart"] = True
+
     # solve the model
     if model.options.verbose:
         print "solving model..."
@@ -470,6 +491,8 @@ def solve(model):
     
     # check for errors
     model.solutions.load_from(results)
+    # discard any values cached from a previous solution
+    clear_value_cache(model)
     if results.solver.termination_condition == pyomo.opt.TerminationCondition.infeasible:
         if hasattr(model, "iis"):
             print "Model was infeasible; irreducible infeasible set (IIS) returned by solver:"
@@ -5,7 +5,10 @@
 Utility functions for SWITCH-pyomo.
 """
 
+import collections
 import csv
+import fnmatch
+import itertools
 import os
 import types
 import importlib
@@ -133,7 +136,8 @@ def load_inputs(model, inputs_dir=None, attachDataPortal=True):
 
 
 def save_inputs_as_dat(model, instance, save_path="inputs/complete_inputs.dat",
-                       exclude=[], deterministic_order=False):
+                       exclude=[], deterministic_order=False, skip_defaults=False,
+                       compress=None, chunk_size=10000):
     """
     Save input data to a .dat file for use with PySP or other command line
     tools that have not been fully integrated with DataPortal.
@@ -142,45 +146,56 @@ def save_inputs_as_dat(model, instance, save_path="inputs/complete_inputs.dat",
     that calls this function, imports the dat file, and verifies it matches
     the original data.
 
+    The file is written as a stream: each Set and Param is formatted and
+    written in chunks of chunk_size entries, so the complete text of the
+    .dat file is never held in memory. If skip_defaults is True, entries of
+    indexed Params that equal the Param's (constant) default value are
+    omitted (Pyomo will fill them back in when the file is loaded). If compress is True,
+    or if it is None and save_path ends with ".gz", the output is written
+    with gzip compression. Note that Pyomo cannot read compressed .dat files
+    directly, so these must be decompressed before use.
+
     SYNOPSIS:
     >>> from switch_mod.utilities import define_AbstractModel
     >>> model = define_AbstractModel(
     ...     'switch_mod', 'project.no_commit', 'fuel_cost')
     >>> instance = model.load_inputs(inputs_dir='test_dat')
     >>> save_inputs_as_dat(model, instance, save_path="test_dat/complete_inputs.dat")
-    
+
 
     """
-    # helper function to convert values to strings,
-    # putting quotes around values that start as strings
-    quote_str = lambda v: '"{}"'.format(v) if isinstance(v, basestring) else '{}'.format(str(v))
-    
-    with open(save_path, "w") as f:
+    if compress is None:
+        compress = save_path.endswith(".gz")
+    if compress:
+        import gzip
+        f = gzip.open(save_path, "wb")
+    else:
+        f = open(save_path, "w")
+    with f:
         for component_name in instance.DataPortal.data():
             if component_name in exclude:
-                continue    # don't write data for components in exclude list 
+                continue    # don't write data for components in exclude list
                             # (they're in scenario-specific files)
             component = getattr(model, component_name)
             comp_class = type(component).__name__
             component_data = instance.DataPortal.data(name=component_name)
             if comp_class == 'SimpleSet' or comp_class == 'OrderedSimpleSet':
                 f.write("set " + component_name + " := ")
-                f.write(' '.join(map(str, component_data))) # space-separated list
+                _write_chunks(f, (str(v) + " " for v in component_data), chunk_size)
                 f.write(";\n")
             elif comp_class == 'IndexedParam':
-                if len(component_data) > 0:  # omit components for which no data were provided
-                    f.write("param " + component_name + " := ")
-                    if component.index_set().dimen == 1:
-                        f.write(' '.join(str(key) + " " + quote_str(value)
-                                for key,value in component_data.iteritems()))
-                    else:
-                        f.write("\n")
-                        for key,value in (sorted(component_data.iteritems()) 
-                                          if deterministic_order 
-                                          else component_data.iteritems()):
-                            f.write(" " + 
-                                    ' '.join(map(str, key)) + " " +
-                                    quote_str(value) + "\n")
+                items = (sorted(component_data.iteritems())
+                         if deterministic_order
+                         else component_data.iteritems())
+                if skip_defaults:
+                    items = _non_default_items(component, items)
+                lines = _dat_param_lines(items, component.index_set().dimen)
+                # omit components for which no data were provided (or all were defaults)
+                first_line = next(lines, None)
+                if first_line is not None:
+                    f.write("param " + component_name + " := \n")
+                    f.write(first_line)
+                    _write_chunks(f, lines, chunk_size)
                     f.write(";\n")
             elif comp_class == 'SimpleParam':
                 f.write("param " + component_name + " := " + str(component_data) + ";\n")
@@ -192,13 +207,59 @@ def save_inputs_as_dat(model, instance, save_path="inputs/complete_inputs.dat",
                 #     component_name)
                 for key in component_data:  # note: key is always a tuple
                     f.write("set " + component_name + "[" + ",".join(map(str, key)) + "] := ")
-                    f.write(' '.join(map(str, component_data[key]))) # space-separated list
+                    _write_chunks(f, (str(v) + " " for v in component_data[key]), chunk_size)
                     f.write(";\n")
             else:
                 raise ValueError(
                     "Error! Component type {} not recognized for model element '{}'.".
                     format(comp_class, component_name))
 
+
+def _dat_param_lines(items, dimen):
+    """
+    Generate one line of a .dat file for each (key, value) pair of an
+    indexed Param, putting quotes around values that start as strings.
+    This is the inner loop for large parameters, so the formatting is done
+    with a single % operation per line.
+    """
+    if dimen == 1:
+        for key, value in items:
+            yield (' %s "%s"\n' if isinstance(value, basestring) else ' %s %s\n') % (
+                key, value)
+    else:
+        join = " ".join
+        for key, value in items:
+            yield (' %s "%s"\n' if isinstance(value, basestring) else ' %s %s\n') % (
+                join(map(str, key)), value)
+
+
+def _write_chunks(f, strings, chunk_size):
+    """
+    Write an iterable of strings to file f, joining up to chunk_size strings
+    together for each write call. This avoids both building the whole text
+    in memory and making one write call per value.
+    """
+    strings = iter(strings)
+    while True:
+        chunk = ''.join(itertools.islice(strings, chunk_size))
+        if not chunk:
+            break
+        f.write(chunk)
+
+
+def _non_default_items(component, items):
+    """
+    Filter (key, value) pairs for an indexed Param, dropping any whose value
+    matches the Param's default. Defaults that are rules (e.g.,
+    tp_timestamp) are left alone, because evaluating them may depend on
+    other data; all of those items are kept.
+    """
+    default = component.default()
+    if default is None or callable(default):
+        return items
+    return ((key, v) for key, v in items if v != default)
+
+
 def pre_solve(model, outputs_dir=None):
     """
     Call pre-solve function (if present) in all modules used to compose this model.
@@ -213,14 +274,19 @@ def post_solve(model, outputs_dir=None):
     Call post-solve function (if present) in all modules used to compose this model.
     This function can be used to report or save results from the solved model.
     """
+    # finish any writes that were queued while iterating the model
+    stop_background_writer()
     if outputs_dir is None:
         outputs_dir = getattr(model.options, "outputs_dir", "outputs")
     if not os.path.exists(outputs_dir):
         os.makedirs(outputs_dir)
-    for module in get_module_list(model):
-        if hasattr(module, 'post_solve'):
-            module.post_solve(model, outputs_dir)
-    _save_generic_results(model, outputs_dir)
+    tasks = [
+        (module.__name__ + ".post_solve", module.post_solve, (model, outputs_dir))
+        for module in get_module_list(model) if hasattr(module, 'post_solve')
+    ]
+    tasks.append(("generic results", _save_generic_results, (model, outputs_dir)))
+    _run_export_tasks(model, tasks)
+    switch_mod.export.finish_results_store(model)
 
 
 def save_results(model, results, instance, outdir):
@@ -255,12 +321,82 @@ def save_results(model, results, instance, outdir):
     if success:
         if interactive_session:
             print "Model solved successfully."
-        _save_results(model, instance, outdir, model.module_list)
-        _save_generic_results(instance, outdir)
-        _save_total_cost_value(instance, outdir)
+        tasks = [
+            (module.__name__ + ".save_results", module.save_results, (model, instance, outdir))
+            for module in get_module_list(model) if hasattr(module, 'save_results')
+        ]
+        tasks.append(("generic results", _save_generic_results, (instance, outdir)))
+        tasks.append(("total cost", _save_total_cost_value, (instance, outdir)))
+        _run_export_tasks(instance, tasks)
+        switch_mod.export.finish_results_store(instance)
 
     return success
 
+
+# Export tasks for the current call to _run_export_tasks(). Worker processes
+# inherit this list (and the solved model it refers to) when they are forked,
+# so only the position of each task needs to be sent to them.
+_export_tasks = None
+
+def _run_export_tasks(model, tasks):
+    """
+    Run a list of (description, function, args) export tasks. These are
+    usually the post_solve() or save_results() callbacks of the modules that
+    make up the model, which only read the solved model and write their own
+    files.
+
+    If --export-workers is greater than 1, the tasks are run in a pool of
+    worker processes. Each worker is forked from this process after the model
+    has been solved, so it starts with a copy-on-write snapshot of all the
+    variable, expression and dual values, and nothing needs to be pickled.
+    Errors from all tasks are collected and reported together after every
+    task has finished. Changes that a callback makes to the model are not
+    seen by the parent process in this mode. This option is ignored on
+    platforms that do not support os.fork() (e.g., Windows).
+    """
+    global _export_tasks
+    workers = getattr(getattr(model, 'options', None), 'export_workers', None)
+    if workers is None or workers <= 1 or len(tasks) <= 1 or not hasattr(os, 'fork'):
+        for (desc, func, args) in tasks:
+            func(*args)
+        return
+
+    import multiprocessing
+    # flush buffered output so it doesn't get repeated by the child processes
+    sys.stdout.flush()
+    _export_tasks = tasks
+    try:
+        pool = multiprocessing.Pool(processes=min(workers, len(tasks)))
+        try:
+            errors = pool.map(_run_export_task, range(len(tasks)), chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        _export_tasks = None
+    errors = [e for e in errors if e is not None]
+    if errors:
+        raise RuntimeError(
+            "{} of {} export tasks failed:\n\n".format(len(errors), len(tasks)) +
+            "\n".join(errors))
+
+
+def _run_export_task(i):
+    """
+    Run export task i from _export_tasks in a worker process. Returns None
+    if the task succeeded, or a description of the error if it failed.
+    """
+    (desc, func, args) = _export_tasks[i]
+    try:
+        func(*args)
+    except Exception:
+        import traceback
+        return "Error in {}:\n{}".format(desc, traceback.format_exc())
+    finally:
+        sys.stdout.flush()
+    return None
+
+
 def min_data_check(model, *mandatory_model_components):
     """
 
@@ -546,46 +682,219 @@ def _load_inputs(model, inputs_dir, module_list, data):
             _load_inputs(model, inputs_dir, module.core_modules, data)
 
 
-def _save_results(model, instance, outdir, module_list):
+def _save_generic_results(instance, outdir, deterministic_order=False):
     """
-    A private function to allow recurve calling of saving results from
-    modules or packages.
+    Save the value of each Var in the model to its own .tab file.
+    Only Vars whose names match one of the --save-vars patterns and none of
+    the --skip-vars patterns are saved (these are shell-style wildcards,
+    e.g., "Build*"). If --omit-zero-vars is set, rows with a value of zero
+    (or no value) are left out of the files.
     """
-    for m in module_list:
-        module = sys.modules[m]
-        if hasattr(module, 'save_results'):
-            module.save_results(model, instance, outdir)
-        if hasattr(module, 'core_modules'):
-            _save_results(model, instance, outdir, module.core_modules)
+    options = getattr(instance, 'options', None)
+    include = getattr(options, 'save_vars', None) or ['*']
+    exclude = getattr(options, 'skip_vars', None) or []
+    omit_zeros = getattr(options, 'omit_zero_vars', False)
 
-
-def _save_generic_results(instance, outdir, deterministic_order=False):
     for var in instance.component_objects():
         if not isinstance(var, Var):
             continue
+        if not any(fnmatch.fnmatchcase(var.name, pat) for pat in include):
+            continue
+        if any(fnmatch.fnmatchcase(var.name, pat) for pat in exclude):
+            continue
 
         index_name = var.index_set().name
-        output_file = os.path.join(outdir, '%s.tab' % var.name)
-        with open(output_file, 'wb') as fh:
-            writer = csv.writer(fh, dialect='ampl-tab')
-            # Write column headings
-            writer.writerow(['%s_%d' % (index_name, i + 1)
-                             for i in xrange(var.index_set().dimen)] +
-                            [var.name])
-            # Results are saved in a random order by default for
-            # increased speed. Sorting is available if wanted.
-            for key, obj in (sorted(var.items())
-                            if deterministic_order
-                            else var.items()):
-                writer.writerow(tuple(make_iterable(key)) + (obj.value,))
+        dimen = var.index_set().dimen
+        # Pull all the keys and values out of the Var in one pass.
+        # Results are saved in a random order by default for
+        # increased speed. Sorting is available if wanted.
+        items = [(key, obj.value) for key, obj in var.iteritems()]
+        if deterministic_order:
+            items.sort()
+        if omit_zeros:
+            items = [(key, v) for (key, v) in items if v]
+        if dimen == 1:
+            rows = items
+        else:
+            rows = [tuple(make_iterable(key)) + (v,) for (key, v) in items]
+
+        switch_mod.export.write_rows(
+            instance,
+            os.path.join(outdir, '%s.tab' % var.name),
+            ['%s_%d' % (index_name, i + 1) for i in xrange(dimen)] + [var.name],
+            rows)
 
 
 def _save_total_cost_value(instance, outdir):
     values = instance.Minimize_System_Cost.values()
     assert len(values) == 1
     total_cost = values[0].expr()
-    with open(os.path.join(outdir, 'total_cost.txt'), 'w') as fh:
-        fh.write('%s\n' % total_cost)
+    store = switch_mod.export.get_results_store(instance)
+    if store is not None:
+        store.write_table('total_cost', ['total_cost'], [(total_cost,)])
+    else:
+        with open(os.path.join(outdir, 'total_cost.txt'), 'w') as fh:
+            fh.write('%s\n' % total_cost)
+
+
+def get_values(instance, component):
+    """
+    Return a dict of {index: value} for every element of a Var, Expression,
+    Param or Constraint (body) of a solved model instance. All the values
+    are extracted in one pass and cached, so exporters that need the same
+    component many times (or look up its elements one at a time) only
+    evaluate each expression once. The cache is discarded whenever a new
+    solution is loaded by switch_mod.solve.solve(); code that changes values
+    or duals any other way should call clear_value_cache(). Values are cached
+    per component object, so a component that is deleted and recreated with
+    the same name doesn't get the old component's values.
+
+    >>> from pyomo.environ import ConcreteModel, Var, Expression
+    >>> m = ConcreteModel()
+    >>> m.x = Var([1, 2], initialize={1: 3.0, 2: 4.0})
+    >>> m.y = Expression([1, 2], rule=lambda m, i: 2 * m.x[i])
+    >>> sorted(get_values(m, m.y).items())
+    [(1, 6.0), (2, 8.0)]
+    >>> m.x[1].value = 5.0
+    >>> get_values(m, m.y)[1]
+    6.0
+    >>> clear_value_cache(m)
+    >>> get_values(m, m.y)[1]
+    10.0
+    """
+    def calculate():
+        if isinstance(component, Var):
+            return {k: v.value for (k, v) in component.iteritems()}
+        elif isinstance(component, Constraint):
+            return {k: value(c.body) for (k, c) in component.iteritems()}
+        else:
+            return {k: value(v) for (k, v) in component.iteritems()}
+    # components are identified by id() (scalar components aren't hashable);
+    # each one is kept with its values, so the id can't be reused while cached
+    return cached_value(
+        instance, ('value', id(component)), lambda: (component, calculate()))[1]
+
+
+def get_duals(instance, constraint, default=None):
+    """
+    Return a dict of {index: dual value} for every element of an indexed
+    constraint, using the model's dual suffix. Elements with no dual value
+    (e.g., if the solver doesn't report them) get the default value. Results
+    are cached like get_values().
+    """
+    def calculate():
+        dual = instance.dual
+        return {k: dual.get(c, default) for (k, c) in constraint.iteritems()}
+    return cached_value(
+        instance, ('dual', id(constraint), default),
+        lambda: (constraint, calculate()))[1]
+
+
+def cached_value(instance, key, calculate):
+    """
+    Return the result of calculate() for the current solution of instance,
+    calling it only the first time this key is requested. This can be used
+    for other quantities derived from the solution that several modules or
+    exporters need (e.g., marginal costs).
+    """
+    cache = _value_cache(instance)
+    if key not in cache:
+        cache[key] = calculate()
+    return cache[key]
+
+
+def clear_value_cache(instance):
+    """
+    Discard values cached by get_values(), get_duals() and cached_value().
+    This must be called whenever values or duals are changed outside of
+    switch_mod.solve.solve(), e.g., by loading another solution with
+    instance.solutions.load_from() or by restoring saved dual values.
+    """
+    instance._value_cache = {}
+
+
+def _value_cache(instance):
+    if not hasattr(instance, '_value_cache'):
+        instance._value_cache = {}
+    return instance._value_cache
+
+
+class BackgroundWriter(object):
+    """
+    Run output tasks (usually file writes) one at a time, in order, on a
+    background thread. This lets an iterated model go on to its next solve
+    while results from the last iteration are still being written.
+
+    Callers should only queue functions that work with plain Python data
+    (e.g., rows of values that have already been retrieved from the model),
+    because the model will usually have changed by the time they run.
+    put() blocks if max_depth tasks are already waiting. Errors are reported
+    when flush() is called.
+    """
+    def __init__(self, max_depth=10):
+        import Queue, threading
+        self.queue = Queue.Queue(maxsize=max_depth)
+        self.errors = []
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def put(self, func, *args):
+        self.queue.put((func, args))
+
+    def _run(self):
+        while True:
+            (func, args) = self.queue.get()
+            try:
+                if func is None:
+                    break
+                func(*args)
+            except Exception:
+                import traceback
+                self.errors.append(traceback.format_exc())
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        """Wait until all queued tasks have finished, then report any errors."""
+        self.queue.join()
+        if self.errors:
+            errors, self.errors = self.errors, []
+            raise RuntimeError(
+                "Errors occurred while writing output in the background:\n" +
+                "\n".join(errors))
+
+    def close(self):
+        """Finish all queued tasks and stop the background thread."""
+        self.put(None)
+        self.thread.join()
+        self.flush()
+
+# writer used by queue_output(), if start_background_writer() has been called
+_background_writer = None
+
+def start_background_writer(max_depth=10):
+    """Send all future queue_output() tasks to a background thread."""
+    global _background_writer
+    if _background_writer is None:
+        _background_writer = BackgroundWriter(max_depth)
+
+def stop_background_writer():
+    """Finish any queued output tasks, then go back to running them immediately."""
+    global _background_writer
+    if _background_writer is not None:
+        writer, _background_writer = _background_writer, None
+        writer.close()
+
+def queue_output(func, *args):
+    """
+    Call func(*args) on the background writer thread if one has been started,
+    otherwise call it immediately.
+    """
+    if _background_writer is None:
+        func(*args)
+    else:
+        _background_writer.put(func, *args)
 
 
 class InputError(Exception):
@@ -738,6 +1047,74 @@ else:
             return argparse.ArgumentParser.__init__(self, *args, **kwargs)
 
 
+def linear_coefficients(expr):
+    """
+    Return a list of (variable, coefficient) pairs for every variable in a
+    Pyomo expression, e.g., to find the cost coefficient of each decision
+    variable in an objective function. The coefficients are read in one pass
+    from Pyomo's canonical (linear) representation of the expression, which
+    is fast even for expressions with millions of terms.
+
+    If the expression is nonlinear, the coefficient of each variable is its
+    partial derivative at the current variable values (with unset variables
+    treated as zero). This is calculated directly for polynomial terms and
+    by finite differences for other nonlinear terms.
+
+    >>> from pyomo.environ import ConcreteModel, Var, Param, log
+    >>> m = ConcreteModel()
+    >>> m.x = Var([1, 2, 3], initialize=2.0)
+    >>> m.p = Param(initialize=5.0)
+    >>> sorted((v.cname(), c) for (v, c) in linear_coefficients(
+    ...     3 * m.x[1] + m.p * (m.x[2] + m.x[1]) + 7))
+    [('x[1]', 8.0), ('x[2]', 5.0)]
+    >>> sorted((v.cname(), c) for (v, c) in linear_coefficients(
+    ...     3 * m.x[1] + m.x[2] * m.x[3] + m.x[3] ** 2))
+    [('x[1]', 3.0), ('x[2]', 2.0), ('x[3]', 6.0)]
+    >>> [(v.cname(), round(c, 4)) for (v, c) in linear_coefficients(log(m.x[1]))]
+    [('x[1]', 0.5)]
+    """
+    from pyomo.repn import generate_canonical_repn
+    repn = generate_canonical_repn(expr, {})
+    if not isinstance(repn, dict):
+        # linear expression (the usual case)
+        if repn.linear is None:
+            return []
+        return zip(repn.variables, repn.linear)
+
+    # nonlinear expression; keys are term degrees, except -1 (variables,
+    # identified by index) and None (non-polynomial part of the expression)
+    variables = repn[-1]
+    coefficients = collections.OrderedDict()
+    def add(i, coef):
+        coefficients[i] = coefficients.get(i, 0.0) + coef
+    def current_value(i):
+        return 0.0 if variables[i].value is None else variables[i].value
+    for degree, terms in repn.iteritems():
+        if degree == 1:
+            for i, coef in terms.iteritems():
+                add(i, coef)
+        elif degree is not None and degree > 1:
+            for term, coef in terms.iteritems():
+                for i, power in term.iteritems():
+                    derivative = coef * power * current_value(i) ** (power - 1)
+                    for j, other_power in term.iteritems():
+                        if j != i:
+                            derivative *= current_value(j) ** other_power
+                    add(i, derivative)
+    if None in repn:
+        general = repn[None]
+        for i, var in variables.iteritems():
+            original = var.value
+            x = current_value(i)
+            step = 1e-6 * max(1.0, abs(x))
+            var.value = x
+            base = value(general)
+            var.value = x + step
+            add(i, (value(general) - base) / step)
+            var.value = original
+    return [(variables[i], coef) for (i, coef) in coefficients.iteritems()]
+
+
 def approx_equal(a, b, tolerance=0.01):
     return abs(a-b) <= (abs(a) + abs(b)) / 2.0 * tolerance
 
@@ -0,0 +1,129 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from pyomo.environ import Constraint, value
+import switch_mod.solve
+
+TOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUTS_DIR = os.path.join(TOP_DIR, 'examples', '3zone_toy', 'inputs')
+
+
+class DemandResponseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run_model(self, *args, **kwargs):
+        """Iterate the demand response model for 3zone_toy (or inputs_dir, if specified),
+        with the specified extra arguments."""
+        instance = switch_mod.solve.main(args=[
+            '--inputs-dir', kwargs.get('inputs_dir', INPUTS_DIR),
+            '--outputs-dir', tempfile.mkdtemp(prefix='outputs_', dir=self.temp_dir),
+            '--include-modules', 'hawaii.switch_patch', 'hawaii.demand_response',
+            'hawaii.constant_elasticity_demand_system',
+            '--dr-demand-module', 'switch_mod.hawaii.constant_elasticity_demand_system',
+        ] + list(args), return_instance=True)
+        switch_mod.solve.iterate(instance, [['hawaii.demand_response']])
+        return instance
+
+    def test_bid_columns_match_rules(self):
+        m = self.run_model('--max-iter', '3')
+        assert len(m.DR_BID_LIST) == 3
+        random.seed(0)
+        for var in [m.DRBidWeight, m.FlexibleDemand, m.DR_Welfare_Cost]:
+            for v in var.values():
+                v.value = random.random()
+        # rows updated in place by add_bid_columns() should match
+        # the rows generated from scratch by the constraint rules
+        for c in [m.DR_Convex_Bid_Weight, m.DR_Flexible_Demand_Def, m.DR_Welfare_Cost_Def]:
+            m.dr_test_rows = Constraint(c.index_set(), rule=c.rule)
+            assert len(m.dr_test_rows) == len(c) > 0
+            for idx in c:
+                self.assertAlmostEqual(
+                    value(c[idx].body) - value(c[idx].upper),
+                    value(m.dr_test_rows[idx].body) - value(m.dr_test_rows[idx].upper))
+            m.del_component(m.dr_test_rows)
+
+    def test_prices_need_duals(self):
+        import switch_mod.hawaii.demand_response as demand_response
+        from switch_mod.utilities import clear_value_cache
+        m = self.run_model('--max-iter', '1')
+        assert demand_response.make_prices(m).shape == (
+            len(m.LOAD_ZONES), len(m.TIMEPOINTS))
+        # e.g., after a MIP solve, which doesn't return duals
+        m.dual.clear()
+        clear_value_cache(m)
+        with self.assertRaises(RuntimeError):
+            demand_response.make_prices(m)
+
+    def test_prune_bids(self):
+        import switch_mod.hawaii.demand_response as demand_response
+        m = self.run_model('--max-iter', '3', '--dr-max-active-bids', '2',
+                           '--dr-bid-idle-iterations', '1')
+        assert sorted(m.dr_bid_idle_iterations) == [1, 2, 3]
+        # only bid 2 was used in the latest solution
+        for (b, lz, ts) in m.DRBidWeight:
+            m.DRBidWeight[b, lz, ts].value = 1.0 if b == 2 else 0.0
+        demand_response.prune_bids(m)
+        # bid 1 is the oldest idle bid, so it is removed from the optimization
+        assert sorted(m.dr_bid_idle_iterations) == [2, 3]
+        assert list(m.DR_BID_LIST) == [1, 2, 3]
+        for lz in m.LOAD_ZONES:
+            for ts in m.TIMESERIES:
+                assert m.DRBidWeight[1, lz, ts].fixed
+                assert m.DRBidWeight[1, lz, ts].value == 0
+                assert not m.DR_Load_Zone_Shared_Bid_Weight[1, lz, ts].active
+                for b in [2, 3]:
+                    assert not m.DRBidWeight[b, lz, ts].fixed
+                    assert m.DR_Load_Zone_Shared_Bid_Weight[b, lz, ts].active
+
+    def test_bid_cache(self):
+        import switch_mod.hawaii.demand_response as demand_response
+        cache_dir = os.path.join(self.temp_dir, 'bid_cache')
+        m = self.run_model('--max-iter', '3', '--dr-bid-cache', cache_dir)
+        demand_response.save_bid_cache(m)
+        cache_file = demand_response.bid_cache_file(m)
+        assert os.listdir(cache_dir) == [os.path.basename(cache_file)]
+
+        # a model with the same structure starts from the cached bids
+        m2 = self.run_model('--max-iter', '1', '--dr-bid-cache', cache_dir)
+        assert demand_response.bid_cache_file(m2) == cache_file
+        assert m2.dr_cached_run_iterations == 3
+        assert list(m2.DR_BID_LIST) == [1, 2, 3, 4]
+        for b in [1, 2, 3]:
+            for lz in m.LOAD_ZONES:
+                for tp in m.TIMEPOINTS:
+                    self.assertAlmostEqual(
+                        value(m2.dr_price[b, lz, tp]), value(m.dr_price[b, lz, tp]))
+        demand_response.save_bid_cache(m2)
+        assert os.listdir(cache_dir) == [os.path.basename(cache_file)]
+
+        # a model with different timeseries doesn't use them
+        inputs_dir = os.path.join(self.temp_dir, 'inputs')
+        shutil.copytree(INPUTS_DIR, inputs_dir)
+        for f in ['timeseries.tab', 'timepoints.tab']:
+            with open(os.path.join(inputs_dir, f)) as fh:
+                data = fh.read()
+            with open(os.path.join(inputs_dir, f), 'w') as fh:
+                fh.write(data.replace('2030_all', '2030_typical'))
+        m3 = self.run_model('--max-iter', '1', '--dr-bid-cache', cache_dir,
+                            inputs_dir=inputs_dir)
+        assert demand_response.bid_cache_file(m3) != cache_file
+        assert m3.dr_cached_run_iterations is None
+        assert list(m3.DR_BID_LIST) == [1]
+        demand_response.save_bid_cache(m3)
+        assert sorted(os.listdir(cache_dir)) == sorted(
+            os.path.basename(demand_response.bid_cache_file(x)) for x in [m, m3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+import switch_mod.solve
+
+TOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUTS_DIR = os.path.join(TOP_DIR, 'examples', '3zone_toy', 'inputs')
+
+
+class DispatchFormatTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_table(self, *path):
+        with open(os.path.join(self.temp_dir, *path)) as f:
+            return list(csv.DictReader(f, dialect='excel-tab'))
+
+    def test_long_matches_wide(self):
+        for dispatch_format in ['wide', 'long']:
+            switch_mod.solve.main(args=[
+                '--inputs-dir', INPUTS_DIR,
+                '--outputs-dir', os.path.join(self.temp_dir, dispatch_format),
+                '--dispatch-format', dispatch_format])
+        assert not os.path.exists(os.path.join(self.temp_dir, 'long', 'dispatch.txt'))
+        assert not os.path.exists(os.path.join(self.temp_dir, 'wide', 'dispatch_long.txt'))
+        wide_rows = self.read_table('wide', 'dispatch.txt')
+        long_rows = self.read_table('long', 'dispatch_long.txt')
+
+        wide = {
+            (row['timestamp'], p): float(v)
+                for row in wide_rows for p, v in row.items() if p != 'timestamp'
+        }
+        long = {
+            (row['timestamp'], row['project']): float(row['DispatchProj'])
+                for row in long_rows
+        }
+        # one row per active (timepoint, project) pair, each matching
+        # the corresponding cell of the wide table
+        assert len(long) == len(long_rows) < len(wide)
+        for key, v in long.items():
+            self.assertAlmostEqual(v, wide[key])
+        # and every nonzero cell of the wide table has a long row
+        nonzero = set(key for key, v in wide.items() if v != 0.0)
+        assert 0 < len(nonzero) and nonzero <= set(long)
+
+
+if __name__ == '__main__':
+    unittest.main()
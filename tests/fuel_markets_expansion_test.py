@@ -0,0 +1,125 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyomo.environ import value
+import switch_mod.solve
+
+TOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUTS_DIR = os.path.join(TOP_DIR, 'examples', '3zone_toy', 'inputs')
+
+
+def satisfied(c):
+    return (
+        (c.lower is None or value(c.lower) - 1e-9 <= value(c.body))
+        and (c.upper is None or value(c.body) <= value(c.upper) + 1e-9)
+    )
+
+
+class TierActivationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        self.inputs_dir = os.path.join(self.temp_dir, 'inputs')
+        shutil.copytree(INPUTS_DIR, self.inputs_dir)
+        # give North_Bio three limited tiers in 2020, numbered out of cost order
+        path = os.path.join(self.inputs_dir, 'fuel_supply_curves.tab')
+        with open(path) as f:
+            rows = [
+                r for r in f.read().splitlines()
+                    if not r.startswith('North_Bio\t2020\t')
+            ]
+        rows.extend([
+            'North_Bio\t2020\t0\t3.3941\t6782413',
+            'North_Bio\t2020\t1\t1.7102\t6864985',
+            'North_Bio\t2020\t2\t2.5\t1000000',
+        ])
+        with open(path, 'w') as f:
+            f.write('\n'.join(rows) + '\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def make_instance(self, *args):
+        return switch_mod.solve.main(args=[
+            '--inputs-dir', self.inputs_dir,
+            '--include-modules', 'hawaii.fuel_markets_expansion',
+        ] + list(args), return_instance=True)
+
+    def set_activation(self, m, r, p, active_tiers):
+        for st in m.RFM_P_LIMITED_TIERS_BY_COST[r, p]:
+            m.RFMSupplyTierActivate[r, p, st].value = 1 if st in active_tiers else 0
+
+    def test_options_off(self):
+        m = self.make_instance()
+        assert list(m.RFM_P_LIMITED_TIERS_BY_COST['North_Bio', 2020]) == [1, 2, 0]
+        for c in [
+            'Order_RFM_Supply_Tier_Activation', 'Persist_RFM_Supply_Tier_Activation',
+            'Define_RFM_Highest_Active_Tier', 'RFM_Highest_Active_Tier_SOS'
+        ]:
+            assert not hasattr(m, c), c
+
+    def test_order_rfm_tiers(self):
+        m = self.make_instance('--order-rfm-tiers')
+        assert not hasattr(m, 'Persist_RFM_Supply_Tier_Activation')
+        # one row for each limited tier except the cheapest in its market and period
+        assert set(m.Order_RFM_Supply_Tier_Activation.keys()) == set([
+            ('North_Bio', 2020, 2), ('North_Bio', 2020, 0), ('North_Bio', 2030, 1),
+            ('South_Bio', 2020, 1), ('South_Bio', 2030, 1),
+        ])
+        rows = [m.Order_RFM_Supply_Tier_Activation['North_Bio', 2020, st] for st in [2, 0]]
+        # tiers must be activated in order of cost: 1, 2, 0
+        for active_tiers, ok in [
+            ([], True), ([1], True), ([1, 2], True), ([1, 2, 0], True),
+            ([2], False), ([0], False), ([1, 0], False),
+        ]:
+            self.set_activation(m, 'North_Bio', 2020, active_tiers)
+            assert all(satisfied(c) for c in rows) == ok, active_tiers
+
+    def test_persist_rfm_tiers(self):
+        m = self.make_instance('--persist-rfm-tiers')
+        assert not hasattr(m, 'Order_RFM_Supply_Tier_Activation')
+        # one row for each limited tier that was also limited in the previous period
+        assert set(m.Persist_RFM_Supply_Tier_Activation.keys()) == set([
+            ('All_NG', 2030, 0),
+            ('North_Bio', 2030, 0), ('North_Bio', 2030, 1),
+            ('South_Bio', 2030, 0), ('South_Bio', 2030, 1),
+        ])
+        c = m.Persist_RFM_Supply_Tier_Activation['North_Bio', 2030, 1]
+        for active_2020, active_2030, ok in [
+            (0, 0, True), (0, 1, True), (1, 1, True), (1, 0, False)
+        ]:
+            m.RFMSupplyTierActivate['North_Bio', 2020, 1].value = active_2020
+            m.RFMSupplyTierActivate['North_Bio', 2030, 1].value = active_2030
+            assert satisfied(c) == ok
+
+    def test_rfm_tier_sos(self):
+        m = self.make_instance('--rfm-tier-sos')
+        # SOS implies ordering
+        assert ('North_Bio', 2020, 0) in m.Order_RFM_Supply_Tier_Activation
+        # one SOS1 set for each market and period with more than one limited tier,
+        # listing the highest-active-tier indicators in order of cost
+        assert set(m.RFM_Highest_Active_Tier_SOS.keys()) == set([
+            ('North_Bio', 2020), ('North_Bio', 2030),
+            ('South_Bio', 2020), ('South_Bio', 2030),
+        ])
+        sos = m.RFM_Highest_Active_Tier_SOS['North_Bio', 2020]
+        assert sos.level == 1
+        assert [id(v) for v in sos.get_variables()] == [
+            id(m.RFMHighestActiveTier['North_Bio', 2020, st]) for st in [1, 2, 0]
+        ]
+        # the indicator for the most expensive active tier is 1, all others are 0
+        for active_tiers, highest in [([1], 1), ([1, 2], 2), ([1, 2, 0], 0)]:
+            self.set_activation(m, 'North_Bio', 2020, active_tiers)
+            for st in [1, 2, 0]:
+                m.RFMHighestActiveTier['North_Bio', 2020, st].value = 1 if st == highest else 0
+            for st in [1, 2, 0]:
+                assert satisfied(m.Define_RFM_Highest_Active_Tier['North_Bio', 2020, st])
+
+
+if __name__ == '__main__':
+    unittest.main()
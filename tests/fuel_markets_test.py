@@ -0,0 +1,82 @@
+# Copyright 2015 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import types
+import unittest
+
+from pyomo.environ import DataPortal
+import switch_mod.solve
+import switch_mod.utilities as utilities
+
+TOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUTS_DIR = os.path.join(TOP_DIR, 'examples', '3zone_toy', 'inputs')
+
+
+class SimpleFuelCostTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        self.inputs_dir = os.path.join(self.temp_dir, 'inputs')
+        shutil.copytree(INPUTS_DIR, self.inputs_dir)
+        self.fuel_cost_path = os.path.join(self.inputs_dir, 'fuel_cost.tab')
+        with open(self.fuel_cost_path) as f:
+            self.fuel_cost_rows = f.read().splitlines()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def load_errors(self, rows):
+        with open(self.fuel_cost_path, 'w') as f:
+            f.write('\n'.join(rows) + '\n')
+        with self.assertRaises(ValueError) as cm:
+            switch_mod.solve.main(
+                args=['--inputs-dir', self.inputs_dir], return_instance=True)
+        return str(cm.exception).splitlines()[1:]
+
+    def test_valid_file(self):
+        instance = switch_mod.solve.main(
+            args=['--inputs-dir', self.inputs_dir], return_instance=True)
+        assert ('North_Uranium', 2030, 0) in instance.RFM_SUPPLY_TIERS
+
+    def test_missing_period(self):
+        # a missing period just means there is no supply in that period
+        rows = [r for r in self.fuel_cost_rows
+                if not r.startswith('North\tUranium\t2030')]
+        assert len(rows) == len(self.fuel_cost_rows) - 1
+        with open(self.fuel_cost_path, 'w') as f:
+            f.write('\n'.join(rows) + '\n')
+        # load the data without constructing the model, since
+        # AverageFuelCosts can't be calculated for a market with no tiers
+        model = switch_mod.solve.main(
+            args=['--inputs-dir', self.inputs_dir], return_model=True)
+        data = DataPortal(model=model)
+        data.load_aug = types.MethodType(utilities.load_aug, data)
+        utilities._load_inputs(model, self.inputs_dir, model.module_list, data)
+        supply_tiers = data.data(name='RFM_SUPPLY_TIERS')
+        assert ('North_Uranium', 2020, 0) in supply_tiers
+        assert ('North_Uranium', 2030, 0) not in supply_tiers
+
+    def test_duplicate_row(self):
+        rows = self.fuel_cost_rows + ['North\tUranium\t2030\t3.0']
+        assert self.load_errors(rows) == [
+            "More than one cost is specified for fuel 'Uranium' in load zone "
+            "'North' in period 2030 in fuel_cost.tab."
+        ]
+
+    def test_bad_references(self):
+        rows = self.fuel_cost_rows + [
+            'Nowhere\tUranium\t2020\t3.0',
+            'North\tUnobtainium\t2020\t3.0',
+        ]
+        errors = self.load_errors(rows)
+        assert ("Load zone Nowhere in fuel_cost.tab is not a known load zone "
+                "from load_zones.tab.") in errors
+        assert ("Fuel Unobtainium in fuel_cost.tab is not a known fuel "
+                "from fuels.tab.") in errors
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+# Copyright 2015 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import switch_mod.project.unitcommit.fuel_use as fuel_use
+
+# one good unit, plus one unit with each kind of problem
+BAD_INC_HEAT_RATES = """\
+project	power_start_mw	power_end_mw	incremental_heat_rate_mbtu_per_mwhr	fuel_use_rate_mmbtu_per_h
+good	1	.	.	5
+good	1	2	5	.
+two_starts	1	.	.	5
+two_starts	1	.	.	6
+two_starts	1	2	5	.
+gap	1	.	.	5
+gap	1	2	5	.
+gap	3	4	6	.
+nonconvex	1	.	.	5
+nonconvex	1	2	8	.
+nonconvex	2	3	6	.
+no_start	1	2	5	.
+bad_row	1	2	5	5
+"""
+
+
+class FuelUseTest(unittest.TestCase):
+
+    def test_inc_heat_rate_errors(self):
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            path = os.path.join(temp_dir, 'inc_heat_rates.tab')
+            with open(path, 'w') as f:
+                f.write(BAD_INC_HEAT_RATES)
+            with self.assertRaises(ValueError) as cm:
+                fuel_use._parse_inc_heat_rate_file(path, 'project')
+        finally:
+            shutil.rmtree(temp_dir)
+        # all the problems are reported together, one line per problem
+        lines = str(cm.exception).splitlines()[1:]
+        units = sorted(set(line.split(':')[0] for line in lines))
+        assert units == ['bad_row', 'gap', 'no_start', 'nonconvex', 'two_starts']
+        msg = str(cm.exception)
+        assert "two_starts: More than one row" in msg
+        assert "gap: The incremental heat rate between power output levels 3.0-4.0 does not start" in msg
+        assert "nonconvex: The incremental heat rate between power output levels 2.0-3.0 is less than" in msg
+        assert "no_start: Unit did not define both" in msg
+        assert "bad_row: Row format not recognized" in msg
+
+
+if __name__ == '__main__':
+    unittest.main()
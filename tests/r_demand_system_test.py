@@ -0,0 +1,179 @@
+# Copyright 2015 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import imp
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+
+import numpy as np
+
+try:
+    import switch_mod.hawaii.r_demand_system as r_demand_system
+except ImportError:
+    # rpy2 and/or R are not available
+    r_demand_system = None
+
+# minimal demand system for testing the bridge: constant-elasticity demand
+# in each hour, with willingness to pay equal to the total paid for the load
+STUB_R_SCRIPT = """
+calibrate <- function(base_loads, base_prices, elasticity_scenario) {
+    base_loads <<- base_loads
+    base_prices <<- base_prices
+}
+bid <- function(load_zone, time_series, prices) {
+    bl <- base_loads[, time_series, load_zone]
+    bp <- base_prices[, time_series, load_zone]
+    demand <- bl * (prices / bp) ^ (-0.1)
+    list(demand, sum(demand * prices))
+}
+"""
+
+
+class StubRArray(object):
+    """R array: a vector of values in column-major order, with dims and dimnames."""
+    def __init__(self, values, dim, dimnames):
+        self.values = values
+        self.dim = dim
+        self.dimnames = dimnames
+
+
+class StubR(object):
+    """
+    Pure-Python stand-in for rpy2.robjects.r, implementing the same demand
+    system as STUB_R_SCRIPT and the default R bid_all(). Arrays are passed
+    back to Python as flat column-major vectors, as R does.
+    """
+    def array(self, arr, dim, dimnames):
+        arr = np.asarray(arr, dtype=float)
+        assert tuple(dim) == arr.shape
+        return StubRArray(arr.flatten(order='F'), tuple(dim), dimnames)
+
+    def list(self, *args):
+        return list(args)
+
+    def calibrate(self, base_loads, base_prices, elasticity_scenario):
+        self.base_loads = base_loads
+        self.base_prices = base_prices
+
+    def lookup(self, r_array, load_zone, time_series):
+        (hours, time_series_names, load_zones) = r_array.dimnames
+        j = list(time_series_names).index(time_series)
+        k = list(load_zones).index(load_zone)
+        return r_array.values.reshape(r_array.dim, order='F')[:, j, k]
+
+    def bid(self, load_zone, time_series, prices):
+        bl = self.lookup(self.base_loads, load_zone, time_series)
+        bp = self.lookup(self.base_prices, load_zone, time_series)
+        demand = bl * (prices / bp) ** (-0.1)
+        return [demand, [sum(demand * prices)]]
+
+    def bid_all(self, prices):
+        (hours, time_series, load_zones) = prices.dimnames
+        price_arr = prices.values.reshape(prices.dim, order='F')
+        demand = np.zeros(prices.dim)
+        wtp = np.zeros(prices.dim[1:])
+        for k, lz in enumerate(load_zones):
+            for j, ts in enumerate(time_series):
+                b = self.bid(lz, ts, price_arr[:, j, k])
+                demand[:, j, k] = b[0]
+                wtp[j, k] = b[1][0]
+        return [demand.flatten(order='F'), wtp.flatten(order='F')]
+
+
+def load_with_stub_r(r):
+    """Load a private copy of r_demand_system that uses r instead of rpy2."""
+    rpy2 = types.ModuleType('rpy2')
+    rpy2.robjects = types.ModuleType('rpy2.robjects')
+    rpy2.robjects.r = r
+    rpy2.robjects.numpy2ri = types.ModuleType('rpy2.robjects.numpy2ri')
+    rpy2.robjects.numpy2ri.activate = lambda: None
+    stubs = {
+        'rpy2': rpy2,
+        'rpy2.robjects': rpy2.robjects,
+        'rpy2.robjects.numpy2ri': rpy2.robjects.numpy2ri,
+    }
+    saved = {name: sys.modules.get(name) for name in stubs}
+    sys.modules.update(stubs)
+    try:
+        import switch_mod.hawaii
+        path = os.path.join(
+            os.path.dirname(switch_mod.hawaii.__file__), 'r_demand_system.py')
+        return imp.load_source('stub_r_demand_system', path)
+    finally:
+        for name, module in saved.iteritems():
+            if module is None:
+                del sys.modules[name]
+            else:
+                sys.modules[name] = module
+
+
+BASE_DATA = [
+    ("oahu", 100, [500, 1000, 1500], [0.35, 0.35, 0.35]),
+    ("oahu", 200, [2000, 2500, 3000], [0.30, 0.35, 0.40]),
+    ("maui", 100, [3500, 4000, 4500], [0.35, 0.35, 0.35]),
+    ("maui", 200, [5000, 5500, 6000], [0.40, 0.35, 0.30]),
+]
+
+PRICES = np.array([
+    [[0.20, 0.30, 0.50], [0.25, 0.35, 0.45]],
+    [[0.40, 0.30, 0.20], [0.35, 0.35, 0.35]],
+])
+
+
+def check_bid_all_matches_bid(demand_system):
+    demand_system.calibrate(BASE_DATA)
+    demand, wtp = demand_system.bid_all(PRICES)
+    assert demand.shape == (2, 2, 3) and wtp.shape == (2, 2)
+    for i, lz in enumerate(["oahu", "maui"]):
+        for j, ts in enumerate([100, 200]):
+            d, w = demand_system.bid(lz, ts, PRICES[i, j])
+            assert np.allclose(demand[i, j], d)
+            assert np.allclose(wtp[i, j], w)
+
+
+class StubRDemandSystemTest(unittest.TestCase):
+
+    def test_bid_all_matches_bid(self):
+        demand_system = load_with_stub_r(StubR())
+        check_bid_all_matches_bid(demand_system)
+        # check one bid directly, to make sure the stub itself is consistent
+        # with BASE_DATA (oahu, time series 200)
+        d, w = demand_system.bid("oahu", 200, PRICES[0, 1])
+        expected = np.array([2000, 2500, 3000]) * (
+            PRICES[0, 1] / np.array([0.30, 0.35, 0.40])) ** (-0.1)
+        assert np.allclose(d, expected)
+        assert np.allclose(w, sum(expected * PRICES[0, 1]))
+
+
+class Options(object):
+    pass
+
+
+class Model(object):
+    pass
+
+
+@unittest.skipIf(r_demand_system is None, "rpy2 or R is not available")
+class RDemandSystemTest(unittest.TestCase):
+
+    def test_bid_all_matches_bid(self):
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            script = os.path.join(temp_dir, 'stub_demand_system.R')
+            with open(script, 'w') as f:
+                f.write(STUB_R_SCRIPT)
+            m = Model()
+            m.options = Options()
+            m.options.dr_r_script = script
+            r_demand_system.define_components(m)
+        finally:
+            shutil.rmtree(temp_dir)
+        check_bid_all_matches_bid(r_demand_system)
+
+
+if __name__ == '__main__':
+    unittest.main()
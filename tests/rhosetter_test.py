@@ -0,0 +1,116 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import imp
+import os
+import random
+import unittest
+
+from pyomo.environ import Objective, Var, value
+import switch_mod.solve
+
+try:
+    import sympy
+except ImportError:
+    sympy = None
+
+TOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLE_DIR = os.path.join(TOP_DIR, 'examples', '3zone_toy_stochastic_PySP')
+
+
+class SymbolMap(object):
+    def getSymbol(self, component):
+        return component.cname(True)
+
+
+class TreeNode(object):
+    def __init__(self, variable_ids):
+        self._standard_variable_ids = variable_ids
+
+
+class Scenario(object):
+    def __init__(self, instance, nodes):
+        self._instance = instance
+        self._node_list = nodes
+
+
+class PH(object):
+    def __init__(self):
+        self.rho = {}
+
+    def setRhoOneScenario(self, tree_node, scenario, variable_id, rho):
+        self.rho[variable_id] = rho
+
+
+def sympy_coefficients(instance, expr):
+    # cost coefficients found by the previous version of rhosetter.py, which
+    # parsed the text of the objective function with sympy
+    import re
+    import StringIO
+    string_out = StringIO.StringIO()
+    expr.to_string(ostream=string_out)
+    expr_as_str = string_out.getvalue()
+    pattern = "(?<=[^a-zA-Z])([a-zA-Z][a-zA-Z_0-9]*(\[[^]]*\])?)"
+    component_by_alias = {}
+    for (cname, index_as_str) in re.findall(pattern, expr_as_str):
+        component = instance.find_component(cname)
+        alias = "x" + str(id(component))
+        component_by_alias[alias] = component
+        expr_as_str = expr_as_str.replace(cname, alias)
+    parsed = sympy.sympify(expr_as_str)
+    return {
+        component.cname(True): float(parsed.coeff(alias))
+            for (alias, component) in component_by_alias.iteritems()
+    }
+
+
+class RhosetterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.instance = switch_mod.solve.main(
+            args=['--inputs-dir', os.path.join(EXAMPLE_DIR, 'inputs')],
+            return_instance=True)
+        self.instance._ScenarioTreeSymbolMap = SymbolMap()
+        self.objective = self.instance.Minimize_System_Cost
+        self.variables = [
+            v for var in self.instance.component_objects(Var) for v in var.values()
+        ]
+        self.rhosetter = imp.load_source(
+            'rhosetter', os.path.join(EXAMPLE_DIR, 'rhosetter.py'))
+
+    def set_rho(self):
+        ph = PH()
+        node = TreeNode(set(v.cname(True) for v in self.variables))
+        scenario = Scenario(self.instance, [node])
+        self.rhosetter.ph_rhosetter_callback(ph, None, scenario)
+        return ph.rho
+
+    def test_rho_matches_objective(self):
+        rho = self.set_rho()
+        assert len(rho) > 0
+        # the objective is linear, so it should be reproduced exactly by
+        # the rho values (cost coefficients) and the constant term
+        for v in self.variables:
+            v.value = 0.0
+        constant = value(self.objective.expr)
+        random.seed(0)
+        for i in range(3):
+            for v in self.variables:
+                v.value = random.random()
+            expected = value(self.objective.expr)
+            calculated = constant + sum(
+                coef * self.instance.find_component(name).value
+                    for (name, coef) in rho.iteritems())
+            self.assertAlmostEqual(calculated / expected, 1.0, places=9)
+
+    @unittest.skipIf(sympy is None, "sympy is not available")
+    def test_rho_matches_sympy(self):
+        rho = self.set_rho()
+        expected = sympy_coefficients(self.instance, self.objective.expr)
+        assert sorted(rho.keys()) == sorted(expected.keys())
+        for name, coef in expected.iteritems():
+            self.assertAlmostEqual(rho[name], coef, delta=1e-9 * max(1.0, abs(coef)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+from collections import defaultdict
+
+from pyomo.environ import value
+import switch_mod.solve
+import switch_mod.hawaii.save_results as save_results
+
+TOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUTS_DIR = os.path.join(TOP_DIR, 'examples', '3zone_toy', 'inputs')
+
+
+class SaveResultsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_energy_sources_by_zone(self):
+        m = switch_mod.solve.main(args=[
+            '--inputs-dir', INPUTS_DIR,
+            '--outputs-dir', self.temp_dir,
+            '--include-modules', 'hawaii.save_results',
+        ], return_instance=True)
+        switch_mod.solve.solve(m)
+        save_results.write_results(m, self.temp_dir)
+
+        # production by zone, timepoint and energy source, calculated
+        # directly from the dispatch decisions for each project
+        expected = defaultdict(float)
+        for (pr, tp) in m.PROJ_DISPATCH_POINTS:
+            z, g = m.proj_load_zone[pr], m.proj_gen_tech[pr]
+            dispatch = value(m.DispatchProj[pr, tp])
+            if m.g_uses_fuel[g]:
+                fuel_use = {
+                    f: value(m.ProjFuelUseRate[pr, tp, f]) for f in m.G_FUELS[g]
+                }
+                if dispatch != 0.0 and sum(fuel_use.values()) != 0.0:
+                    for f, rate in fuel_use.iteritems():
+                        expected[z, tp, f] += dispatch * rate / sum(fuel_use.values())
+            else:
+                expected[z, tp, m.g_energy_source[g]] += dispatch
+
+        with open(os.path.join(self.temp_dir, 'energy_sources.tsv')) as f:
+            rows = list(csv.DictReader(f, dialect='excel-tab'))
+        sources = list(m.FUELS) + list(m.NON_FUEL_ENERGY_SOURCES)
+        timestamp_tp = {m.tp_timestamp[tp]: tp for tp in m.TIMEPOINTS}
+        assert len(rows) == len(m.LOAD_ZONES) * len(m.TIMEPOINTS)
+        zone_totals = defaultdict(set)
+        for row in rows:
+            z, tp = row['load_zone'], timestamp_tp[int(row['timepoint_label'])]
+            for s in sources:
+                # zone_<source> columns report production in this zone
+                self.assertAlmostEqual(float(row['zone_' + s]), expected[z, tp, s])
+                zone_totals[tp, s].add(round(float(row['zone_' + s]), 6))
+                # <source> columns report system-wide production, as before
+                self.assertAlmostEqual(
+                    float(row[s]), sum(expected[lz, tp, s] for lz in m.LOAD_ZONES))
+            # all the production in each zone is attributed to some source
+            self.assertAlmostEqual(
+                sum(float(row['zone_' + s]) for s in sources), float(row['LZ_NetDispatch']))
+        # the zones are reported separately in the zone_<source> columns
+        assert any(len(totals) > 1 for totals in zone_totals.values())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+# Copyright 2015 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import switch_mod.hawaii.scenario_data as scenario_data
+
+
+class ScenarioDataTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        db_path = os.path.join(self.temp_dir, 'test.sqlite')
+        db = sqlite3.connect(db_path)
+        db.execute("CREATE TABLE project (name TEXT, capacity REAL, note TEXT)")
+        db.executemany(
+            "INSERT INTO project VALUES (?, ?, ?)",
+            [("p%d" % i, i * 1.5, None if i % 3 else "new") for i in range(25000)])
+        db.commit()
+        db.close()
+        # use sqlite as a stand-in for the postgres server
+        self.db_connect = scenario_data.db_connect
+        scenario_data.db_connect = lambda: sqlite3.connect(
+            db_path, check_same_thread=False)
+
+    def tearDown(self):
+        scenario_data.db_connect = self.db_connect
+        scenario_data.con = None
+        shutil.rmtree(self.temp_dir)
+
+    def write_files(self, subdir, workers, cache=None):
+        args = dict(inputs_dir=self.temp_dir, inputs_subdir=subdir)
+        scenario_data.query_cache = cache
+        scenario_data.query_pool = (
+            scenario_data.QueryPool(workers) if workers > 1 else None)
+        try:
+            for i in range(4):
+                scenario_data.write_table(
+                    'project_{}.tab'.format(i),
+                    "SELECT name, capacity, note FROM project WHERE rowid % 4 = {}".format(i),
+                    args)
+        finally:
+            scenario_data.query_cache = None
+            pool, scenario_data.query_pool = scenario_data.query_pool, None
+            if pool is not None:
+                pool.finish()
+        path = os.path.join(self.temp_dir, subdir)
+        contents = {}
+        for f in sorted(os.listdir(path)):
+            with open(os.path.join(path, f)) as fh:
+                contents[f] = fh.read()
+        return contents
+
+    def test_parallel_queries_match_serial(self):
+        serial = self.write_files('serial', 1)
+        parallel = self.write_files('parallel', 3)
+        assert serial == parallel
+        lines = serial['project_1.tab'].splitlines()
+        assert lines[0] == 'name\tcapacity\tnote'
+        assert len(lines) == 6251
+        assert lines[1:3] == ['p0\t0.0\tnew', 'p4\t6.0\t.']
+
+    def test_offline_cache(self):
+        cache_dir = os.path.join(self.temp_dir, 'cache')
+        online = self.write_files('online', 1)
+        cached = self.write_files(
+            'cached', 3, scenario_data.QueryCache(cache_dir))
+        assert len(os.listdir(cache_dir)) == 4
+        def no_connection():
+            raise AssertionError("offline mode should not use the database")
+        scenario_data.db_connect = no_connection
+        offline = self.write_files(
+            'offline', 3, scenario_data.QueryCache(cache_dir, offline=True))
+        assert online == cached == offline
+        with self.assertRaises(RuntimeError):
+            self.write_files(
+                'missing', 1, scenario_data.QueryCache(
+                    os.path.join(self.temp_dir, 'empty'), offline=True))
+
+    def test_cache_streams_batches(self):
+        class NoFetchallCursor(object):
+            def __init__(self, cursor):
+                self.cursor = cursor
+            def fetchall(self):
+                raise AssertionError("query results should be read in batches")
+            def __getattr__(self, name):
+                return getattr(self.cursor, name)
+        class Connection(object):
+            def __init__(self, conn):
+                self.conn = conn
+            def cursor(self):
+                return NoFetchallCursor(self.conn.cursor())
+            def __getattr__(self, name):
+                return getattr(self.conn, name)
+        cache = scenario_data.QueryCache(os.path.join(self.temp_dir, 'cache'))
+        query = "SELECT name, capacity FROM project WHERE rowid % 4 = 1"
+        conn = Connection(scenario_data.db_connect())
+        for i in range(2):
+            # results come from the database the first time, then from the cache
+            batches = list(cache.query_batches(
+                query, {}, lambda: conn, 'test', batch_size=1000))
+            assert batches[0] == ['name', 'capacity']
+            assert [len(b) for b in batches[1:]] == [1000] * 6 + [250]
+            assert batches[1][:2] == [('p0', 0.0), ('p4', 6.0)]
+        conn.close()
+
+    def test_failed_query_is_reported(self):
+        pool = scenario_data.QueryPool(2)
+        pool.submit(os.path.join(self.temp_dir, 'bad.tab'),
+                    "SELECT * FROM missing_table", {})
+        with self.assertRaises(sqlite3.OperationalError):
+            pool.finish()
+
+
+if __name__ == '__main__':
+    unittest.main()
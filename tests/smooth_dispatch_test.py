@@ -0,0 +1,80 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyomo.environ import value
+import switch_mod.solve
+
+TOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUTS_DIR = os.path.join(TOP_DIR, 'examples', '3zone_toy', 'inputs')
+
+
+class WarmStartRecorder(object):
+    """Solver wrapper that reports warm-start support and records whether
+    each solve requested a warm start."""
+    def __init__(self, solver):
+        self.solver = solver
+        self.warmstarts = []
+
+    def warm_start_capable(self):
+        return True
+
+    def solve(self, model, **kwargs):
+        self.warmstarts.append(kwargs.pop('warmstart', False))
+        return self.solver.solve(model, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.solver, name)
+
+
+class SmoothDispatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def make_instance(self, *args):
+        return switch_mod.solve.main(args=[
+            '--inputs-dir', INPUTS_DIR,
+            '--outputs-dir', tempfile.mkdtemp(prefix='outputs_', dir=self.temp_dir),
+            '--solver', 'cbc',
+            '--include-modules', 'hawaii.switch_patch',
+            'hawaii.demand_response_simple', 'hawaii.smooth_dispatch',
+        ] + list(args), return_instance=True)
+
+    def test_smoothing_stays_within_cost_tolerance(self):
+        tolerance = 1e-4
+        # cost-optimal solution, without smoothing
+        m = self.make_instance()
+        switch_mod.solve.solve(m)
+        optimum = value(m.SystemCost)
+
+        m = self.make_instance('--smooth-dispatch-cost-tolerance', str(tolerance))
+        # 'auto' uses the linear objective for cbc
+        assert m.options.smooth_dispatch_objective == 'linear'
+        assert hasattr(m, 'Smooth_Abs_DemandResponse')
+        assert not m.Smooth_Free_Variables.active
+        switch_mod.solve.solve(m)   # creates m.solver
+        m.solver = WarmStartRecorder(m.solver)
+        switch_mod.solve.iterate(m, [['hawaii.smooth_dispatch']])
+
+        # both stages were solved, and only the second one was warm-started
+        assert m.solver.warmstarts == [False, True]
+        self.assertAlmostEqual(
+            value(m.Smooth_Dispatch_Cost_Limit.upper) / (optimum * (1 + tolerance)), 1.0)
+        assert value(m.SystemCost) <= optimum * (1 + tolerance) + 1e-6 * abs(optimum)
+        # the standard objective is back in effect
+        assert m.Minimize_System_Cost.active
+        assert not m.Smooth_Free_Variables.active
+        assert not m.Smooth_Dispatch_Cost_Limit.active
+        assert not m.warm_start
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyomo.environ import *
+import switch_mod.solve
+import switch_mod.hawaii.storage as storage
+
+TOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUTS_DIR = os.path.join(TOP_DIR, 'examples', '3zone_toy', 'inputs')
+
+# optimal SystemCost for the inputs written by write_storage_inputs(), found
+# with the versions of batteries.py, pumped_hydro.py and hydrogen.py that
+# defined their own storage constraints (before storage.py was added)
+PREVIOUS_OPTIMUM = 103234477.84373438
+
+def write_storage_inputs(inputs_dir):
+    """Add battery, pumped hydro and hydrogen data to a copy of the 3zone_toy
+    inputs, and convert its timeseries to hourly timepoints (keeping the same
+    weight for each timepoint)."""
+    with open(os.path.join(inputs_dir, 'timeseries.tab')) as f:
+        rows = [r.split() for r in f.read().splitlines() if r.strip()]
+    with open(os.path.join(inputs_dir, 'timeseries.tab'), 'w') as f:
+        f.write('\t'.join(rows[0]) + '\n')
+        for ts, period, duration, num_tps, scale in rows[1:]:
+            f.write('\t'.join(
+                [ts, period, '1', num_tps, str(float(scale) * float(duration))]
+            ) + '\n')
+    with open(os.path.join(inputs_dir, 'batteries.dat'), 'w') as f:
+        f.write(
+            'param battery_capital_cost_per_mwh_capacity := 100;\n'
+            'param battery_n_cycles := 100000;\n'
+            'param battery_max_discharge := 0.8;\n'
+            'param battery_efficiency := 0.95;\n'
+            'param battery_min_discharge_time := 4;\n'
+        )
+    with open(os.path.join(inputs_dir, 'hydrogen.dat'), 'w') as f:
+        f.write(
+            'param hydrogen_electrolyzer_capital_cost_per_mw := 100;\n'
+            'param hydrogen_electrolyzer_kg_per_mwh := 20;\n'
+            'param hydrogen_electrolyzer_life_years := 20;\n'
+            'param hydrogen_liquifier_capital_cost_per_kg_per_hour := 1;\n'
+            'param hydrogen_liquifier_mwh_per_kg := 0.001;\n'
+            'param hydrogen_liquifier_life_years := 20;\n'
+            'param liquid_hydrogen_tank_capital_cost_per_kg := 0.1;\n'
+            'param liquid_hydrogen_tank_life_years := 20;\n'
+            'param hydrogen_fuel_cell_capital_cost_per_mw := 100;\n'
+            'param hydrogen_fuel_cell_mwh_per_kg := 0.045;\n'
+            'param hydrogen_fuel_cell_life_years := 20;\n'
+        )
+    with open(os.path.join(inputs_dir, 'pumped_hydro.tab'), 'w') as f:
+        f.write(
+            'PH_PROJECTS\tph_load_zone\tph_capital_cost_per_mw\tph_project_life\t'
+            'ph_fixed_om_percent\tph_efficiency\tph_inflow_mw\tph_max_capacity_mw\n'
+            'PH_North\tNorth\t50000\t50\t0.01\t0.8\t1\t50\n'
+            'PH_South\tSouth\t50000\t50\t0.01\t0.8\t0\t50\n'
+        )
+
+
+class StorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        self.inputs_dir = os.path.join(self.temp_dir, 'inputs')
+        shutil.copytree(INPUTS_DIR, self.inputs_dir)
+        write_storage_inputs(self.inputs_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def make_instance(self):
+        return switch_mod.solve.main(args=[
+            '--inputs-dir', self.inputs_dir,
+            '--outputs-dir', os.path.join(self.temp_dir, 'outputs'),
+            '--solver', 'cbc',
+            '--include-modules', 'hawaii.switch_patch',
+            'hawaii.batteries', 'hawaii.pumped_hydro', 'hawaii.hydrogen',
+        ], return_instance=True)
+
+    def test_register_storage_arguments(self):
+        m = ConcreteModel()
+        args = dict(assets='A', charge='C', discharge='D',
+            charge_capacity='CC', discharge_capacity='DC')
+        with self.assertRaises(ValueError):
+            storage.register_storage(m, 'bad', balance='daily', **args)
+        # level storage needs a level and energy capacity
+        with self.assertRaises(ValueError):
+            storage.register_storage(m, 'bad', balance='level', **args)
+        with self.assertRaises(ValueError):
+            storage.register_storage(m, 'bad', balance='level', level='L', **args)
+        # interday storage needs long-term transfers and energy capacity
+        with self.assertRaises(ValueError):
+            storage.register_storage(m, 'bad', balance='interday',
+                interday_store='S', interday_withdraw='W', **args)
+        with self.assertRaises(ValueError):
+            storage.register_storage(m, 'bad', balance='interday',
+                energy_capacity='E', interday_store='S', **args)
+        # rejected technologies are not registered
+        assert not getattr(m, 'storage_technologies', {})
+        storage.register_storage(m, 'good', balance='timeseries', **args)
+        assert list(m.storage_technologies) == ['good']
+
+    def test_all_technologies(self):
+        m = self.make_instance()
+        assert list(m.storage_technologies) == ['battery', 'pumped_hydro', 'hydrogen']
+        assert set(m.LEVEL_STORAGE_ASSETS) == set(
+            ('battery', z) for z in m.LOAD_ZONES)
+        assert set(m.TIMESERIES_STORAGE_ASSETS) == set(
+            [('pumped_hydro', p) for p in m.PH_PROJECTS]
+            + [('hydrogen', z) for z in m.LOAD_ZONES])
+        assert set(m.INTERDAY_STORAGE_ASSETS) == set(
+            ('hydrogen', z) for z in m.LOAD_ZONES)
+        # every timepoint is one hour long, so the battery state of charge
+        # changes by the net charging rate, as in the previous formulation
+        assert all(m.tp_duration_hrs[t] == 1 for t in m.TIMEPOINTS)
+        switch_mod.solve.solve(m)
+        self.assertAlmostEqual(value(m.SystemCost) / PREVIOUS_OPTIMUM, 1.0, places=6)
+        # each technology is used, so each type of balance is tested
+        for c in ['BuildBattery', 'BuildPumpedHydroMW', 'BuildLiquidHydrogenTankKg']:
+            assert sum(value(v) for v in getattr(m, c).values()) > 0, c
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 # Copyright 2015 The Switch Authors. All rights reserved.
 # Licensed under the Apache License, Version 2, which is in the LICENSE file.
 
+import os
 import unittest
 
 import switch_mod.utilities as utilities
@@ -28,7 +29,216 @@ class UtilitiesTest(unittest.TestCase):
         reloaded_data = DataPortal(model=model)
         reloaded_data.load(filename=dat_path)
         compare(reloaded_data.data(), instance.DataPortal.data())
-    
+
+    def test_save_inputs_as_dat_compressed(self):
+        import gzip
+        import shutil
+        import tempfile
+        import switch_mod.solve
+        (model, instance) = switch_mod.solve.main(
+            args=["--inputs-dir", "test_dat"], return_model=True, return_instance=True
+        )
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            dat_path = os.path.join(temp_dir, "complete_inputs.dat")
+            utilities.save_inputs_as_dat(
+                model, instance, save_path=dat_path, deterministic_order=True)
+            utilities.save_inputs_as_dat(
+                model, instance, save_path=dat_path + ".gz", deterministic_order=True)
+            with open(dat_path) as f:
+                plain = f.read()
+            with gzip.open(dat_path + ".gz") as f:
+                compressed = f.read()
+        finally:
+            shutil.rmtree(temp_dir)
+        assert plain == compressed
+
+    def test_save_inputs_as_dat_skip_defaults(self):
+        import shutil
+        import tempfile
+        import switch_mod.solve
+        from pyomo.environ import DataPortal, Param
+        (model, instance) = switch_mod.solve.main(
+            args=["--inputs-dir", "test_dat"], return_model=True, return_instance=True
+        )
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            dat_path = os.path.join(temp_dir, "complete_inputs.dat")
+            utilities.save_inputs_as_dat(
+                model, instance, save_path=dat_path, skip_defaults=True)
+            reloaded_data = DataPortal(model=model)
+            reloaded_data.load(filename=dat_path)
+        finally:
+            shutil.rmtree(temp_dir)
+        reloaded_instance = model.create_instance(reloaded_data)
+        for p in instance.component_objects(Param):
+            reloaded_p = getattr(reloaded_instance, p.name)
+            for key in p:
+                assert p[key] == reloaded_p[key]
+
+    def test_parallel_export_matches_serial(self):
+        import filecmp
+        import shutil
+        import tempfile
+        import switch_mod.solve
+        inputs_dir = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'examples', '3zone_toy', 'inputs')
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            serial_dir = os.path.join(temp_dir, 'serial')
+            parallel_dir = os.path.join(temp_dir, 'parallel')
+            switch_mod.solve.main(args=[
+                '--inputs-dir', inputs_dir, '--outputs-dir', serial_dir])
+            switch_mod.solve.main(args=[
+                '--inputs-dir', inputs_dir, '--outputs-dir', parallel_dir,
+                '--export-workers', '3'])
+            files = sorted(os.listdir(serial_dir))
+            assert files == sorted(os.listdir(parallel_dir))
+            (match, mismatch, errors) = filecmp.cmpfiles(
+                serial_dir, parallel_dir, files, shallow=False)
+            assert mismatch == [] and errors == []
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_save_vars_filters(self):
+        import shutil
+        import tempfile
+        import switch_mod.solve
+        inputs_dir = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'examples', '3zone_toy', 'inputs')
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        def read_tab(outputs_dir, name):
+            with open(os.path.join(outputs_dir, name)) as f:
+                return [line.rstrip('\n').split('\t') for line in f][1:]
+        try:
+            all_dir = os.path.join(temp_dir, 'all')
+            some_dir = os.path.join(temp_dir, 'some')
+            switch_mod.solve.main(args=[
+                '--inputs-dir', inputs_dir, '--outputs-dir', all_dir])
+            switch_mod.solve.main(args=[
+                '--inputs-dir', inputs_dir, '--outputs-dir', some_dir,
+                '--save-vars', 'Build*', 'DispatchProj',
+                '--skip-vars', 'BuildLocalTD', '--omit-zero-vars'])
+            all_tabs = set(f for f in os.listdir(all_dir) if f.endswith('.tab'))
+            some_tabs = set(f for f in os.listdir(some_dir) if f.endswith('.tab'))
+            assert 'BuildLocalTD.tab' in all_tabs
+            assert some_tabs == set(
+                f for f in all_tabs
+                if f != 'BuildLocalTD.tab'
+                    and (f.startswith('Build') or f == 'DispatchProj.tab'))
+            for f in some_tabs:
+                # same rows as the full export, minus the zeros
+                rows = read_tab(all_dir, f)
+                nonzero_rows = [r for r in rows if float(r[-1]) != 0.0]
+                assert 0 < len(nonzero_rows) < len(rows)
+                assert sorted(read_tab(some_dir, f)) == sorted(nonzero_rows)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_results_db(self):
+        import shutil
+        import sqlite3
+        import tempfile
+        import switch_mod.solve
+        inputs_dir = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'examples', '3zone_toy', 'inputs')
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            db_path = os.path.join(temp_dir, 'results.sqlite')
+            for scenario in ['a', 'b', 'a']:
+                switch_mod.solve.main(args=[
+                    '--inputs-dir', inputs_dir,
+                    '--outputs-dir', os.path.join(temp_dir, 'outputs'),
+                    '--results-db', db_path, '--scenario-name', scenario])
+            db = sqlite3.connect(db_path)
+            (n_a,) = db.execute(
+                "SELECT COUNT(*) FROM BuildProj WHERE scenario='a'").fetchone()
+            (n_b,) = db.execute(
+                "SELECT COUNT(*) FROM BuildProj WHERE scenario='b'").fetchone()
+            assert n_a == n_b > 0
+            costs = db.execute(
+                "SELECT total_cost FROM total_cost ORDER BY scenario").fetchall()
+            assert len(costs) == 2 and costs[0] == costs[1]
+            db.close()
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_results_db_append_table(self):
+        import argparse
+        import shutil
+        import tempfile
+        import switch_mod.export as export
+        import switch_mod.hawaii.util as util
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            model = argparse.Namespace(options=argparse.Namespace(
+                results_db=os.path.join(temp_dir, 'results.sqlite'),
+                scenario_name='a'))
+            output_file = os.path.join(temp_dir, 'bids.tsv')
+            for i in range(2):
+                util.create_table(model, output_file=output_file, headings=('bid', 'load'))
+                util.append_table(model, [1, 2], output_file=output_file,
+                    values=lambda m, b: (b, 10 * b))
+                util.append_table(model, [3], output_file=output_file,
+                    values=lambda m, b: (b, 10 * b))
+            store = export.get_results_store(model)
+            assert store.read_table('bids') == (
+                ['bid', 'load'], [(1, 10), (2, 20), (3, 30)])
+            export.finish_results_store(model)
+            assert not os.path.exists(output_file)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_value_cache(self):
+        import switch_mod.solve
+        from pyomo.environ import Expression
+        instance = switch_mod.solve.main(
+            args=["--inputs-dir", "test_dat"], return_instance=True)
+        switch_mod.solve.solve(instance)
+        key = next(iter(instance.DispatchProj))
+        dispatch = instance.DispatchProj[key].value
+        assert utilities.get_values(instance, instance.DispatchProj)[key] == dispatch
+        # values changed directly are not seen until the cache is cleared
+        instance.DispatchProj[key].value = dispatch + 1
+        assert utilities.get_values(instance, instance.DispatchProj)[key] == dispatch
+        utilities.clear_value_cache(instance)
+        assert utilities.get_values(instance, instance.DispatchProj)[key] == dispatch + 1
+        # solving again discards the cache
+        switch_mod.solve.solve(instance)
+        assert utilities.get_values(instance, instance.DispatchProj)[key] == dispatch
+        # a component that is deleted and recreated with the same name
+        # doesn't get the old component's values
+        instance.test_expr = Expression(expr=1.0)
+        assert utilities.get_values(instance, instance.test_expr) == {None: 1.0}
+        instance.del_component(instance.test_expr)
+        instance.test_expr = Expression(expr=2.0)
+        assert utilities.get_values(instance, instance.test_expr) == {None: 2.0}
+
+    def test_background_writer(self):
+        written = []
+        def write(x):
+            if x == 'bad':
+                raise ValueError(x)
+            written.append(x)
+        utilities.start_background_writer(max_depth=2)
+        for i in range(10):
+            utilities.queue_output(write, i)
+        utilities.stop_background_writer()
+        assert written == range(10)
+
+        utilities.start_background_writer(max_depth=2)
+        utilities.queue_output(write, 'bad')
+        utilities.queue_output(write, 'good')
+        with self.assertRaises(RuntimeError):
+            utilities.stop_background_writer()
+        assert written[-1] == 'good'
+        # output is written immediately after the writer is stopped
+        utilities.queue_output(write, 'now')
+        assert written[-1] == 'now'
+
 
 if __name__ == '__main__':
     unittest.main()